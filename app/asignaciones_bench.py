@@ -0,0 +1,171 @@
+"""
+Objetos asignados por página de listado: lee una página de `--filas` filas
+de equipos, usuarios y tareas con la consulta de los endpoints (filas Core
+con las columnas de la respuesta) y con la entidad ORM completa, y mide
+con tracemalloc los bloques que quedan vivos con la página, el pico de
+memoria y el p50 de la consulta.
+
+    python -m app.asignaciones_bench --filas 1000
+    python -m app.asignaciones_bench --filas 1000 --max-objetos 12000
+
+Con la base vacía genera antes `--filas` equipos, usuarios y tareas. Con
+`--max-objetos` falla (código 1) si la página de algún listado, leída como
+la leen los endpoints, deja vivos más objetos que ese límite. Sin sharding.
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+import app.models  # noqa: F401  (registra todas las tablas)
+from app.database import Base, SessionLocal, engine
+from app.models.task import PRIORIDAD_ORDEN, Task, TaskPriority, TaskStatus
+from app.models.team import Team
+from app.models.user import User
+from app.routers import tasks as tasks_router
+from app.routers import teams as teams_router
+from app.routers import users as users_router
+from app.services import shards
+
+REPETICIONES = 20
+
+
+def generar(filas: int):
+    """Crear `filas` equipos, usuarios y tareas (una por equipo) en una base vacía."""
+    db = SessionLocal()
+    try:
+        ahora = datetime.utcnow()
+        db.execute(insert(Team), [
+            {"id": i, "nombre": f"Equipo asignaciones {i}", "descripcion": f"Descripción del equipo {i}",
+             "created_at": ahora, "updated_at": ahora}
+            for i in range(1, filas + 1)
+        ])
+        db.execute(insert(User), [
+            {"id": i, "nombre": f"Usuario asignaciones {i}", "email": f"asignaciones{i}@company.com",
+             "activo": True, "created_at": ahora, "updated_at": ahora}
+            for i in range(1, filas + 1)
+        ])
+        prioridades = list(TaskPriority)
+        db.execute(insert(Task), [
+            {"titulo": f"Tarea asignaciones {i}", "descripcion": f"Descripción de la tarea {i}",
+             "estado": list(TaskStatus)[i % len(TaskStatus)], "prioridad": prioridades[i % len(prioridades)],
+             "prioridad_orden": PRIORIDAD_ORDEN[prioridades[i % len(prioridades)]],
+             "team_id": i, "asignado_a": i, "created_at": ahora, "updated_at": ahora}
+            for i in range(1, filas + 1)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def _tasks_orm():
+    # La misma sentencia que `_sentencia_con_detalles`, con la entidad en lugar de sus columnas
+    return select(
+        Task,
+        select(Team.nombre).where(Team.id == Task.team_id).scalar_subquery().label("team_nombre"),
+        User.nombre.label("asignado_nombre"),
+        User.email.label("asignado_email")
+    ).outerjoin(User, User.id == Task.asignado_a).where(
+        Task.team_id.not_in(select(Team.id).where(Team.eliminando == True))
+    )
+
+
+# Listado -> (consulta de los endpoints, consulta con la entidad ORM); cada
+# una recibe la sesión y el tamaño de página y devuelve las filas
+LISTADOS = {
+    "teams": (
+        lambda db, n: db.query(*teams_router.COLUMNAS_LISTADO).filter(Team.eliminando == False).limit(n).all(),
+        lambda db, n: db.query(Team).filter(Team.eliminando == False).limit(n).all(),
+    ),
+    "users": (
+        lambda db, n: db.query(*users_router.COLUMNAS_LISTADO).limit(n).all(),
+        lambda db, n: db.query(User).limit(n).all(),
+    ),
+    "tasks": (
+        lambda db, n: db.execute(tasks_router._sentencia_con_detalles() + (lambda s: s.limit(n))).all(),
+        lambda db, n: db.execute(_tasks_orm().limit(n)).all(),
+    ),
+}
+
+
+def medir(consulta, filas: int) -> dict:
+    """Objetos vivos y pico (KiB) de una página, y p50 (ms) de la consulta."""
+    tiempos = []
+    for _ in range(REPETICIONES):
+        db = SessionLocal()
+        try:
+            inicio = time.perf_counter()
+            pagina = consulta(db, filas)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            db.close()
+    tiempos.sort()
+
+    # La sesión se abre (y conecta) antes de medir: solo cuenta lo que trae la página
+    db = SessionLocal()
+    try:
+        db.connection()
+        gc.collect()
+        tracemalloc.start()
+        antes = tracemalloc.take_snapshot()
+        base, _ = tracemalloc.get_traced_memory()
+        pagina = consulta(db, filas)
+        _, pico = tracemalloc.get_traced_memory()
+        gc.collect()
+        despues = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        objetos = sum(d.count_diff for d in despues.compare_to(antes, "lineno"))
+    finally:
+        db.close()
+
+    return {
+        "filas": len(pagina),
+        "objetos": objetos,
+        "pico_kib": (pico - base) / 1024,
+        "p50": tiempos[len(tiempos) // 2],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.asignaciones_bench", description="Objetos asignados por página de listado")
+    parser.add_argument("--filas", type=int, default=1000, help="Tamaño de página")
+    parser.add_argument("--max-objetos", type=int, help="Límite de objetos vivos por página (consulta de los endpoints)")
+    args = parser.parse_args()
+
+    if shards.habilitado():
+        print("❌ Ejecutar sin SHARD_URLS")
+        sys.exit(1)
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        vacia = db.query(Team.id).first() is None
+    finally:
+        db.close()
+    if vacia:
+        print(f"🌱 Generando {args.filas:,} equipos, usuarios y tareas")
+        generar(args.filas)
+
+    print(f"{'listado':<8}{'lectura':<9}{'filas':>7}{'objetos':>10}{'pico KiB':>10}{'p50 ms':>9}")
+    errores = []
+    for nombre, (endpoint, orm) in LISTADOS.items():
+        for lectura, consulta in (("filas", endpoint), ("orm", orm)):
+            r = medir(consulta, args.filas)
+            print(f"{nombre:<8}{lectura:<9}{r['filas']:>7,}{r['objetos']:>10,}{r['pico_kib']:>10,.0f}{r['p50']:>9.1f}")
+            if r["filas"] < args.filas:
+                errores.append(f"{nombre}: la página tiene {r['filas']} filas de {args.filas}")
+            if lectura == "filas" and args.max_objetos is not None and r["objetos"] > args.max_objetos:
+                errores.append(f"{nombre}: {r['objetos']:,} objetos por página (límite {args.max_objetos:,})")
+
+    if errores:
+        for error in dict.fromkeys(errores):
+            print(f"❌ {error}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
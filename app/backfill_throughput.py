@@ -0,0 +1,69 @@
+from collections import defaultdict
+from sqlalchemy import insert
+
+from app.database import SessionLocal
+from app.models.task import Task
+from app.models.task_archive import TaskArchive
+from app.models.team_throughput import TeamThroughput, CICLO_COLUMNAS
+from app.services.throughput import bucket_ciclo
+from app.services import shards
+
+CHUNK_SIZE = 5000
+
+def _backfill_shard(db) -> tuple:
+    filas = defaultdict(lambda: defaultdict(int))
+    tareas = 0
+    
+    # Una pasada en streaming por tabla: las archivadas también cuentan en la historia
+    for modelo in (Task, TaskArchive):
+        query = db.query(modelo.team_id, modelo.created_at, modelo.completed_at).yield_per(CHUNK_SIZE)
+        for task in query:
+            tareas += 1
+            filas[(task.team_id, task.created_at.date())]["creadas"] += 1
+            
+            if task.completed_at is not None:
+                fila = filas[(task.team_id, task.completed_at.date())]
+                fila["completadas"] += 1
+                fila[CICLO_COLUMNAS[bucket_ciclo(task.created_at, task.completed_at)].key] += 1
+    
+    db.query(TeamThroughput).delete(synchronize_session=False)
+    
+    valores = [
+        {"team_id": team_id, "fecha": fecha, "creadas": 0, "completadas": 0, **contadores}
+        for (team_id, fecha), contadores in filas.items()
+    ]
+    for i in range(0, len(valores), CHUNK_SIZE):
+        db.execute(insert(TeamThroughput), valores[i:i + CHUNK_SIZE])
+    
+    db.commit()
+    return len(valores), tareas
+
+def backfill_throughput():
+    """
+    Recalcular desde cero el rollup diario `team_throughput` a partir de `tasks`
+    y `tasks_archive` (con sharding, en cada shard a partir de sus propias
+    tareas). Conviene correrlo sin el archivado en curso: una tarea que se
+    mueve entre las dos lecturas puede contarse dos veces o ninguna.
+    """
+    db = SessionLocal()
+    
+    try:
+        print("🔄 Recalculando rollup de throughput...")
+        
+        for shard, sdb in shards.sesiones(db):
+            try:
+                filas, tareas = _backfill_shard(sdb)
+            except Exception:
+                sdb.rollback()
+                raise
+            prefijo = f"[shard {shard}] " if shards.habilitado() else ""
+            print(f"✅ {prefijo}{filas} filas de rollup generadas a partir de {tareas} tareas")
+        
+    except Exception as e:
+        print(f"❌ Error durante el backfill: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    backfill_throughput()
\ No newline at end of file
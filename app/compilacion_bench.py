@@ -0,0 +1,110 @@
+"""
+Micro-benchmark de construcción y compilación de las consultas calientes:
+para cada una compara la versión con `Query` (construida en cada petición,
+como antes) con el lambda statement que usan los endpoints. Mide la
+mediana, en µs, de construir la sentencia, generar su cache key y buscarla
+en el cache de sentencias compiladas, sin ejecutar nada en la base.
+
+    python -m app.compilacion_bench
+    python -m app.compilacion_bench --iteraciones 5000
+
+El parámetro de cada consulta cambia en cada iteración, como entre
+peticiones. Se informa además el porcentaje de aciertos del cache.
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.util import LRUCache
+
+from app.database import SQL_CACHE_SIZE, SessionLocal, engine
+from app.models.task import Task
+from app.models.team import Team
+from app.models.user import User
+from app.models.user_team import UserTeam
+from app.routers import tasks as tasks_router
+
+CALENTAMIENTO = 50
+
+
+def _tasks_query(db):
+    # `_sentencia_con_detalles` escrita como Query
+    return db.query(
+        *[getattr(Task, c) for c in tasks_router.COLUMNAS_TASK],
+        select(Team.nombre).where(Team.id == Task.team_id).scalar_subquery().label("team_nombre"),
+        User.nombre.label("asignado_nombre"),
+        User.email.label("asignado_email")
+    ).outerjoin(User, User.id == Task.asignado_a).filter(
+        Task.team_id.not_in(select(Team.id).where(Team.eliminando == True))
+    )
+
+
+def _listar_lambda(team_id):
+    sentencia = tasks_router._sentencia_con_detalles() + (lambda s: s.where(Task.team_id == team_id))
+    sentencia = tasks_router._ordenar(sentencia, Task, Task.due_date, True)
+    return sentencia + (lambda s: s.offset(0).limit(100))
+
+
+# Consulta -> (versión con Query, lambda statement); reciben la sesión y el parámetro
+CONSULTAS = {
+    "obtener_task": (
+        lambda db, i: _tasks_query(db).filter(Task.id == i).statement,
+        lambda db, i: tasks_router._sentencia_con_detalles() + (lambda s: s.where(Task.id == i)),
+    ),
+    "listar_tasks (team+sort)": (
+        lambda db, i: _tasks_query(db).filter(Task.team_id == i)
+            .order_by(Task.due_date.desc(), Task.id.desc()).offset(0).limit(100).statement,
+        lambda db, i: _listar_lambda(i),
+    ),
+    "task por id": (
+        lambda db, i: db.query(Task).filter(Task.id == i).statement,
+        lambda db, i: lambda_stmt(lambda: select(Task).where(Task.id == i)),
+    ),
+    "team activo por id": (
+        lambda db, i: db.query(Team).filter(Team.id == i, Team.eliminando == False).statement,
+        lambda db, i: lambda_stmt(lambda: select(Team).where(Team.id == i, Team.eliminando == False)),
+    ),
+    "miembros del team": (
+        lambda db, i: db.query(User.id, User.nombre, User.email, User.activo, UserTeam.role, UserTeam.joined_at)
+            .join(UserTeam, UserTeam.user_id == User.id).filter(UserTeam.team_id == i).statement,
+        lambda db, i: lambda_stmt(lambda: select(
+            User.id, User.nombre, User.email, User.activo, UserTeam.role, UserTeam.joined_at
+        ).join(UserTeam, UserTeam.user_id == User.id).where(UserTeam.team_id == i)),
+    ),
+}
+
+
+def medir(construir, iteraciones: int) -> tuple:
+    """Mediana en µs de construir + cache key + búsqueda en el cache, y % de aciertos."""
+    dialecto = engine.dialect
+    cache = LRUCache(SQL_CACHE_SIZE)
+    db = SessionLocal()
+    try:
+        tiempos, aciertos = [], 0
+        for i in range(CALENTAMIENTO + iteraciones):
+            inicio = time.perf_counter()
+            sentencia = construir(db, i + 1)
+            _, _, estado = sentencia._compile_w_cache(dialecto, compiled_cache=cache, column_keys=[])
+            if i >= CALENTAMIENTO:
+                tiempos.append((time.perf_counter() - inicio) * 1e6)
+                aciertos += estado == dialecto.CACHE_HIT
+        return statistics.median(tiempos), 100 * aciertos / iteraciones
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.compilacion_bench", description="Construcción y compilación de las consultas calientes")
+    parser.add_argument("--iteraciones", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'consulta':<26}{'Query µs':>10}{'lambda µs':>11}{'x':>6}{'hits lambda':>13}")
+    for nombre, (query, lambda_) in CONSULTAS.items():
+        t_query, _ = medir(query, args.iteraciones)
+        t_lambda, hits = medir(lambda_, args.iteraciones)
+        print(f"{nombre:<26}{t_query:>10.0f}{t_lambda:>11.0f}{t_query / t_lambda:>6.1f}{hits:>12.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark de contención: concurrencia optimista (versión + UPDATE
+condicional, lo que usan los endpoints) contra bloqueo pesimista con
+`SELECT ... FOR UPDATE`, sobre unas pocas tareas muy disputadas.
+
+    DATABASE_URL=mysql+pymysql://.../tasks_bench python -m app.concurrencia_bench --hilos 16 --filas 4
+
+Cada hilo repite durante `--segundos`: leer una tarea al azar entre las
+`--filas` del benchmark, simular `--trabajo-ms` de trabajo de la petición y
+escribirla. En modo optimista un conflicto (el 412 de la API) se reintenta
+con una lectura nueva; en modo pesimista la fila queda bloqueada durante el
+trabajo. Se informa escrituras por segundo, conflictos y latencia de cada
+escritura confirmada (reintentos incluidos), y se comprueba con las
+versiones finales que no se perdió ninguna.
+
+Crea su propio equipo y tareas y los borra al terminar. En SQLite FOR
+UPDATE no existe (el escritor único serializa las escrituras y la lectura
+va al pool de lectura), así que el modo pesimista solo se compara en
+serio contra MySQL o PostgreSQL.
+"""
+import argparse
+import random
+import threading
+import time
+import uuid
+
+from sqlalchemy import func, select
+from sqlalchemy.orm.exc import StaleDataError
+
+import app.models  # noqa: F401  (registra todas las tablas)
+from app.database import Base, SessionLocal, engine
+from app.models.task import Task
+from app.models.team import Team
+
+MODOS = ("optimista", "pesimista")
+
+
+def preparar(filas: int) -> tuple:
+    """Crear el equipo y las tareas del benchmark: (team_id, task_ids)."""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        team = Team(nombre=f"Bench concurrencia {uuid.uuid4().hex[:8]}")
+        db.add(team)
+        db.flush()
+        tasks = [Task(titulo=f"Disputada {i}", team_id=team.id) for i in range(filas)]
+        db.add_all(tasks)
+        db.commit()
+        return team.id, [t.id for t in tasks]
+    finally:
+        db.close()
+
+
+def limpiar(team_id: int):
+    db = SessionLocal()
+    try:
+        db.query(Task).filter(Task.team_id == team_id).delete(synchronize_session=False)
+        db.query(Team).filter(Team.id == team_id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _versiones(task_ids: list) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(func.sum(Task.version)).filter(Task.id.in_(task_ids)).scalar()
+    finally:
+        db.close()
+
+
+def _escribir(db, task_id: int, modo: str, trabajo: float):
+    sentencia = select(Task).where(Task.id == task_id)
+    if modo == "pesimista":
+        sentencia = sentencia.with_for_update()
+    task = db.execute(sentencia).scalar_one()
+    time.sleep(trabajo)
+    task.titulo = f"Disputada {task_id} · {uuid.uuid4().hex[:8]}"
+    db.commit()
+
+
+def correr(modo: str, task_ids: list, hilos: int, segundos: float, trabajo: float) -> dict:
+    latencias, conflictos, errores = [], [0], [0]
+    lock = threading.Lock()
+    fin = time.monotonic() + segundos
+
+    def hilo():
+        rnd = random.Random()
+        db = SessionLocal()
+        try:
+            while time.monotonic() < fin:
+                task_id = rnd.choice(task_ids)
+                inicio = time.perf_counter()
+                while True:
+                    try:
+                        _escribir(db, task_id, modo, trabajo)
+                        break
+                    except StaleDataError:
+                        db.rollback()
+                        with lock:
+                            conflictos[0] += 1
+                    except Exception:
+                        # Deadlock o timeout de lock: cuenta y sigue con otra escritura
+                        db.rollback()
+                        with lock:
+                            errores[0] += 1
+                        inicio = None
+                        break
+                if inicio is not None:
+                    with lock:
+                        latencias.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            db.close()
+
+    versiones_antes = _versiones(task_ids)
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=hilo) for _ in range(hilos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracion = time.perf_counter() - inicio
+
+    latencias.sort()
+
+    def percentil(p):
+        return latencias[min(len(latencias) - 1, int(len(latencias) * p))] if latencias else 0.0
+
+    return {
+        "modo": modo,
+        "escrituras": len(latencias),
+        "por_segundo": len(latencias) / duracion,
+        "conflictos": conflictos[0],
+        "errores": errores[0],
+        "p50": percentil(0.50),
+        "p95": percentil(0.95),
+        "p99": percentil(0.99),
+        "perdidas": len(latencias) - (_versiones(task_ids) - versiones_antes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.concurrencia_bench", description="Contención: versión + UPDATE condicional contra SELECT ... FOR UPDATE")
+    parser.add_argument("--hilos", type=int, default=16)
+    parser.add_argument("--filas", type=int, default=4, help="Tareas disputadas")
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--trabajo-ms", type=float, default=5, help="Trabajo simulado entre la lectura y la escritura")
+    parser.add_argument("--modos", nargs="+", choices=MODOS, default=list(MODOS))
+    args = parser.parse_args()
+
+    if engine.dialect.name == "sqlite":
+        print("⚠️  SQLite ignora FOR UPDATE: el modo pesimista no bloquea y sus números no son comparables")
+
+    team_id, task_ids = preparar(args.filas)
+    try:
+        resultados = []
+        for modo in args.modos:
+            print(f"⏱️  {modo}: {args.hilos} hilos, {args.filas} filas, {args.segundos:.0f}s, {args.trabajo_ms:.0f} ms de trabajo")
+            resultados.append(correr(modo, task_ids, args.hilos, args.segundos, args.trabajo_ms / 1000))
+    finally:
+        limpiar(team_id)
+
+    print()
+    print(f"{'modo':<11}{'escr/s':>9}{'conflictos':>12}{'errores':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'perdidas':>10}")
+    for r in resultados:
+        print(
+            f"{r['modo']:<11}{r['por_segundo']:>9.1f}{r['conflictos']:>12}{r['errores']:>9}"
+            f"{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}{r['perdidas']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,215 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.sql.dml import UpdateBase
+from collections import deque
+from contextvars import ContextVar
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Perfil SQLite (un solo nodo): WAL, pragmas ajustados, pool de lectura y un
+# único escritor. SQLITE_TUNING=0 vuelve a la configuración por defecto.
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "1") != "0"
+SQLITE_READ_POOL = int(os.getenv("SQLITE_READ_POOL", "8"))
+SQLITE_WRITE_TIMEOUT = float(os.getenv("SQLITE_WRITE_TIMEOUT", "30"))
+# Espera (ms) a partir de la cual el turno de escritura pasa en orden de llegada
+SQLITE_WRITE_FAIRNESS_MS = float(os.getenv("SQLITE_WRITE_FAIRNESS_MS", "500"))
+
+# Entradas del cache de sentencias compiladas por engine (500 es el valor de SQLAlchemy)
+SQL_CACHE_SIZE = int(os.getenv("SQL_CACHE_SIZE", "500"))
+
+PRAGMAS_SQLITE = (
+    "journal_mode = WAL",       # lectores y escritor no se bloquean entre sí
+    "synchronous = NORMAL",     # con WAL solo se pierde la última transacción ante un corte de luz
+    "cache_size = -65536",      # 64 MiB de page cache por conexión
+    "mmap_size = 268435456",    # 256 MiB mapeados en memoria
+    "temp_store = MEMORY",
+    "busy_timeout = 5000",      # esperar (ms) en lugar de "database is locked"
+    "foreign_keys = ON",        # SQLite no aplica los ON DELETE de los modelos sin esto
+)
+
+
+def _perfil_sqlite(url) -> bool:
+    url = make_url(url)
+    return (
+        SQLITE_TUNING
+        and url.get_backend_name() == "sqlite"
+        and url.database not in (None, "", ":memory:")
+    )
+
+
+def _aplicar_pragmas(engine, solo_lectura: bool):
+    @event.listens_for(engine, "connect")
+    def _conectar(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in PRAGMAS_SQLITE:
+            cursor.execute(f"PRAGMA {pragma}")
+        if solo_lectura:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+
+class _Espera:
+    __slots__ = ("evento", "desde", "asignado")
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.desde = time.monotonic()
+        self.asignado = False
+
+
+class TurnoEscritor:
+    """
+    Turno del escritor único. Al liberarlo queda libre y lo toma el primer
+    hilo que llegue a pedirlo, aunque haya otros esperando: entregárselo a un
+    hilo dormido lo deja ocioso hasta que ese hilo vuelve a tener el GIL, y
+    con lectores ocupando la CPU ese hueco se come la mayor parte del turno.
+    Cuando el más antiguo lleva más de `max_espera` segundos esperando, el
+    turno pasa en orden de llegada (0 = siempre FIFO), lo que acota la cola
+    de latencia que sin orden dejaría el pool solo.
+    """
+
+    def __init__(self, timeout: float, max_espera: float):
+        self.timeout = timeout
+        self.max_espera = max_espera
+        self._lock = threading.Lock()
+        self._espera = deque()
+        self._ocupado = False
+
+    def _en_orden(self) -> bool:
+        return bool(self._espera) and time.monotonic() - self._espera[0].desde > self.max_espera
+
+    def adquirir(self):
+        limite = time.monotonic() + self.timeout
+        with self._lock:
+            if not self._ocupado and not self._en_orden():
+                self._ocupado = True
+                return
+            espera = _Espera()
+            self._espera.append(espera)
+
+        while True:
+            espera.evento.wait(max(limite - time.monotonic(), 0))
+            with self._lock:
+                if espera.asignado:
+                    return
+                if not self._ocupado:
+                    self._espera.remove(espera)
+                    self._ocupado = True
+                    return
+                # Otro hilo tomó el turno antes: seguir esperando
+                espera.evento.clear()
+                if time.monotonic() >= limite:
+                    self._espera.remove(espera)
+                    raise TimeoutError(f"Sin turno de escritura tras {self.timeout:.0f}s")
+
+    def liberar(self):
+        with self._lock:
+            if self._en_orden():
+                espera = self._espera.popleft()
+                espera.asignado = True
+                espera.evento.set()
+                return
+            self._ocupado = False
+            if self._espera:
+                self._espera[0].evento.set()
+
+
+class SesionEnrutada(Session):
+    """
+    Sesión del perfil SQLite: las lecturas van al pool de lectura y las
+    escrituras a la conexión única del escritor. Desde la primera escritura,
+    el resto de la transacción sigue en el escritor para leer sus propios
+    cambios.
+    """
+
+    # Cada base de datos usa una subclase con sus engines y su turno (ver `_sesiones`)
+    escritor = None
+    lector = None
+    turno: TurnoEscritor = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("escritor"):
+            return self.escritor
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.turno.adquirir()
+            self.info["escritor"] = True
+            return self.escritor
+        return self.lector
+
+
+@event.listens_for(SesionEnrutada, "after_transaction_end")
+def _fin_transaccion(session, transaction):
+    if transaction.parent is None and session.info.pop("escritor", None):
+        session.turno.liberar()
+
+
+def _sesiones(url):
+    """Engine de escritura, engine de lectura y fábrica de sesiones para `url`."""
+    if _perfil_sqlite(url):
+        # Un solo escritor: las transacciones que escriben esperan su turno
+        # (hasta SQLITE_WRITE_TIMEOUT) en vez de competir por el lock de SQLite
+        escritor = create_engine(
+            url, pool_size=1, max_overflow=0, pool_timeout=SQLITE_WRITE_TIMEOUT,
+            query_cache_size=SQL_CACHE_SIZE
+        )
+        lector = create_engine(
+            url, pool_size=SQLITE_READ_POOL, max_overflow=SQLITE_READ_POOL,
+            query_cache_size=SQL_CACHE_SIZE
+        )
+        _aplicar_pragmas(escritor, solo_lectura=False)
+        _aplicar_pragmas(lector, solo_lectura=True)
+
+        clase = type("SesionEnrutada", (SesionEnrutada,), {
+            "escritor": escritor,
+            "lector": lector,
+            "turno": TurnoEscritor(SQLITE_WRITE_TIMEOUT, SQLITE_WRITE_FAIRNESS_MS / 1000),
+        })
+        return escritor, lector, sessionmaker(class_=clase, autocommit=False, autoflush=False)
+
+    engine = create_engine(url, pool_pre_ping=True, query_cache_size=SQL_CACHE_SIZE)
+    return engine, engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+# Shards de tareas por team_id (ver app/services/shards.py): el shard 0 es
+# DATABASE_URL, donde viven además equipos, usuarios y trabajos.
+SHARD_URLS = [url.strip() for url in os.getenv("SHARD_URLS", "").split(",") if url.strip()]
+
+_bases = [_sesiones(DATABASE_URL)] + [_sesiones(url) for url in SHARD_URLS]
+
+engine, engine_lectura, SessionLocal = _bases[0]
+
+# Fábrica de sesiones y engine de escritura de cada shard
+SHARDS = [fabrica for _, _, fabrica in _bases]
+SHARD_ENGINES = [escritor for escritor, _, _ in _bases]
+
+# Engines distintos en uso (para registrar eventos en todos)
+ENGINES = list(dict.fromkeys(e for escritor, lector, _ in _bases for e in (escritor, lector)))
 
 Base = declarative_base()
 
+# Sesión compartida por las sub-peticiones secuenciales de un POST /batch
+sesion_compartida: ContextVar = ContextVar("sesion_compartida", default=None)
+
 def get_db():
+    compartida = sesion_compartida.get()
+    if compartida is not None:
+        try:
+            yield compartida
+        finally:
+            # Descartar cambios no confirmados de una sub-petición fallida
+            compartida.rollback()
+        return
+    
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -1,18 +1,44 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
+from app.database import engine, ENGINES, SHARDS, Base, SessionLocal
 
 # Importar modelos
 from app.models.team import Team
 from app.models.user import User
 from app.models.user_team import UserTeam
 from app.models.task import Task
+from app.models.task_archive import TaskArchive
+from app.models.job import Job
+from app.models.team_throughput import TeamThroughput
+from app.models.team_shard import TeamShard
+from app.models.secuencia import Secuencia
+from app.services import shards
 
-# Crear tablas
+# Crear tablas (y las de tareas en los shards adicionales)
 Base.metadata.create_all(bind=engine)
+shards.crear_tablas()
 
 # Importar routers
-from app.routers import teams, users, tasks
+from app.routers import teams, users, tasks, batch, jobs, internal
+from app.services.vencimientos import scheduler as overdue_scheduler
+from app.services.jobs import runner as job_runner
+from app.services.sugerencias import cargar_indices
+from app.middleware.admision import AdmissionControlMiddleware, latencia_db, clases as clases_admision
+from app.middleware.coalescing import SingleFlightMiddleware
+from app.middleware import perfilado, captura
+from app.middleware.consultas_lentas import RutaConsultaMiddleware, registro_consultas
+from app.services.sentencias import metricas_cache
+
+# Servicios en segundo plano
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    cargar_indices(SessionLocal)
+    overdue_scheduler.start(*SHARDS)
+    job_runner.start()
+    yield
+    job_runner.stop()
+    overdue_scheduler.stop()
 
 # Metadata mejorada
 app = FastAPI(
@@ -40,8 +66,31 @@ app = FastAPI(
         "name": "MIT License",
         "url": "https://opensource.org/licenses/MIT",
     },
+    lifespan=lifespan,
 )
 
+# Registro de consultas lentas (la ruta de origen sale del scope de la petición)
+for e in ENGINES:
+    registro_consultas.registrar(e)
+    metricas_cache.registrar(e)
+app.add_middleware(RutaConsultaMiddleware)
+
+# Control de admisión (CORS queda por fuera para que los 503 lleven sus headers)
+for e in ENGINES:
+    latencia_db.registrar(e)
+app.add_middleware(AdmissionControlMiddleware)
+
+# Coalescing de lecturas idénticas (por fuera de la admisión: los seguidores no ocupan cupo)
+app.add_middleware(SingleFlightMiddleware)
+
+# Perfilado bajo demanda (solo se instala si está configurado: sin coste si no)
+if perfilado.habilitado():
+    app.add_middleware(perfilado.ProfilingMiddleware)
+
+# Captura de tráfico para replay (solo con CAPTURE_FILE)
+if captura.habilitado():
+    app.add_middleware(captura.CapturaMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -49,6 +98,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Total-Count-Type", "X-Missing-Ids", "ETag", "X-Profile-Id"],
 )
 
 @app.get("/", tags=["Root"])
@@ -96,10 +146,18 @@ def health_check():
     return {
         "status": "healthy",
         "database": "connected",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "admision": {nombre: clase.estado() for nombre, clase in clases_admision.items()}
     }
 
 # Registrar routers
 app.include_router(teams.router)
 app.include_router(users.router)
-app.include_router(tasks.router)
\ No newline at end of file
+app.include_router(tasks.router)
+app.include_router(batch.router)
+app.include_router(jobs.router)
+app.include_router(internal.router)
+
+# Con perfilado, los endpoints síncronos registran su hilo para el muestreador
+if perfilado.habilitado():
+    perfilado.instrumentar(app)
\ No newline at end of file
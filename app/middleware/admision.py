@@ -0,0 +1,192 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from app.middleware.cronometro_sql import cronometro_sql
+
+# Objetivo de latencia de BD (ms) para el control adaptativo (AIMD)
+DB_LATENCY_TARGET_MS = float(os.getenv("ADMISSION_DB_LATENCY_TARGET_MS", "50"))
+AJUSTE_INTERVALO = 1.0   # segundos entre ajustes del límite
+DECREMENTO = 0.75        # factor multiplicativo al superar el objetivo
+RETRY_AFTER = "1"
+
+# Rutas que no pasan por el control de admisión
+RUTAS_EXENTAS = ("/", "/health", "/docs", "/redoc", "/openapi.json", "/docs/oauth2-redirect")
+PREFIJOS_EXENTOS = ("/batch",)  # sus sub-peticiones se admiten una por una
+
+# Segmentos que identifican lecturas pesadas (listados, búsquedas, estadísticas)
+SEGMENTOS_PESADOS = ("stats", "due", "dashboard")
+
+
+class LatenciaDB:
+    """EWMA de la latencia de las sentencias SQL, alimentada por `cronometro_sql`."""
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.ewma_ms: Optional[float] = None
+
+    def registrar(self, engine):
+        cronometro_sql.registrar(engine, lambda statement, parameters, ms: self.observar(ms))
+
+    def observar(self, ms: float):
+        if self.ewma_ms is None:
+            self.ewma_ms = ms
+        else:
+            self.ewma_ms += self.alpha * (ms - self.ewma_ms)
+
+
+latencia_db = LatenciaDB()
+
+
+class ClaseRuta:
+    """
+    Límite de concurrencia y cola acotada para una clase de rutas.
+
+    El límite se ajusta con AIMD según la latencia de BD observada: +1 por
+    intervalo mientras esté bajo el objetivo y x0.75 cuando lo supera.
+    """
+
+    def __init__(self, nombre: str, limite: int, limite_min: int, limite_max: int,
+                 max_cola: int, max_espera: float):
+        self.nombre = nombre
+        self.limite = float(limite)
+        self.limite_min = limite_min
+        self.limite_max = limite_max
+        self.max_cola = max_cola
+        self.max_espera = max_espera
+        self.en_curso = 0
+        self.cola: deque = deque()
+        self.rechazadas = 0
+        self._ultimo_ajuste = time.monotonic()
+
+    def _hay_cupo(self) -> bool:
+        return self.en_curso < int(self.limite)
+
+    async def adquirir(self) -> bool:
+        if self._hay_cupo() and not self.cola:
+            self.en_curso += 1
+            return True
+
+        if len(self.cola) >= self.max_cola:
+            self.rechazadas += 1
+            return False
+
+        turno = asyncio.get_running_loop().create_future()
+        self.cola.append(turno)
+        try:
+            await asyncio.wait_for(turno, self.max_espera)
+            return True
+        except asyncio.TimeoutError:
+            self.rechazadas += 1
+            return False
+        except asyncio.CancelledError:
+            # El cupo ya se había cedido a esta petición: devolverlo
+            if turno.done() and not turno.cancelled():
+                self.liberar()
+            raise
+        finally:
+            if turno in self.cola:
+                self.cola.remove(turno)
+
+    def liberar(self):
+        self.en_curso -= 1
+        self._ajustar()
+        while self.cola and self._hay_cupo():
+            turno = self.cola.popleft()
+            if not turno.done():
+                self.en_curso += 1
+                turno.set_result(True)
+
+    def _ajustar(self):
+        ahora = time.monotonic()
+        if ahora - self._ultimo_ajuste < AJUSTE_INTERVALO or latencia_db.ewma_ms is None:
+            return
+        self._ultimo_ajuste = ahora
+
+        if latencia_db.ewma_ms > DB_LATENCY_TARGET_MS:
+            self.limite = max(self.limite_min, self.limite * DECREMENTO)
+        else:
+            self.limite = min(self.limite_max, self.limite + 1)
+
+    def estado(self) -> dict:
+        return {
+            "limite": int(self.limite),
+            "en_curso": self.en_curso,
+            "en_cola": len(self.cola),
+            "rechazadas": self.rechazadas,
+        }
+
+
+def _env_int(nombre: str, defecto: int) -> int:
+    return int(os.getenv(nombre, str(defecto)))
+
+
+clases: Dict[str, ClaseRuta] = {
+    "read": ClaseRuta("read", _env_int("ADMISSION_READ_LIMIT", 64), 8, 256,
+                      max_cola=128, max_espera=0.5),
+    "heavy": ClaseRuta("heavy", _env_int("ADMISSION_HEAVY_LIMIT", 16), 2, 64,
+                       max_cola=32, max_espera=1.0),
+    "write": ClaseRuta("write", _env_int("ADMISSION_WRITE_LIMIT", 32), 4, 128,
+                       max_cola=64, max_espera=1.0),
+}
+
+
+def clasificar(method: str, path: str, query_string: bytes) -> Optional[str]:
+    """Clase de ruta de la petición, o None si está exenta."""
+    if path in RUTAS_EXENTAS or path.startswith(PREFIJOS_EXENTOS):
+        return None
+
+    if method not in ("GET", "HEAD"):
+        return "write"
+
+    segmentos = [s for s in path.split("/") if s]
+    if len(segmentos) <= 1 or b"search=" in query_string or any(s in SEGMENTOS_PESADOS for s in segmentos):
+        return "heavy"
+
+    return "read"
+
+
+class AdmissionControlMiddleware:
+    """
+    Middleware ASGI de control de admisión.
+
+    Cada petición ocupa un cupo de su clase (read, heavy o write) antes de
+    llegar al router y al pool de BD. Si la cola está llena o la espera supera
+    el presupuesto de la clase, responde 503 con Retry-After de inmediato.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        nombre = clasificar(scope["method"], scope["path"], scope.get("query_string", b""))
+        if nombre is None:
+            await self.app(scope, receive, send)
+            return
+
+        clase = clases[nombre]
+        if not await clase.adquirir():
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", RETRY_AFTER.encode()),
+                ],
+            })
+            await send({
+                "type": "http.response.body",
+                "body": b'{"detail":"Servicio sobrecargado, intente de nuevo"}',
+            })
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            clase.liberar()
@@ -0,0 +1,140 @@
+import atexit
+import base64
+import json
+import os
+import queue
+import random
+import threading
+import time
+from typing import Optional
+
+# Captura de tráfico para `python -m app.replay`: con CAPTURE_FILE, una
+# fracción CAPTURE_SAMPLE_RATE de las peticiones se escribe como JSONL.
+# Sin CAPTURE_FILE el middleware no se instala.
+CAPTURE_FILE = os.getenv("CAPTURE_FILE", "")
+CAPTURE_SAMPLE_RATE = float(os.getenv("CAPTURE_SAMPLE_RATE", "1"))
+CAPTURE_MAX_BODY = 64 * 1024
+
+# Headers de la petición que cambian la respuesta y se reproducen
+HEADERS_CAPTURADOS = (b"accept", b"content-type", b"if-match")
+
+# Rutas que no se capturan (operación, no tráfico de la API)
+PREFIJOS_EXCLUIDOS = ("/internal", "/docs", "/redoc", "/openapi.json")
+
+
+def habilitado() -> bool:
+    return bool(CAPTURE_FILE) and CAPTURE_SAMPLE_RATE > 0
+
+
+def _cuerpo(body: bytes) -> dict:
+    """El cuerpo como texto si es UTF-8, si no en base64."""
+    try:
+        return {"body": body.decode()}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(body).decode()}
+
+
+class CapturaArchivo:
+    """
+    Escritura JSONL (una línea por petición capturada) desde un hilo propio:
+    `escribir` solo encola, así el event loop no espera al disco.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.inicio = time.time()
+        self._cola: queue.SimpleQueue = queue.SimpleQueue()
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def escribir(self, registro: dict):
+        if self._hilo is None:
+            with self._lock:
+                if self._hilo is None:
+                    self._hilo = threading.Thread(target=self._escritor, name="captura", daemon=True)
+                    self._hilo.start()
+                    atexit.register(self.cerrar)
+        self._cola.put(registro)
+
+    def _escritor(self):
+        with open(self.ruta, "a", buffering=1, encoding="utf-8") as archivo:
+            while True:
+                registro = self._cola.get()
+                if registro is None:
+                    return
+                archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    def cerrar(self):
+        """Escribir lo pendiente y cerrar el archivo."""
+        with self._lock:
+            hilo, self._hilo = self._hilo, None
+        if hilo is not None:
+            self._cola.put(None)
+            hilo.join()
+
+
+class CapturaMiddleware:
+    """
+    Middleware ASGI que registra las peticiones muestreadas: método, ruta
+    (y su plantilla tras el routing), query string, headers relevantes,
+    cuerpo, status y duración, con el instante relativo al inicio de la
+    captura para poder reproducirlas con el mismo ritmo.
+
+    Las sub-peticiones de `POST /batch` no se capturan: ya queda el batch, y
+    al reproducirlo se volverían a ejecutar.
+    """
+
+    def __init__(self, app, archivo: Optional[CapturaArchivo] = None):
+        self.app = app
+        self.archivo = archivo or CapturaArchivo(CAPTURE_FILE)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope.get("batch")
+            or scope["path"].startswith(PREFIJOS_EXCLUIDOS)
+            or random.random() >= CAPTURE_SAMPLE_RATE
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.time()
+        cuerpo = bytearray()
+        estado = {"status": None, "bytes": 0}
+
+        async def receive_capturado():
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                estado["bytes"] += len(body)
+                if len(cuerpo) <= CAPTURE_MAX_BODY:
+                    cuerpo.extend(body)
+            return message
+
+        async def send_capturado(message):
+            if message["type"] == "http.response.start":
+                estado["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_capturado, send_capturado)
+        finally:
+            headers = dict(scope.get("headers", []))
+            route = scope.get("route")
+            registro = {
+                "t": round(inicio - self.archivo.inicio, 6),
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path", scope["path"]),
+                "query": scope.get("query_string", b"").decode(),
+                "headers": {k.decode(): headers[k].decode() for k in HEADERS_CAPTURADOS if k in headers},
+                "status": estado["status"],
+                "duracion_ms": round((time.time() - inicio) * 1000, 3),
+            }
+            if estado["bytes"] > CAPTURE_MAX_BODY:
+                # Reproducido a medias daría otro status: se marca y `replay` lo omite
+                registro["body_truncado"] = True
+                registro["body_bytes"] = estado["bytes"]
+            elif cuerpo:
+                registro.update(_cuerpo(bytes(cuerpo)))
+            self.archivo.escribir(registro)
@@ -0,0 +1,132 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+# Micro-cache opcional sobre el single-flight (0 = desactivado)
+SINGLE_FLIGHT_TTL = float(os.getenv("SINGLE_FLIGHT_TTL", "0"))
+CACHE_MAX_ENTRADAS = 1024
+
+# Lecturas calientes que se pueden compartir entre clientes
+RUTAS_COALESCIBLES = {
+    "/tasks/",
+    "/tasks/stats/general",
+    "/teams/",
+    "/teams/stats/general",
+    "/users/",
+}
+
+# Headers de la petición que cambian la respuesta y forman parte de la clave
+HEADERS_VARY = (b"accept",)
+
+
+class MetricasCoalescing:
+    def __init__(self):
+        self.lideres = 0
+        self.seguidores = 0
+        self.cache_hits = 0
+
+    def estado(self) -> dict:
+        total = self.lideres + self.seguidores + self.cache_hits
+        return {
+            "lideres": self.lideres,
+            "seguidores": self.seguidores,
+            "cache_hits": self.cache_hits,
+            "ratio_coalescing": (self.seguidores + self.cache_hits) / total if total else 0.0,
+        }
+
+
+metricas = MetricasCoalescing()
+
+
+def _clave(scope) -> Tuple:
+    """Ruta + parámetros normalizados (ordenados) + headers relevantes."""
+    params = sorted(parse_qsl(scope.get("query_string", b"").decode(), keep_blank_values=True))
+    headers = dict(scope.get("headers", []))
+    return (scope["path"], urlencode(params)) + tuple(headers.get(h, b"") for h in HEADERS_VARY)
+
+
+async def _reproducir(respuesta: dict, send):
+    await send({"type": "http.response.start", "status": respuesta["status"], "headers": respuesta["headers"]})
+    await send({"type": "http.response.body", "body": respuesta["body"]})
+
+
+class SingleFlightMiddleware:
+    """
+    Middleware ASGI de coalescing (single-flight) para lecturas calientes.
+
+    Si llegan varias peticiones GET idénticas (misma ruta, parámetros
+    normalizados y headers relevantes) mientras una está en curso, solo esa
+    llega a la BD; las demás esperan y reciben la misma respuesta serializada.
+    Al trabajar a nivel ASGI funciona igual con handlers sync o async.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._en_vuelo: Dict[Tuple, asyncio.Future] = {}
+        self._cache: "OrderedDict[Tuple, Tuple[float, dict]]" = OrderedDict()
+
+    def _leer_cache(self, clave) -> Optional[dict]:
+        entrada = self._cache.get(clave)
+        if entrada is None:
+            return None
+        if entrada[0] < time.monotonic():
+            del self._cache[clave]
+            return None
+        return entrada[1]
+
+    def _guardar_cache(self, clave, respuesta: dict):
+        self._cache[clave] = (time.monotonic() + SINGLE_FLIGHT_TTL, respuesta)
+        self._cache.move_to_end(clave)
+        while len(self._cache) > CACHE_MAX_ENTRADAS:
+            self._cache.popitem(last=False)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] not in RUTAS_COALESCIBLES:
+            await self.app(scope, receive, send)
+            return
+
+        clave = _clave(scope)
+
+        if SINGLE_FLIGHT_TTL > 0:
+            cacheada = self._leer_cache(clave)
+            if cacheada is not None:
+                metricas.cache_hits += 1
+                await _reproducir(cacheada, send)
+                return
+
+        en_vuelo = self._en_vuelo.get(clave)
+        if en_vuelo is not None:
+            metricas.seguidores += 1
+            respuesta = await asyncio.shield(en_vuelo)
+            if respuesta is not None:
+                await _reproducir(respuesta, send)
+            else:
+                # El líder falló: esta petición se ejecuta por su cuenta
+                await self.app(scope, receive, send)
+            return
+
+        metricas.lideres += 1
+        futuro = asyncio.get_running_loop().create_future()
+        self._en_vuelo[clave] = futuro
+        respuesta = {"status": 500, "headers": [], "body": b""}
+
+        async def send_capturando(message):
+            if message["type"] == "http.response.start":
+                respuesta["status"] = message["status"]
+                respuesta["headers"] = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                respuesta["body"] += message.get("body", b"")
+            await send(message)
+
+        compartida = None
+        try:
+            await self.app(scope, receive, send_capturando)
+            compartida = respuesta
+            if SINGLE_FLIGHT_TTL > 0 and respuesta["status"] == 200:
+                self._guardar_cache(clave, respuesta)
+        finally:
+            del self._en_vuelo[clave]
+            futuro.set_result(compartida)
@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import Counter, OrderedDict, deque
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional
+
+from app.middleware.cronometro_sql import cronometro_sql
+
+logger = logging.getLogger(__name__)
+
+# Ejecuciones por encima de este tiempo se registran individualmente
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+MAX_FINGERPRINTS = 500    # fingerprints distintos en la tabla (LRU)
+MUESTRAS_PERCENTIL = 256  # últimas duraciones por fingerprint para el p95
+MAX_RUTAS = 10            # rutas de origen distintas por fingerprint
+MAX_PARAMS_LOG = 500      # caracteres de parámetros en el log
+
+# Petición en curso (el scope ASGI; tras el routing incluye la ruta)
+_scope_actual: ContextVar[Optional[dict]] = ContextVar("scope_consulta", default=None)
+
+_LITERALES = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"%\(\w+\)s|%s|:\w+|\$\d+"), "?"),
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)"), "(?+)"),  # IN (?, ?, ...) de cualquier tamaño
+    (re.compile(r"\s+"), " "),
+]
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """Sentencia normalizada: literales y parámetros como `?`, listas IN colapsadas."""
+    normalizada = statement
+    for patron, reemplazo in _LITERALES:
+        normalizada = patron.sub(reemplazo, normalizada)
+    return normalizada.strip()
+
+
+def ruta_actual() -> Optional[str]:
+    scope = _scope_actual.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    return f"{scope['method']} {route.path if route is not None else scope['path']}"
+
+
+class EstadisticaConsulta:
+    def __init__(self, sentencia: str):
+        self.sentencia = sentencia
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.lentas = 0
+        self.duraciones = deque(maxlen=MUESTRAS_PERCENTIL)
+        self.rutas = Counter()
+
+    def observar(self, ms: float, ruta: Optional[str]):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.duraciones.append(ms)
+        if ms >= SLOW_QUERY_MS:
+            self.lentas += 1
+        if ruta is not None and (ruta in self.rutas or len(self.rutas) < MAX_RUTAS):
+            self.rutas[ruta] += 1
+
+    def resumen(self, fp_id: str) -> dict:
+        ordenadas = sorted(self.duraciones)
+        p95 = ordenadas[min(int(len(ordenadas) * 0.95), len(ordenadas) - 1)] if ordenadas else 0.0
+        return {
+            "id": fp_id,
+            "fingerprint": self.sentencia,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "media_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "p95_ms": round(p95, 2),
+            "lentas": self.lentas,
+            "rutas": dict(self.rutas.most_common()),
+        }
+
+
+class RegistroConsultas:
+    """
+    Tabla acotada (LRU) de estadísticas por fingerprint, alimentada por
+    `cronometro_sql`, y log de ejecuciones lentas.
+    """
+
+    def __init__(self):
+        self._tabla: "OrderedDict[str, EstadisticaConsulta]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def registrar(self, engine):
+        cronometro_sql.registrar(engine, self.observar)
+
+    def observar(self, statement: str, parameters, ms: float):
+        fp = fingerprint(statement)
+        fp_id = hashlib.sha1(fp.encode()).hexdigest()[:16]
+        ruta = ruta_actual()
+
+        with self._lock:
+            estadistica = self._tabla.get(fp_id)
+            if estadistica is None:
+                estadistica = self._tabla[fp_id] = EstadisticaConsulta(fp)
+                if len(self._tabla) > MAX_FINGERPRINTS:
+                    self._tabla.popitem(last=False)
+            else:
+                self._tabla.move_to_end(fp_id)
+            estadistica.observar(ms, ruta)
+
+        if ms >= SLOW_QUERY_MS:
+            logger.warning(
+                "Consulta lenta %.1f ms [%s] ruta=%s sql=%s params=%s",
+                ms, fp_id, ruta, " ".join(statement.split()), repr(parameters)[:MAX_PARAMS_LOG]
+            )
+
+    def tabla(self, orden: str = "total_ms", limite: int = 50) -> list:
+        with self._lock:
+            filas = [e.resumen(fp_id) for fp_id, e in self._tabla.items()]
+        return sorted(filas, key=lambda f: f[orden], reverse=True)[:limite]
+
+    def reiniciar(self):
+        with self._lock:
+            self._tabla.clear()
+
+
+registro_consultas = RegistroConsultas()
+
+
+class RutaConsultaMiddleware:
+    """Expone el scope de la petición a los eventos del engine (vía ContextVar)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _scope_actual.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _scope_actual.reset(token)
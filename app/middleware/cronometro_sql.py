@@ -0,0 +1,56 @@
+import threading
+import time
+from typing import Callable, Dict, List
+
+from sqlalchemy import event
+
+# Observador de la duración de cada sentencia: (statement, parameters, ms)
+Observador = Callable[[str, object, float], None]
+
+
+class CronometroSQL:
+    """
+    Un único par de eventos before/after_cursor_execute por engine que mide
+    cada sentencia y reparte la duración entre los observadores registrados
+    (registro de consultas, latencia para la admisión).
+
+    El inicio se apila en `conn.info` (una ejecución puede anidar otra desde
+    un evento); si la sentencia falla, `handle_error` saca su entrada para que
+    la pila no crezca ni desalinee las mediciones siguientes de la conexión.
+    """
+
+    CLAVE = "cronometro_sql"
+
+    def __init__(self):
+        self._observadores: Dict[object, List[Observador]] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, engine, observador: Observador):
+        with self._lock:
+            observadores = self._observadores.get(engine)
+            if observadores is not None:
+                observadores.append(observador)
+                return
+            observadores = self._observadores[engine] = [observador]
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _inicio(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault(self.CLAVE, []).append((context, time.perf_counter()))
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _fin(conn, cursor, statement, parameters, context, executemany):
+            _, inicio = conn.info[self.CLAVE].pop()
+            ms = (time.perf_counter() - inicio) * 1000
+            for observador in observadores:
+                observador(statement, parameters, ms)
+
+        @event.listens_for(engine, "handle_error")
+        def _error(contexto):
+            conexion = contexto.connection
+            pila = conexion.info.get(self.CLAVE) if conexion is not None else None
+            # Solo si el error es de la sentencia cronometrada (no p. ej. al conectar)
+            if pila and contexto.execution_context is not None and pila[-1][0] is contexto.execution_context:
+                pila.pop()
+
+
+cronometro_sql = CronometroSQL()
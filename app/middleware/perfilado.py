@@ -0,0 +1,312 @@
+import functools
+import hmac
+import inspect
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from fastapi import Header, HTTPException, status
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+# Perfilado bajo demanda: con PROFILE_TOKEN, las peticiones con el header
+# `X-Profile: <token>` se perfilan; con PROFILE_SAMPLE_RATE, esa fracción
+# de todas. Sin ninguno de los dos el middleware no se instala.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("/tmp", "tasks-api-profiles"))
+PROFILE_MAX = int(os.getenv("PROFILE_MAX", "100"))
+
+HEADER_PROFILE = b"x-profile"
+TOP_FUNCIONES = 25
+
+# Muestreador de la petición perfilada en curso: llega con el contexto a los
+# hilos del threadpool donde corren sus endpoints y dependencias síncronos
+muestreador_actual: ContextVar = ContextVar("muestreador_actual", default=None)
+
+
+def habilitado() -> bool:
+    return bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+
+
+def token_valido(valor) -> bool:
+    """True si `valor` (str o bytes) es PROFILE_TOKEN; sin token configurado, nunca."""
+    if not PROFILE_TOKEN or valor is None:
+        return False
+    if isinstance(valor, str):
+        valor = valor.encode()
+    return hmac.compare_digest(valor, PROFILE_TOKEN.encode())
+
+
+def requerir_token(x_profile: Optional[str] = Header(None)):
+    """Dependencia de los endpoints de perfiles: exigen `X-Profile: <PROFILE_TOKEN>`."""
+    if not token_valido(x_profile):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Se requiere el header X-Profile con el token de perfilado"
+        )
+
+
+def _nombre_frame(code) -> str:
+    archivo = code.co_filename
+    for marca in ("site-packages/", "/app/"):
+        if marca in archivo:
+            archivo = archivo.split(marca, 1)[1]
+            if marca == "/app/":
+                archivo = "app/" + archivo
+            break
+    else:
+        archivo = os.path.basename(archivo)
+    return f"{archivo}:{code.co_name}"
+
+
+class Muestreador:
+    """
+    Muestreador de stacks por tiempo de pared.
+
+    Cada PROFILE_INTERVAL toma el stack del hilo del event loop y de los
+    workers del threadpool que están corriendo código de esta petición (los
+    registra `_marcar_hilo`); los de otras peticiones concurrentes no entran.
+    Acumula stacks colapsados `hilo;frame;...;frame`.
+    """
+
+    def __init__(self, hilo_loop: int):
+        self.hilo_loop = hilo_loop
+        self.stacks: Counter = Counter()
+        self.muestras = 0
+        self._workers: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self.inicio = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duracion = time.perf_counter() - self.inicio
+
+    def agregar_hilo(self, ident: int):
+        with self._lock:
+            self._workers[ident] += 1
+
+    def quitar_hilo(self, ident: int):
+        with self._lock:
+            self._workers[ident] -= 1
+            if self._workers[ident] <= 0:
+                del self._workers[ident]
+
+    def _hilos(self):
+        with self._lock:
+            workers = list(self._workers)
+        return {self.hilo_loop: "loop"} | {ident: "worker" for ident in workers}
+
+    def _run(self):
+        while not self._stop.wait(PROFILE_INTERVAL):
+            hilos = self._hilos()
+            for ident, frame in sys._current_frames().items():
+                etiqueta = hilos.get(ident)
+                if etiqueta is None:
+                    continue
+
+                pila = []
+                while frame is not None:
+                    pila.append(frame.f_code)
+                    frame = frame.f_back
+
+                self.stacks[";".join([etiqueta] + [_nombre_frame(c) for c in reversed(pila)])] += 1
+            self.muestras += 1
+
+    def resumen(self) -> dict:
+        propio = Counter()
+        inclusivo = Counter()
+        for stack, n in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if frames:
+                propio[frames[-1]] += n
+            # Inclusivo solo para el código de la app (endpoints, servicios)
+            for frame in set(frames):
+                if frame.startswith("app/"):
+                    inclusivo[frame] += n
+
+        return {
+            "duracion_ms": round(self.duracion * 1000, 2),
+            "intervalo_ms": PROFILE_INTERVAL * 1000,
+            "muestras": self.muestras,
+            "top_propio": [{"funcion": f, "muestras": n} for f, n in propio.most_common(TOP_FUNCIONES)],
+            "top_app_inclusivo": [{"funcion": f, "muestras": n} for f, n in inclusivo.most_common(TOP_FUNCIONES)],
+        }
+
+    def colapsado(self) -> str:
+        """Formato de stacks colapsados (flamegraph.pl, speedscope, inferno)."""
+        return "".join(f"{stack} {n}\n" for stack, n in sorted(self.stacks.items()))
+
+
+def _marcar_hilo(funcion):
+    """Envolver un endpoint o dependencia síncrono para que registre su hilo en el muestreador."""
+    @functools.wraps(funcion)
+    def envuelta(*args, **kwargs):
+        muestreador = muestreador_actual.get()
+        if muestreador is None:
+            return funcion(*args, **kwargs)
+        ident = threading.get_ident()
+        muestreador.agregar_hilo(ident)
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            muestreador.quitar_hilo(ident)
+    return envuelta
+
+
+def _sincronica(funcion) -> bool:
+    return inspect.isfunction(funcion) and not (
+        inspect.iscoroutinefunction(funcion)
+        or inspect.isgeneratorfunction(funcion)
+        or inspect.isasyncgenfunction(funcion)
+    )
+
+
+def instrumentar(app):
+    """
+    Envolver con `_marcar_hilo` los endpoints y dependencias síncronos (no
+    generadores) de las rutas de `app`. Se llama después de incluir los routers.
+    """
+    pendientes = [ruta.dependant for ruta in app.routes if isinstance(ruta, APIRoute)]
+    vistos = set()
+    while pendientes:
+        dependant = pendientes.pop()
+        if id(dependant) in vistos:
+            continue
+        vistos.add(id(dependant))
+        if _sincronica(dependant.call):
+            dependant.call = _marcar_hilo(dependant.call)
+        pendientes.extend(dependant.dependencies)
+
+
+class AlmacenPerfiles:
+    """Perfiles en disco (PROFILE_DIR), conservando solo los PROFILE_MAX más recientes."""
+
+    def __init__(self, directorio: str = PROFILE_DIR, maximo: int = PROFILE_MAX):
+        self.directorio = directorio
+        self.maximo = maximo
+        self._ids = deque()
+        self._lock = threading.Lock()
+
+    def _ruta(self, perfil_id: str, extension: str) -> str:
+        return os.path.join(self.directorio, f"{perfil_id}.{extension}")
+
+    def guardar(self, resumen: dict, colapsado: str) -> str:
+        perfil_id = uuid.uuid4().hex
+        os.makedirs(self.directorio, exist_ok=True)
+        with open(self._ruta(perfil_id, "json"), "w") as f:
+            json.dump(resumen, f)
+        with open(self._ruta(perfil_id, "folded"), "w") as f:
+            f.write(colapsado)
+
+        with self._lock:
+            self._ids.append(perfil_id)
+            viejos = [self._ids.popleft() for _ in range(max(len(self._ids) - self.maximo, 0))]
+        for viejo in viejos:
+            for extension in ("json", "folded"):
+                try:
+                    os.remove(self._ruta(viejo, extension))
+                except FileNotFoundError:
+                    pass
+        return perfil_id
+
+    def resumen(self, perfil_id: str) -> Optional[dict]:
+        try:
+            with open(self._ruta(perfil_id, "json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def colapsado(self, perfil_id: str) -> Optional[str]:
+        try:
+            with open(self._ruta(perfil_id, "folded")) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def listar(self) -> list:
+        with self._lock:
+            return list(reversed(self._ids))
+
+
+almacen = AlmacenPerfiles()
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI que perfila las peticiones elegidas (header autenticado o
+    muestreo) y devuelve el ID del perfil en `X-Profile-Id`. El perfil se
+    consulta en `/internal/profiles/{id}`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _elegida(self, scope) -> bool:
+        if token_valido(dict(scope.get("headers", [])).get(HEADER_PROFILE)):
+            return True
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/internal") or not self._elegida(scope):
+            await self.app(scope, receive, send)
+            return
+
+        muestreador = Muestreador(threading.get_ident())
+        estado: Dict = {}
+        inicio = None
+
+        def cerrar():
+            muestreador.stop()
+            resumen = {
+                "metodo": scope["method"],
+                "ruta": scope["path"],
+                "query": scope.get("query_string", b"").decode(),
+                "status": estado.get("status"),
+                **muestreador.resumen(),
+            }
+            estado["perfil_id"] = almacen.guardar(resumen, muestreador.colapsado())
+
+        async def send_perfilado(message):
+            nonlocal inicio
+            if message["type"] == "http.response.start":
+                # Se retiene hasta el final del cuerpo para agregar X-Profile-Id
+                estado["status"] = message["status"]
+                inicio = message
+                return
+
+            fin = message["type"] == "http.response.body" and not message.get("more_body", False)
+            if fin:
+                # Espera al hilo del muestreador y escribe a disco: fuera del event loop
+                await run_in_threadpool(cerrar)
+            if inicio is not None:
+                if fin:
+                    inicio["headers"] = list(inicio.get("headers", [])) + [
+                        (b"x-profile-id", estado["perfil_id"].encode())
+                    ]
+                await send(inicio)
+                inicio = None
+            await send(message)
+
+        muestreador.start()
+        token = muestreador_actual.set(muestreador)
+        try:
+            await self.app(scope, receive, send_perfilado)
+        finally:
+            muestreador_actual.reset(token)
+            if "perfil_id" not in estado:
+                await run_in_threadpool(cerrar)
@@ -2,5 +2,10 @@ from app.models.team import Team
 from app.models.user import User
 from app.models.user_team import UserTeam
 from app.models.task import Task, TaskStatus, TaskPriority
+from app.models.task_archive import TaskArchive
+from app.models.job import Job, JobStatus
+from app.models.team_throughput import TeamThroughput
+from app.models.team_shard import TeamShard
+from app.models.secuencia import Secuencia
 
-__all__ = ["Team", "User", "UserTeam", "Task", "TaskStatus", "TaskPriority"]
\ No newline at end of file
+__all__ = ["Team", "User", "UserTeam", "Task", "TaskStatus", "TaskPriority", "TaskArchive", "Job", "JobStatus", "TeamThroughput", "TeamShard", "Secuencia"]
\ No newline at end of file
@@ -0,0 +1,45 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index, Enum as SQLEnum
+from datetime import datetime
+from app.database import Base
+import enum
+
+class JobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    # Búsqueda de trabajos listos para ejecutarse
+    __table_args__ = (
+        Index("ix_jobs_estado_run_after", "estado", "run_after"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String(100), nullable=False)
+    payload = Column(JSON, nullable=True)
+    
+    estado = Column(
+        SQLEnum(JobStatus),
+        default=JobStatus.PENDING,
+        nullable=False
+    )
+    progreso = Column(JSON, nullable=True)
+    resultado = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    
+    # Reintentos con backoff
+    intentos = Column(Integer, default=0, nullable=False)
+    max_intentos = Column(Integer, default=3, nullable=False)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Reclamo del trabajo por un worker
+    locked_by = Column(String(100), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    
+    # Fechas
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
\ No newline at end of file
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, BigInteger, String
+from app.database import Base
+
+class Secuencia(Base):
+    """Contadores globales (IDs de tareas únicos entre shards), reservados por bloques"""
+    __tablename__ = "secuencias"
+    
+    nombre = Column(String(50), primary_key=True)
+    siguiente = Column(BigInteger, nullable=False)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, SmallInteger, String, Text, DateTime, ForeignKey, Index, Enum as SQLEnum
+from sqlalchemy.orm import validates
 from datetime import datetime
 from app.database import Base
 import enum
@@ -16,9 +17,43 @@ class TaskPriority(str, enum.Enum):
     HIGH = "high"
     URGENT = "urgent"
 
+# Orden semántico de prioridad (el enum se ordenaría alfabéticamente)
+PRIORIDAD_ORDEN = {
+    TaskPriority.LOW: 1,
+    TaskPriority.MEDIUM: 2,
+    TaskPriority.HIGH: 3,
+    TaskPriority.URGENT: 4,
+}
+
 class Task(Base):
     __tablename__ = "tasks"
     
+    # Índices para ordenar sin filesort: (clave, id) y (team_id|asignado_a, clave, id).
+    # Los filtros por estado/prioridad se evalúan sobre el índice ya ordenado.
+    __table_args__ = (
+        # Orden por defecto (ID) con filtro de equipo o de asignado
+        Index("ix_tasks_team_id", "team_id", "id"),
+        Index("ix_tasks_asignado_id", "asignado_a", "id"),
+        Index("ix_tasks_due_date_id", "due_date", "id"),
+        Index("ix_tasks_team_due_date_id", "team_id", "due_date", "id"),
+        Index("ix_tasks_asignado_due_date_id", "asignado_a", "due_date", "id"),
+        Index("ix_tasks_prioridad_id", "prioridad_orden", "id"),
+        Index("ix_tasks_team_prioridad_id", "team_id", "prioridad_orden", "id"),
+        Index("ix_tasks_asignado_prioridad_id", "asignado_a", "prioridad_orden", "id"),
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_team_created_at_id", "team_id", "created_at", "id"),
+        Index("ix_tasks_asignado_created_at_id", "asignado_a", "created_at", "id"),
+        Index("ix_tasks_updated_at_id", "updated_at", "id"),
+        Index("ix_tasks_team_updated_at_id", "team_id", "updated_at", "id"),
+        Index("ix_tasks_asignado_updated_at_id", "asignado_a", "updated_at", "id"),
+        # Dashboard de usuario: conteos agrupados por equipo, estado y prioridad sin leer la tabla
+        Index("ix_tasks_asignado_resumen", "asignado_a", "team_id", "estado", "prioridad", "due_date"),
+        # Vencimientos: el prefijo de estado deja fuera completadas y canceladas
+        Index("ix_tasks_estado_due_date", "estado", "due_date"),
+        # Archivado: que SQLite no reutilice IDs de tareas movidas a tasks_archive
+        {"sqlite_autoincrement": True},
+    )
+    
     id = Column(Integer, primary_key=True, index=True)
     titulo = Column(String(200), nullable=False)
     descripcion = Column(Text, nullable=True)
@@ -34,6 +69,11 @@ class Task(Base):
         default=TaskPriority.MEDIUM,
         nullable=False
     )
+    prioridad_orden = Column(
+        SmallInteger,
+        default=PRIORIDAD_ORDEN[TaskPriority.MEDIUM],
+        nullable=False
+    )
     
     # Relaciones (Foreign Keys)
     team_id = Column(Integer, ForeignKey("teams.id", ondelete="CASCADE"), nullable=False)
@@ -43,4 +83,15 @@ class Task(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     due_date = Column(DateTime, nullable=True)  # Fecha de vencimiento
-    completed_at = Column(DateTime, nullable=True)  # Fecha de finalización
\ No newline at end of file
+    completed_at = Column(DateTime, nullable=True)  # Fecha de finalización
+    
+    # Control de concurrencia optimista: cada UPDATE lleva `WHERE version = ?`
+    version = Column(Integer, nullable=False, server_default="1")
+    
+    __mapper_args__ = {"version_id_col": version}
+    
+    @validates("prioridad")
+    def _sincronizar_prioridad_orden(self, key, value):
+        # Mantener la columna de orden alineada con la prioridad
+        self.prioridad_orden = PRIORIDAD_ORDEN[TaskPriority(value)]
+        return value
\ No newline at end of file
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, SmallInteger, String, Text, DateTime, ForeignKey, Enum as SQLEnum
+from datetime import datetime
+from app.database import Base
+from app.models.task import TaskStatus, TaskPriority
+
+class TaskArchive(Base):
+    """Tareas completadas o canceladas hace tiempo, fuera de la tabla caliente"""
+    __tablename__ = "tasks_archive"
+    
+    # Mismo ID que tenía en `tasks` para poder restaurarla
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    titulo = Column(String(200), nullable=False)
+    descripcion = Column(Text, nullable=True)
+    
+    estado = Column(SQLEnum(TaskStatus), nullable=False)
+    prioridad = Column(SQLEnum(TaskPriority), nullable=False)
+    prioridad_orden = Column(SmallInteger, nullable=False)
+    
+    team_id = Column(Integer, ForeignKey("teams.id", ondelete="CASCADE"), nullable=False, index=True)
+    asignado_a = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    due_date = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    version = Column(Integer, nullable=False, server_default="1")
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+# Columnas compartidas con `tasks`, en el mismo orden, para copiar filas entre tablas
+COLUMNAS_COMPARTIDAS = [
+    "id", "titulo", "descripcion", "estado", "prioridad", "prioridad_orden",
+    "team_id", "asignado_a", "created_at", "updated_at", "due_date", "completed_at",
+    "version",
+]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
 from datetime import datetime
 from app.database import Base
 
@@ -8,5 +8,11 @@ class Team(Base):
     id = Column(Integer, primary_key=True, index=True)
     nombre = Column(String(100), unique=True, nullable=False, index=True)
     descripcion = Column(Text, nullable=True)
+    eliminando = Column(Boolean, default=False, nullable=False, index=True)  # Borrado en segundo plano
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    # Control de concurrencia optimista: cada UPDATE lleva `WHERE version = ?`
+    version = Column(Integer, nullable=False, server_default="1")
+    
+    __mapper_args__ = {"version_id_col": version}
\ No newline at end of file
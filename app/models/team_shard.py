@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Boolean, DateTime, ForeignKey
+from datetime import datetime
+from app.database import Base
+
+class TeamShard(Base):
+    """Shard donde viven las tareas de un equipo (sin fila: shard 0)"""
+    __tablename__ = "team_shards"
+    
+    team_id = Column(Integer, ForeignKey("teams.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(Integer, nullable=False)
+    
+    # Durante un movimiento: shard con una copia parcial u obsoleta de las
+    # tareas del equipo, que las lecturas repartidas deben ignorar
+    shard_copia = Column(Integer, nullable=True)
+    
+    # Corte final de un movimiento: las escrituras del equipo responden 503
+    bloqueado = Column(Boolean, default=False, nullable=False)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
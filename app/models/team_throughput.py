@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey, UniqueConstraint
+from app.database import Base
+
+# Límites superiores (en horas) de los buckets del histograma de cycle time;
+# el último bucket acumula todo lo que supere el penúltimo límite.
+CICLO_BUCKETS_HORAS = (1, 4, 12, 24, 48, 72, 120, 168, 336, 720, 1440, 2880)
+
+class TeamThroughput(Base):
+    """Rollup diario de tareas creadas y completadas por equipo"""
+    __tablename__ = "team_throughput"
+    
+    __table_args__ = (
+        UniqueConstraint("team_id", "fecha", name="uq_team_throughput_team_fecha"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    team_id = Column(Integer, ForeignKey("teams.id", ondelete="CASCADE"), nullable=False)
+    fecha = Column(Date, nullable=False)
+    
+    creadas = Column(Integer, default=0, nullable=False)
+    completadas = Column(Integer, default=0, nullable=False)
+    
+    # Histograma de cycle time (created_at -> completed_at) de las completadas ese día
+    ciclo_b0 = Column(Integer, default=0, nullable=False)
+    ciclo_b1 = Column(Integer, default=0, nullable=False)
+    ciclo_b2 = Column(Integer, default=0, nullable=False)
+    ciclo_b3 = Column(Integer, default=0, nullable=False)
+    ciclo_b4 = Column(Integer, default=0, nullable=False)
+    ciclo_b5 = Column(Integer, default=0, nullable=False)
+    ciclo_b6 = Column(Integer, default=0, nullable=False)
+    ciclo_b7 = Column(Integer, default=0, nullable=False)
+    ciclo_b8 = Column(Integer, default=0, nullable=False)
+    ciclo_b9 = Column(Integer, default=0, nullable=False)
+    ciclo_b10 = Column(Integer, default=0, nullable=False)
+    ciclo_b11 = Column(Integer, default=0, nullable=False)
+
+CICLO_COLUMNAS = [getattr(TeamThroughput, f"ciclo_b{i}") for i in range(len(CICLO_BUCKETS_HORAS))]
\ No newline at end of file
@@ -10,4 +10,9 @@ class User(Base):
     email = Column(String(100), unique=True, nullable=False, index=True)
     activo = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    # Control de concurrencia optimista: cada UPDATE lleva `WHERE version = ?`
+    version = Column(Integer, nullable=False, server_default="1")
+    
+    __mapper_args__ = {"version_id_col": version}
\ No newline at end of file
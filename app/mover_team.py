@@ -0,0 +1,234 @@
+"""
+Mover las tareas de un equipo a otro shard sin detener la API.
+
+    SHARD_URLS=... python -m app.mover_team 42 1
+
+Pasos (entre cambios del mapa se espera a que todos los procesos lo recarguen):
+  1. Marcar el destino como copia (las lecturas repartidas lo ignoran).
+  2. Copiar tareas, archivo y rollup de throughput en bloques, sin bloquear.
+  3. Bloquear las escrituras del equipo (503 con Retry-After) y esperar las
+     que ya estaban en vuelo.
+  4. Sincronizar lo que cambió durante la copia: tareas por (id, version),
+     archivo por ids y el rollup completo.
+  5. Apuntar el equipo al destino y desbloquear; el origen pasa a ser la copia.
+  6. Borrar en bloques las filas del origen.
+"""
+import argparse
+import sys
+import time
+
+from sqlalchemy import delete, insert, select
+
+from app.database import SHARDS, SessionLocal
+from app.models.task import Task
+from app.models.task_archive import TaskArchive
+from app.models.team import Team
+from app.models.team_shard import TeamShard
+from app.models.team_throughput import TeamThroughput
+from app.services.shards import SHARD_MAP_TTL
+
+CHUNK_SIZE = 1000
+MARGEN = 1.0  # segundos extra sobre el TTL del mapa
+
+
+def _actualizar_mapa(team_id: int, **valores):
+    db = SessionLocal()
+    try:
+        fila = db.get(TeamShard, team_id)
+        if fila is None:
+            fila = TeamShard(team_id=team_id, shard=0)
+            db.add(fila)
+        for campo, valor in valores.items():
+            setattr(fila, campo, valor)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _esperar(segundos: float):
+    print(f"   ⏳ Esperando {segundos:.1f}s a que los procesos recarguen el mapa...")
+    time.sleep(segundos)
+
+
+def _filas(db, tabla, team_id: int, ids=None, columnas=None):
+    """Filas del equipo en bloques ordenados por id (o solo las de `ids`)."""
+    columnas = columnas or list(tabla.c)
+    if ids is not None:
+        ids = sorted(ids)
+        for i in range(0, len(ids), CHUNK_SIZE):
+            yield db.execute(select(*columnas).where(tabla.c.id.in_(ids[i:i + CHUNK_SIZE]))).mappings().all()
+        return
+
+    ultimo = 0
+    while True:
+        bloque = db.execute(
+            select(*columnas)
+            .where(tabla.c.team_id == team_id, tabla.c.id > ultimo)
+            .order_by(tabla.c.id)
+            .limit(CHUNK_SIZE)
+        ).mappings().all()
+        if not bloque:
+            return
+        yield bloque
+        ultimo = bloque[-1]["id"]
+
+
+def _copiar(origen, destino, tabla, team_id: int, ids=None) -> int:
+    copiadas = 0
+    for bloque in _filas(origen, tabla, team_id, ids):
+        destino.execute(insert(tabla), [dict(fila) for fila in bloque])
+        destino.commit()
+        copiadas += len(bloque)
+    return copiadas
+
+
+def _borrar(db, tabla, team_id: int, ids=None) -> int:
+    """Borrar en bloques las filas del equipo (o solo las de `ids`)."""
+    borradas = 0
+    bloques = _filas(db, tabla, team_id, ids, columnas=[tabla.c.id])
+    for bloque in bloques:
+        db.execute(delete(tabla).where(tabla.c.id.in_([fila["id"] for fila in bloque])))
+        db.commit()
+        borradas += len(bloque)
+    return borradas
+
+
+def _copiar_throughput(origen, destino, team_id: int) -> int:
+    # El id del rollup es local a cada shard: se copia sin él
+    tabla = TeamThroughput.__table__
+    destino.execute(delete(tabla).where(tabla.c.team_id == team_id))
+    filas = origen.execute(
+        select(*[c for c in tabla.c if c.key != "id"]).where(tabla.c.team_id == team_id)
+    ).mappings().all()
+    if filas:
+        destino.execute(insert(tabla), [dict(fila) for fila in filas])
+    destino.commit()
+    return len(filas)
+
+
+def _versiones(db, team_id: int) -> dict:
+    tabla = Task.__table__
+    return dict(db.execute(select(tabla.c.id, tabla.c.version).where(tabla.c.team_id == team_id)).all())
+
+
+def _ids(db, tabla, team_id: int) -> set:
+    return set(db.execute(select(tabla.c.id).where(tabla.c.team_id == team_id)).scalars())
+
+
+def _sincronizar(origen, destino, team_id: int):
+    tasks, archivo = Task.__table__, TaskArchive.__table__
+
+    en_origen, en_destino = _versiones(origen, team_id), _versiones(destino, team_id)
+    distintas = {task_id for task_id, version in en_origen.items() if en_destino.get(task_id) != version}
+    sobrantes = set(en_destino) - set(en_origen)
+    _borrar(destino, tasks, team_id, (distintas & set(en_destino)) | sobrantes)
+    _copiar(origen, destino, tasks, team_id, distintas)
+    print(f"   📋 Tareas: {len(distintas)} copiadas de nuevo, {len(sobrantes)} sobrantes borradas")
+
+    ids_origen, ids_destino = _ids(origen, archivo, team_id), _ids(destino, archivo, team_id)
+    _borrar(destino, archivo, team_id, ids_destino - ids_origen)
+    _copiar(origen, destino, archivo, team_id, ids_origen - ids_destino)
+    print(f"   🗄️  Archivo: {len(ids_origen - ids_destino)} copiadas, {len(ids_destino - ids_origen)} borradas")
+
+    print(f"   📈 Throughput: {_copiar_throughput(origen, destino, team_id)} filas")
+
+
+def mover_team(team_id: int, destino: int):
+    if len(SHARDS) < 2:
+        print("❌ Sharding desactivado: configura SHARD_URLS")
+        sys.exit(1)
+    if not 0 <= destino < len(SHARDS):
+        print(f"❌ Shard destino inválido: hay {len(SHARDS)} shards (0 a {len(SHARDS) - 1})")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        team = db.get(Team, team_id)
+        if team is None or team.eliminando:
+            print(f"❌ Equipo con ID {team_id} no encontrado")
+            sys.exit(1)
+        fila = db.get(TeamShard, team_id)
+        origen = fila.shard if fila else 0
+        copia = fila.shard_copia if fila else None
+    finally:
+        db.close()
+
+    if copia is not None and origen == destino:
+        # Interrumpido después de apuntar al destino: solo falta limpiar el origen
+        _limpiar_origen(team_id, copia)
+        return
+    if copia is not None and copia != destino:
+        print(f"❌ El equipo {team_id} tiene un movimiento sin terminar hacia el shard {copia}")
+        sys.exit(1)
+    if origen == destino:
+        print(f"✅ El equipo {team_id} ya está en el shard {destino}")
+        return
+
+    espera = SHARD_MAP_TTL + MARGEN
+    odb, ddb = SHARDS[origen](), SHARDS[destino]()
+    try:
+        print(f"🚚 Moviendo el equipo {team_id} ('{team.nombre}') del shard {origen} al {destino}")
+
+        print("1️⃣  Marcando el destino como copia")
+        _actualizar_mapa(team_id, shard=origen, shard_copia=destino, bloqueado=False)
+        _esperar(espera)
+
+        print("2️⃣  Copiando en segundo plano")
+        # Restos de un intento anterior interrumpido
+        for modelo in (Task, TaskArchive, TeamThroughput):
+            _borrar(ddb, modelo.__table__, team_id)
+        for modelo in (Task, TaskArchive):
+            copiadas = _copiar(odb, ddb, modelo.__table__, team_id)
+            print(f"   📦 {modelo.__tablename__}: {copiadas} filas")
+        print(f"   📈 Throughput: {_copiar_throughput(odb, ddb, team_id)} filas")
+
+        print("3️⃣  Bloqueando escrituras del equipo")
+        inicio_bloqueo = time.monotonic()
+        _actualizar_mapa(team_id, bloqueado=True)
+        # Un TTL para que todos vean el bloqueo y otro para las escrituras en vuelo
+        _esperar(2 * SHARD_MAP_TTL + MARGEN)
+
+        print("4️⃣  Sincronizando cambios durante la copia")
+        _sincronizar(odb, ddb, team_id)
+
+        print("5️⃣  Apuntando el equipo al nuevo shard")
+        _actualizar_mapa(team_id, shard=destino, shard_copia=origen, bloqueado=False)
+        print(f"   🔓 Escrituras bloqueadas durante {time.monotonic() - inicio_bloqueo:.1f}s")
+        _esperar(espera)
+
+    except Exception as e:
+        print(f"❌ Error durante el movimiento: {e}")
+        print("   El mapa quedó en el último paso completado; vuelve a ejecutar el comando")
+        odb.rollback()
+        ddb.rollback()
+        raise
+    finally:
+        odb.close()
+        ddb.close()
+
+    _limpiar_origen(team_id, origen)
+    print(f"✅ Equipo {team_id} movido al shard {destino}")
+
+
+def _limpiar_origen(team_id: int, origen: int):
+    print("6️⃣  Borrando las filas del shard de origen")
+    odb = SHARDS[origen]()
+    try:
+        for modelo in (Task, TaskArchive, TeamThroughput):
+            borradas = _borrar(odb, modelo.__table__, team_id)
+            print(f"   🗑️  {modelo.__tablename__}: {borradas} filas")
+    finally:
+        odb.close()
+    _actualizar_mapa(team_id, shard_copia=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.mover_team", description="Mover un equipo a otro shard")
+    parser.add_argument("team_id", type=int, help="Equipo a mover")
+    parser.add_argument("destino", type=int, help="Shard destino (0 = DATABASE_URL)")
+    args = parser.parse_args()
+    mover_team(args.team_id, args.destino)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Presupuesto de latencia de `GET /users/{id}/dashboard`: pide el resumen de un
+usuario con muchos equipos y tareas y falla (código 1) si el p95 supera el
+presupuesto o si alguna petición hace más de CONSULTAS_DASHBOARD consultas.
+
+    python -m app.presupuesto_latencia --equipos 200 --tareas 20000 --p95-ms 50
+    python -m app.presupuesto_latencia --user-id 3
+
+Sin `--user-id` genera los datos (un usuario miembro de `--equipos` equipos
+con `--tareas` tareas asignadas) y necesita una base vacía. El presupuesto
+por defecto sale de PRESUPUESTO_DASHBOARD_MS. Sin sharding.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.database import ENGINES, SessionLocal
+from app.main import app
+from app.middleware.cronometro_sql import cronometro_sql
+from app.models.task import PRIORIDAD_ORDEN, Task, TaskPriority, TaskStatus
+from app.models.team import Team
+from app.models.user import User
+from app.models.user_team import UserTeam
+from app.services import shards
+
+PRESUPUESTO_DASHBOARD_MS = float(os.getenv("PRESUPUESTO_DASHBOARD_MS", "50"))
+
+# Usuario, equipos, conteos agrupados y próximas tareas, más los equipos de
+# tareas asignadas en equipos de los que no es miembro (solo si las hay)
+CONSULTAS_DASHBOARD = 5
+
+LOTE = 10000
+
+consultas = []
+
+
+def generar(equipos: int, tareas: int) -> int:
+    """Crear el usuario, sus equipos y sus tareas; devuelve el ID del usuario."""
+    db = SessionLocal()
+    try:
+        if db.query(Team.id).first() is not None:
+            print("❌ La base de datos ya tiene datos: usar --user-id o una base vacía")
+            sys.exit(1)
+
+        user = User(nombre="Usuario presupuesto", email="presupuesto@company.com", activo=True)
+        db.add(user)
+        db.flush()
+
+        ahora = datetime.utcnow()
+        db.execute(insert(Team), [
+            {"id": i, "nombre": f"Equipo presupuesto {i}", "created_at": ahora, "updated_at": ahora}
+            for i in range(1, equipos + 1)
+        ])
+        db.execute(insert(UserTeam), [
+            {"user_id": user.id, "team_id": i, "role": "member", "joined_at": ahora}
+            for i in range(1, equipos + 1)
+        ])
+
+        estados = list(TaskStatus)
+        prioridades = list(TaskPriority)
+        for inicio in range(0, tareas, LOTE):
+            filas = []
+            for i in range(inicio, min(inicio + LOTE, tareas)):
+                prioridad = prioridades[i % len(prioridades)]
+                filas.append({
+                    "titulo": f"Tarea presupuesto {i}",
+                    "estado": estados[i % len(estados)],
+                    "prioridad": prioridad,
+                    "prioridad_orden": PRIORIDAD_ORDEN[prioridad],
+                    "team_id": 1 + i % equipos,
+                    "asignado_a": user.id,
+                    "created_at": ahora,
+                    "updated_at": ahora,
+                    "due_date": ahora + timedelta(hours=i % 2000 - 500) if i % 5 else None,
+                })
+            db.execute(insert(Task), filas)
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def _percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.presupuesto_latencia", description="Presupuesto de latencia del dashboard de usuario")
+    parser.add_argument("--user-id", type=int, help="Usuario existente (si no, se generan los datos)")
+    parser.add_argument("--equipos", type=int, default=200)
+    parser.add_argument("--tareas", type=int, default=20000)
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--p95-ms", type=float, default=PRESUPUESTO_DASHBOARD_MS)
+    args = parser.parse_args()
+
+    if shards.habilitado():
+        print("❌ Ejecutar sin SHARD_URLS")
+        sys.exit(1)
+
+    if args.user_id is None:
+        print(f"🌱 Generando {args.equipos} equipos y {args.tareas:,} tareas")
+        user_id = generar(args.equipos, args.tareas)
+    else:
+        user_id = args.user_id
+
+    for e in ENGINES:
+        cronometro_sql.registrar(e, lambda statement, parameters, ms: consultas.append(statement))
+
+    cliente = TestClient(app)
+    # Calentar el cache de sentencias y el de páginas de SQLite
+    for _ in range(5):
+        respuesta = cliente.get(f"/users/{user_id}/dashboard")
+        if respuesta.status_code != 200:
+            print(f"❌ HTTP {respuesta.status_code}: {respuesta.text}")
+            sys.exit(1)
+
+    tiempos = []
+    max_consultas = 0
+    for _ in range(args.peticiones):
+        consultas.clear()
+        inicio = time.perf_counter()
+        cliente.get(f"/users/{user_id}/dashboard")
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        max_consultas = max(max_consultas, len(consultas))
+
+    p50, p95 = _percentil(tiempos, 0.50), _percentil(tiempos, 0.95)
+    resumen = respuesta.json()
+    print(f"Usuario {user_id}: {len(resumen['teams'])} equipos, {sum(t['total_tasks'] for t in resumen['teams']):,} tareas")
+    print(f"{args.peticiones} peticiones: p50 {p50:.1f} ms, p95 {p95:.1f} ms (presupuesto {args.p95_ms:.0f} ms)")
+    print(f"Consultas por petición: como mucho {max_consultas} (límite {CONSULTAS_DASHBOARD})")
+
+    errores = []
+    if p95 > args.p95_ms:
+        errores.append(f"p95 {p95:.1f} ms sobre el presupuesto de {args.p95_ms:.0f} ms")
+    if max_consultas > CONSULTAS_DASHBOARD:
+        errores.append(f"{max_consultas} consultas en una petición (límite {CONSULTAS_DASHBOARD})")
+    if errores:
+        for error in errores:
+            print(f"❌ {error}")
+        sys.exit(1)
+    print("✅ Dentro del presupuesto")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Reproducir tráfico capturado por `CapturaMiddleware` y comparar corridas.
+
+    # Corrida en proceso contra una base SQLite nueva con los datos de ejemplo
+    DATABASE_URL=sqlite:///./replay.db python -m app.replay run captura.jsonl --seed --salida a.jsonl
+
+    # Corrida contra un servidor, al doble de la velocidad original
+    python -m app.replay run captura.jsonl --target http://localhost:8000 --velocidad 2 --salida b.jsonl
+
+    # Latencias por ruta y paridad de status entre dos corridas (o captura vs corrida)
+    python -m app.replay compare a.jsonl b.jsonl --max-regresion 0.2
+"""
+import argparse
+import asyncio
+import base64
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from typing import List, Optional
+
+import numpy as np
+
+from app.middleware.captura import CAPTURE_MAX_BODY
+
+PERCENTILES = (50, 95, 99)
+MIN_MUESTRAS_REGRESION = 20  # rutas con menos muestras no cuentan como regresión
+
+
+def _cargar(ruta: str) -> List[dict]:
+    with open(ruta, encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
+
+
+def _cuerpo(registro: dict) -> bytes:
+    if "body_b64" in registro:
+        return base64.b64decode(registro["body_b64"])
+    return registro.get("body", "").encode()
+
+
+async def _ejecutar_asgi(app, registro: dict) -> int:
+    """Ejecutar la petición en proceso a través de la app ASGI; devuelve el status."""
+    body = _cuerpo(registro)
+    headers = [(b"host", b"replay"), (b"content-length", str(len(body)).encode())]
+    headers += [(k.encode(), v.encode()) for k, v in registro.get("headers", {}).items()]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": registro["method"],
+        "scheme": "http",
+        "path": registro["path"],
+        "raw_path": registro["path"].encode(),
+        "root_path": "",
+        "query_string": registro.get("query", "").encode(),
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("replay", 80),
+    }
+
+    recibido = False
+
+    async def receive():
+        nonlocal recibido
+        if recibido:
+            return {"type": "http.disconnect"}
+        recibido = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    estado = {"status": None}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            estado["status"] = message["status"]
+
+    await app(scope, receive, send)
+    return estado["status"]
+
+
+def _ejecutar_http(base_url: str, registro: dict) -> Optional[int]:
+    url = base_url.rstrip("/") + registro["path"]
+    if registro.get("query"):
+        url += "?" + registro["query"]
+    body = _cuerpo(registro)
+    peticion = urllib.request.Request(
+        url,
+        data=body or None,
+        method=registro["method"],
+        headers=registro.get("headers", {})
+    )
+    try:
+        with urllib.request.urlopen(peticion, timeout=30) as respuesta:
+            respuesta.read()
+            return respuesta.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+    except urllib.error.URLError:
+        return None
+
+
+async def _reproducir(registros: List[dict], target: str, velocidad: Optional[float], concurrencia: int) -> List[dict]:
+    """
+    Lanzar cada petición en su instante original dividido por `velocidad`
+    (None = tan rápido como permita `concurrencia`). Las que tienen el cuerpo
+    truncado en la captura no se reproducen ni aparecen en el resultado.
+    """
+    semaforo = asyncio.Semaphore(concurrencia)
+    resultados: List[Optional[dict]] = [None] * len(registros)
+
+    if target == "inproc":
+        from app.main import app
+
+        async def ejecutar(registro):
+            return await _ejecutar_asgi(app, registro)
+    else:
+        app = None
+
+        async def ejecutar(registro):
+            return await asyncio.to_thread(_ejecutar_http, target, registro)
+
+    async def una(i: int, registro: dict):
+        async with semaforo:
+            inicio = time.perf_counter()
+            status = await ejecutar(registro)
+            resultados[i] = {
+                "i": i,
+                "method": registro["method"],
+                "route": registro.get("route", registro["path"]),
+                "status": status,
+                "status_original": registro.get("status"),
+                "latencia_ms": round((time.perf_counter() - inicio) * 1000, 3),
+            }
+
+    async def lanzar():
+        loop = asyncio.get_running_loop()
+        inicio = loop.time()
+        # La captura se escribe al terminar cada petición: se lanza por instante de llegada
+        orden = sorted(
+            (i for i, registro in enumerate(registros) if not registro.get("body_truncado")),
+            key=lambda i: registros[i].get("t", 0)
+        )
+        t0 = registros[orden[0]].get("t", 0) if orden else 0
+        tareas = []
+        for i in orden:
+            registro = registros[i]
+            if velocidad is not None:
+                espera = inicio + (registro.get("t", 0) - t0) / velocidad - loop.time()
+                if espera > 0:
+                    await asyncio.sleep(espera)
+            tareas.append(asyncio.create_task(una(i, registro)))
+        await asyncio.gather(*tareas)
+
+    if app is not None:
+        # Arranca los servicios en segundo plano igual que el servidor
+        async with app.router.lifespan_context(app):
+            await lanzar()
+    else:
+        await lanzar()
+
+    return [r for r in resultados if r is not None]
+
+
+def run(args):
+    registros = _cargar(args.captura)
+    velocidad = None if args.velocidad == "max" else (1.0 if args.velocidad == "original" else float(args.velocidad))
+
+    if args.seed:
+        import app.main  # noqa: F401 (crea las tablas)
+        from app.seed import seed_database
+        seed_database()
+
+    truncadas = sum(1 for r in registros if r.get("body_truncado"))
+    print(f"▶️  Reproduciendo {len(registros) - truncadas} peticiones contra {args.target} (velocidad {args.velocidad})")
+    if truncadas:
+        print(f"⚠️  {truncadas} omitidas: cuerpo de más de {CAPTURE_MAX_BODY // 1024} KiB, truncado en la captura")
+    inicio = time.perf_counter()
+    resultados = asyncio.run(_reproducir(registros, args.target, velocidad, args.concurrencia))
+    duracion = time.perf_counter() - inicio
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        for resultado in resultados:
+            f.write(json.dumps(resultado) + "\n")
+
+    distintos = sum(1 for r in resultados if r["status_original"] is not None and r["status"] != r["status_original"])
+    print(f"✅ {len(resultados)} peticiones en {duracion:.2f}s ({len(resultados) / duracion:.1f} req/s)")
+    print(f"   Status distinto al capturado: {distintos}")
+    print(f"   Resultados en {args.salida}")
+
+
+def _ruta(registro: dict) -> str:
+    return f"{registro['method']} {registro.get('route', registro.get('path'))}"
+
+
+def _por_ruta(registros: List[dict]) -> dict:
+    """Percentiles de latencia y número de muestras por ruta."""
+    rutas = defaultdict(list)
+    for r in registros:
+        if r.get("body_truncado"):
+            continue  # no se reproduce (ver `run`)
+        # Las capturas traen `duracion_ms`, las corridas `latencia_ms`
+        latencia = r.get("latencia_ms", r.get("duracion_ms"))
+        if latencia is not None:
+            rutas[_ruta(r)].append(latencia)
+    return {ruta: (np.percentile(valores, PERCENTILES), len(valores)) for ruta, valores in rutas.items()}
+
+
+def compare(args):
+    a = _cargar(args.a)
+    b = _cargar(args.b)
+    por_ruta_a = _por_ruta(a)
+    por_ruta_b = _por_ruta(b)
+
+    # Paridad de status por posición (la corrida conserva el orden de la captura)
+    status_a = {r.get("i", i): r.get("status") for i, r in enumerate(a) if not r.get("body_truncado")}
+    distintos = defaultdict(int)
+    for i, r in enumerate(b):
+        clave = r.get("i", i)
+        if clave in status_a and status_a[clave] != r.get("status"):
+            distintos[_ruta(r)] += 1
+
+    print(f"{'ruta':<45} {'n':>6} {'p50 A':>8} {'p50 B':>8} {'p95 A':>8} {'p95 B':>8} {'p99 A':>8} {'p99 B':>8} {'Δp95':>7} {'status≠':>7}")
+    regresiones = []
+    for ruta in sorted(set(por_ruta_a) | set(por_ruta_b)):
+        if ruta not in por_ruta_a or ruta not in por_ruta_b:
+            print(f"{ruta:<45} solo en {'A' if ruta in por_ruta_a else 'B'}")
+            continue
+        (pa, na), (pb, nb) = por_ruta_a[ruta], por_ruta_b[ruta]
+        delta = (pb[1] - pa[1]) / pa[1] if pa[1] else 0.0
+        n = min(na, nb)
+        print(
+            f"{ruta:<45} {n:>6} "
+            f"{pa[0]:>8.2f} {pb[0]:>8.2f} {pa[1]:>8.2f} {pb[1]:>8.2f} "
+            f"{pa[2]:>8.2f} {pb[2]:>8.2f} {delta:>+7.0%} {distintos.get(ruta, 0):>7}"
+        )
+        if args.max_regresion is not None and n >= MIN_MUESTRAS_REGRESION and delta > args.max_regresion:
+            regresiones.append(ruta)
+
+    total_distintos = sum(distintos.values())
+    print(f"\nStatus distinto: {total_distintos} de {min(len(a), len(b))} peticiones")
+
+    if regresiones:
+        print(f"❌ Regresión de p95 > {args.max_regresion:.0%} en: {', '.join(regresiones)}")
+        sys.exit(1)
+    if args.exigir_paridad and total_distintos:
+        print("❌ Los status de las corridas no coinciden")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.replay", description="Reproducir tráfico capturado")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_run = sub.add_parser("run", help="Reproducir una captura")
+    p_run.add_argument("captura", help="JSONL escrito por CapturaMiddleware (CAPTURE_FILE)")
+    p_run.add_argument("--target", default="inproc", help="'inproc' (app en proceso) o URL base del servidor")
+    p_run.add_argument("--velocidad", default="original", help="'original', 'max' o factor (2 = el doble de rápido)")
+    p_run.add_argument("--concurrencia", type=int, default=16, help="Peticiones en vuelo como máximo")
+    p_run.add_argument("--seed", action="store_true", help="Ejecutar app/seed.py antes (base nueva)")
+    p_run.add_argument("--salida", required=True, help="JSONL con status y latencia por petición")
+    p_run.set_defaults(func=run)
+
+    p_cmp = sub.add_parser("compare", help="Comparar latencias por ruta y status de dos corridas")
+    p_cmp.add_argument("a", help="Corrida base (o la propia captura)")
+    p_cmp.add_argument("b", help="Corrida candidata")
+    p_cmp.add_argument("--max-regresion", type=float, default=None, help="Falla si el p95 de una ruta empeora más de esta fracción")
+    p_cmp.add_argument("--exigir-paridad", action="store_true", help="Falla si algún status difiere")
+    p_cmp.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
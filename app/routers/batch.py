@@ -0,0 +1,169 @@
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from typing import List
+import asyncio
+import base64
+import json
+import logging
+
+from app.database import SessionLocal, sesion_compartida
+import app.schemas.batch as schemas
+
+logger = logging.getLogger(__name__)
+
+# Cabeceras que fija el propio batch y no se aceptan de una sub-petición
+CABECERAS_RESERVADAS = {"host", "content-type", "content-length", "transfer-encoding"}
+
+router = APIRouter(
+    prefix="/batch",
+    tags=["Batch"]
+)
+
+async def _ejecutar(app, sub: schemas.SubRequest) -> dict:
+    """Ejecutar una sub-petición en proceso a través de la app ASGI."""
+    path, _, query_string = sub.path.partition("?")
+
+    if not path.startswith("/") or path.rstrip("/") == router.prefix:
+        return {"id": sub.id, "status": status.HTTP_400_BAD_REQUEST, "body": {"detail": "Ruta no permitida en un batch"}}
+
+    body = b"" if sub.body is None else json.dumps(sub.body).encode()
+    extra = [
+        (nombre.lower().encode("latin-1"), valor.encode("latin-1"))
+        for nombre, valor in (sub.headers or {}).items()
+        if nombre.lower() not in CABECERAS_RESERVADAS
+    ]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": sub.method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string.encode(),
+        "headers": [
+            (b"host", b"batch"),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *extra,
+        ],
+        "client": None,
+        "server": None,
+        # Marca de sub-petición (la captura de tráfico no la registra)
+        "batch": True,
+    }
+
+    recibido = False
+
+    async def receive():
+        nonlocal recibido
+        if recibido:
+            return {"type": "http.disconnect"}
+        recibido = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    respuesta = {"status": 500, "headers": {}, "body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            respuesta["status"] = message["status"]
+            respuesta["headers"] = {k.decode(): v.decode() for k, v in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            respuesta["body"] += message.get("body", b"")
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # Un fallo en una ruta no debe tumbar el resto del batch
+        logger.exception("Error en la sub-petición %s %s del batch", sub.method, sub.path)
+        return {"id": sub.id, "status": status.HTTP_500_INTERNAL_SERVER_ERROR, "headers": {}, "body": {"detail": "Error interno en la sub-petición"}}
+
+    contenido = respuesta["body"]
+    tipo = respuesta["headers"].get("content-type", "")
+    binario = False
+    if tipo.startswith("application/json") and contenido:
+        contenido = json.loads(contenido)
+    elif not contenido or tipo.startswith("text/"):
+        contenido = contenido.decode() or None
+    else:
+        # msgpack, Arrow...: el cuerpo va en base64 y se conserva el content-type
+        contenido = base64.b64encode(contenido).decode()
+        binario = True
+
+    headers = {
+        k: v for k, v in respuesta["headers"].items()
+        if k != "content-length" and (k != "content-type" or binario)
+    }
+
+    return {"id": sub.id, "status": respuesta["status"], "headers": headers, "body": contenido}
+
+def _agrupar(requests: List[schemas.SubRequest]) -> List[List[schemas.SubRequest]]:
+    """
+    Agrupar sub-peticiones consecutivas de solo lectura (GET) para ejecutarlas
+    en paralelo; cada escritura forma su propio grupo y respeta el orden.
+    """
+    grupos = []
+    for sub in requests:
+        if sub.method == "GET" and grupos and grupos[-1][0].method == "GET":
+            grupos[-1].append(sub)
+        else:
+            grupos.append([sub])
+    return grupos
+
+def _cerrar_despues(db):
+    """Cerrar la sesión compartida cuando termina la sub-petición en curso."""
+    asyncio.get_running_loop().run_in_executor(None, db.close)
+
+# POST - Ejecutar varias peticiones en una sola llamada
+@router.post("/", response_model=schemas.BatchResponse)
+async def ejecutar_batch(batch: schemas.BatchRequest, request: Request):
+    """
+    Ejecutar hasta MAX_SUBREQUESTS peticiones contra las rutas existentes en
+    una sola llamada HTTP.
+
+    - Las escrituras se ejecutan en orden compartiendo una única sesión de BD.
+    - Los GET consecutivos se ejecutan en paralelo; una sesión no es segura
+      entre hilos, así que cada uno toma la suya del pool.
+    - Cada sub-petición devuelve su propio status; un error no aborta el batch.
+    - `headers` de cada sub-petición (If-Match, Accept...) se pasan a la ruta.
+      Los cuerpos binarios (msgpack, Arrow) se devuelven en base64.
+    - Si se supera BATCH_TIMEOUT no se lanzan más sub-peticiones; la que esté en
+      curso termina igualmente (su hilo no se puede interrumpir) y la sesión
+      compartida se cierra después, no mientras la usa.
+    """
+    db = SessionLocal()
+    respuestas = []
+    vencido = False
+
+    async def ejecutar_grupos():
+        for grupo in _agrupar(batch.requests):
+            if vencido:
+                return
+            if len(grupo) > 1:
+                respuestas.extend(await asyncio.gather(*[_ejecutar(request.app, sub) for sub in grupo]))
+                continue
+
+            token = sesion_compartida.set(db)
+            try:
+                respuestas.append(await _ejecutar(request.app, grupo[0]))
+            finally:
+                sesion_compartida.reset(token)
+
+    tarea = asyncio.ensure_future(ejecutar_grupos())
+    try:
+        await asyncio.wait({tarea}, timeout=schemas.BATCH_TIMEOUT)
+    finally:
+        if not tarea.done():
+            vencido = True
+            tarea.add_done_callback(lambda _: _cerrar_despues(db))
+
+    if vencido:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"El batch superó el límite de {schemas.BATCH_TIMEOUT} segundos"
+        )
+
+    await run_in_threadpool(db.close)
+    tarea.result()
+    return {"responses": respuestas}
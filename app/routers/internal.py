@@ -0,0 +1,118 @@
+from enum import Enum
+
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query
+from fastapi.responses import PlainTextResponse
+
+from app.middleware.coalescing import metricas as metricas_coalescing
+from app.middleware.perfilado import almacen as almacen_perfiles, requerir_token
+from app.middleware.consultas_lentas import registro_consultas, SLOW_QUERY_MS
+from app.services.grupo_commit import grupo_commit
+from app.services.sentencias import metricas_cache
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["Internal"]
+)
+
+class OrdenConsultasEnum(str, Enum):
+    TOTAL = "total_ms"
+    MAX = "max_ms"
+    P95 = "p95_ms"
+    COUNT = "count"
+    LENTAS = "lentas"
+
+# GET - Métricas de coalescing de lecturas
+@router.get("/coalescing")
+def obtener_metricas_coalescing():
+    """
+    Peticiones que ejecutaron la query (líderes), las que reutilizaron una
+    respuesta en curso (seguidores) o cacheada, y el ratio resultante.
+    """
+    return metricas_coalescing.estado()
+
+# GET - Perfiles de peticiones recientes
+@router.get("/profiles", dependencies=[Depends(requerir_token)])
+def listar_perfiles():
+    """
+    IDs de los perfiles guardados, del más reciente al más antiguo (requiere
+    `X-Profile: <PROFILE_TOKEN>`).
+    """
+    return {"perfiles": almacen_perfiles.listar()}
+
+# GET - Perfil de una petición
+@router.get("/profiles/{perfil_id}", dependencies=[Depends(requerir_token)])
+def obtener_perfil(
+    perfil_id: str = Path(..., pattern="^[0-9a-f]{32}$"),
+    formato: str = "resumen"
+):
+    """
+    Perfil de una petición marcada con `X-Profile` (o muestreada). Requiere
+    `X-Profile: <PROFILE_TOKEN>`.
+    
+    - **formato=resumen**: funciones con más muestras (propias e inclusivas)
+    - **formato=colapsado**: stacks colapsados para flamegraph.pl / speedscope
+    """
+    if formato == "colapsado":
+        contenido = almacen_perfiles.colapsado(perfil_id)
+        if contenido is not None:
+            return PlainTextResponse(contenido)
+    else:
+        contenido = almacen_perfiles.resumen(perfil_id)
+        if contenido is not None:
+            return contenido
+    
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Perfil {perfil_id} no encontrado"
+    )
+
+# GET - Estadísticas de consultas SQL por fingerprint
+@router.get("/queries", dependencies=[Depends(requerir_token)])
+def listar_consultas(
+    orden: OrdenConsultasEnum = OrdenConsultasEnum.TOTAL,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """
+    Sentencias SQL normalizadas (literales como `?`) con count, tiempo total,
+    máximo, p95 y rutas de origen. Las ejecuciones por encima de
+    `SLOW_QUERY_MS` se registran además en el log con sus parámetros.
+    Requiere `X-Profile: <PROFILE_TOKEN>`.
+    """
+    return {
+        "umbral_lenta_ms": SLOW_QUERY_MS,
+        "consultas": registro_consultas.tabla(orden.value, limit)
+    }
+
+# DELETE - Reiniciar estadísticas de consultas
+@router.delete("/queries", dependencies=[Depends(requerir_token)])
+def reiniciar_consultas():
+    registro_consultas.reiniciar()
+    return {"mensaje": "Estadísticas de consultas reiniciadas"}
+
+# GET - Métricas del group commit
+@router.get("/group-commit")
+def obtener_metricas_group_commit():
+    """
+    Operaciones agrupadas, commits realizados, operaciones por commit,
+    reaplicaciones por fallos dentro de un grupo y la espera añadida a cada
+    petición (p50/p95/p99, en ms) por la ventana GROUP_COMMIT_MS.
+    """
+    return grupo_commit.metricas.estado()
+
+# GET - Aciertos del cache de sentencias compiladas
+@router.get("/sql-cache")
+def obtener_metricas_cache_sql():
+    """
+    Ejecuciones servidas desde el cache de sentencias compiladas de
+    SQLAlchemy (hits) frente a las que tuvieron que compilarse (misses), el
+    ratio de aciertos y la ocupación del cache de cada engine
+    (`SQL_CACHE_SIZE`).
+    """
+    return metricas_cache.estado()
+
+# DELETE - Reiniciar métricas del cache de sentencias
+@router.delete("/sql-cache", dependencies=[Depends(requerir_token)])
+def reiniciar_metricas_cache_sql():
+    """Requiere `X-Profile: <PROFILE_TOKEN>`."""
+    metricas_cache.reiniciar()
+    return {"mensaje": "Métricas del cache de sentencias reiniciadas"}
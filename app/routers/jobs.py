@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException, status, Depends
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models.job import Job
+import app.schemas.job as schemas
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["Jobs"]
+)
+
+# READ - Obtener estado de un trabajo
+@router.get("/{job_id}", response_model=schemas.Job)
+def obtener_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    Obtener el estado y progreso de un trabajo en segundo plano.
+    """
+    job = db.query(Job).filter(Job.id == job_id).first()
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Trabajo con ID {job_id} no encontrado"
+        )
+    
+    return job
\ No newline at end of file
@@ -1,13 +1,31 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy import func, or_, literal, lambda_stmt, select
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import namedtuple
+from itertools import islice
+import heapq
 
 from app.database import get_db
 from app.models.task import Task, TaskStatus, TaskPriority
+from app.models.task_archive import TaskArchive
 from app.models.team import Team
 from app.models.user import User
+from app.services.vencimientos import scheduler, ESTADOS_ABIERTOS
+from app.services.lookup import parse_ids, cargar_por_ids
+from app.services.conteos import paginar_con_total, EXACTO
+from app.services import throughput
+from app.services import carga
+from app.services import formatos
+from app.services.concurrencia import etag, verificar_if_match, confirmar
+from app.services.grupo_commit import grupo_commit
+from app.services import shards
+from app.services import sentencias
+from app.services.shards import get_db_task
+from app.services.archivo import tasks_con_archivo, restaurar_task
+from app.services import jobs
+from app.schemas.common import LookupRequest
 import app.schemas.task as schemas
 
 router = APIRouter(
@@ -15,6 +33,221 @@ router = APIRouter(
     tags=["Tasks"]
 )
 
+# Columna respaldada por índice para cada opción de `sort`
+COLUMNAS_SORT = {
+    schemas.TaskSortEnum.DUE_DATE: Task.due_date,
+    schemas.TaskSortEnum.PRIORIDAD: Task.prioridad_orden,
+    schemas.TaskSortEnum.CREATED_AT: Task.created_at,
+    schemas.TaskSortEnum.UPDATED_AT: Task.updated_at,
+}
+
+# Columnas de tarea que leen las consultas de solo lectura: las de la
+# respuesta, `version` para el ETag y `prioridad_orden` para ordenar en memoria
+COLUMNAS_TASK = (
+    "id", "titulo", "descripcion", "estado", "prioridad", "team_id", "asignado_a",
+    "created_at", "updated_at", "due_date", "completed_at", "version", "prioridad_orden",
+)
+
+def _sentencia_con_detalles(entidad=Task, archivada=None):
+    """
+    Sentencia base (lambda statement) de tareas con nombre de equipo y datos
+    del usuario asignado.
+    
+    Devuelve filas Core planas (COLUMNAS_TASK y los detalles), sin instancias
+    ORM: nada pasa por el identity map ni por el seguimiento de cambios.
+    `entidad`/`archivada` permiten consultar también el archivo (ver `tasks_con_archivo`).
+
+    El equipo no va en un JOIN: con él el planificador recorre primero
+    `teams` (por ix_teams_eliminando) y ordena en memoria. Con el nombre en
+    una subconsulta por PK y los equipos en borrado en un NOT IN, `tasks` es
+    la tabla de afuera y el ORDER BY recorre su índice (ver `verificar_planes`).
+    """
+    sentencia = lambda_stmt(lambda: select(
+        *[getattr(entidad, c) for c in COLUMNAS_TASK],
+        select(Team.nombre).where(Team.id == entidad.team_id).scalar_subquery().label("team_nombre"),
+        User.nombre.label("asignado_nombre"),
+        User.email.label("asignado_email")
+    ).outerjoin(  # LEFT JOIN para usuarios (puede ser NULL)
+        User, User.id == entidad.asignado_a
+    ).where(
+        entidad.team_id.not_in(select(Team.id).where(Team.eliminando == True))
+    ))
+    
+    if archivada is not None:
+        sentencia += lambda s: s.add_columns(archivada.label("archivada"))
+    
+    return sentencia
+
+def _formatear_task(row) -> dict:
+    """Convertir una fila de `_sentencia_con_detalles` en el dict de TaskWithDetails."""
+    return {
+        "id": row.id,
+        "titulo": row.titulo,
+        "descripcion": row.descripcion,
+        "estado": row.estado,
+        "prioridad": row.prioridad,
+        "team_id": row.team_id,
+        "asignado_a": row.asignado_a,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "due_date": row.due_date,
+        "completed_at": row.completed_at,
+        "team_nombre": row.team_nombre,
+        "asignado_nombre": row.asignado_nombre,
+        "asignado_email": row.asignado_email,
+        "archivada": bool(getattr(row, "archivada", False))
+    }
+
+# Fila con la misma forma que las de `_sentencia_con_detalles`, armada en memoria
+_FilaTask = namedtuple("_FilaTask", COLUMNAS_TASK + ("team_nombre", "asignado_nombre", "asignado_email", "archivada"))
+
+def _sentencia_tasks(db: Session, entidad=Task, archivada=None):
+    """
+    `_sentencia_con_detalles` o, con sharding, las tareas del shard de `db`
+    sin JOIN: equipos y usuarios están en la base principal y los detalles se
+    agregan después con `_con_detalles`.
+    """
+    if not shards.habilitado():
+        return _sentencia_con_detalles(entidad, archivada)
+    
+    if archivada is None:
+        sentencia = lambda_stmt(lambda: select(
+            *[getattr(entidad, c) for c in COLUMNAS_TASK], literal(False).label("archivada")
+        ))
+    else:
+        sentencia = lambda_stmt(lambda: select(
+            *[getattr(entidad, c) for c in COLUMNAS_TASK], archivada.label("archivada")
+        ))
+    
+    # Equipos en borrado y copias de equipos que se están moviendo de shard
+    excluidos = sorted(shards.mapa.excluidos(db.info.get("shard", 0)))
+    if excluidos:
+        sentencia += lambda s: s.where(entidad.team_id.notin_(excluidos))
+    
+    return sentencia
+
+def _task_activa(db: Session, task_id: int):
+    """
+    Tarea por ID (instancia ORM, para escribir) salvo que su equipo esté en
+    borrado: las escrituras responden 404 igual que las lecturas.
+    """
+    if not shards.habilitado():
+        return db.execute(lambda_stmt(lambda: select(Task).join(
+            Team, (Team.id == Task.team_id) & (Team.eliminando == False)
+        ).where(Task.id == task_id))).scalars().first()
+    
+    task = sentencias.por_id(db, Task, task_id)
+    if task is not None and task.team_id in shards.mapa.excluidos(db.info.get("shard", 0)):
+        return None
+    return task
+
+def _team_en_borrado(db: Session, team_id: int) -> bool:
+    """Si el equipo está marcado para borrado (con sharding, según el mapa del shard de `db`)."""
+    if not shards.habilitado():
+        return db.query(Team.id).filter(Team.id == team_id, Team.eliminando == True).first() is not None
+    return team_id in shards.mapa.excluidos(db.info.get("shard", 0))
+
+def _ordenar(sentencia, T, columna, descendente: bool):
+    """ORDER BY `columna` (si hay) y el ID como desempate, en la misma dirección."""
+    if columna is None:
+        if descendente:
+            return sentencia + (lambda s: s.order_by(T.id.desc()))
+        return sentencia + (lambda s: s.order_by(T.id.asc()))
+    
+    if descendente:
+        return sentencia + (lambda s: s.order_by(columna.desc(), T.id.desc()))
+    return sentencia + (lambda s: s.order_by(columna.asc(), T.id.asc()))
+
+def _con_detalles(catalogo: Session, rows) -> list:
+    """
+    Con sharding, completar las filas de `_sentencia_tasks` con el nombre del
+    equipo y los datos del usuario asignado (leídos de la base principal).
+    Igual que el JOIN, descarta las tareas de equipos inexistentes o en borrado.
+    """
+    if not shards.habilitado() or not rows:
+        return rows
+    
+    team_ids = {row.team_id for row in rows}
+    user_ids = {row.asignado_a for row in rows if row.asignado_a is not None}
+    
+    teams = dict(catalogo.query(Team.id, Team.nombre).filter(Team.id.in_(team_ids), Team.eliminando == False).all())
+    users = {u.id: u for u in catalogo.query(User.id, User.nombre, User.email).filter(User.id.in_(user_ids))} if user_ids else {}
+    
+    filas = []
+    for row in rows:
+        if row.team_id not in teams:
+            continue
+        user = users.get(row.asignado_a)
+        filas.append(_FilaTask(
+            *(getattr(row, c) for c in COLUMNAS_TASK),
+            teams[row.team_id],
+            user.nombre if user else None,
+            user.email if user else None,
+            row.archivada
+        ))
+    return filas
+
+def _primera(db: Session, catalogo: Session, sentencia):
+    rows = _con_detalles(catalogo, db.execute(sentencia + (lambda s: s.limit(1))).all())
+    return rows[0] if rows else None
+
+def _cargar_tasks_por_ids(catalogo: Session, ids: List[int], entidad=Task, archivada=None):
+    """`cargar_por_ids` sobre las tareas con detalles; con sharding, en todos los shards."""
+    if not shards.habilitado():
+        return cargar_por_ids(_sentencia_con_detalles(entidad, archivada), entidad.id, ids, lambda row: row.id, db=catalogo)
+    
+    def en_shard(db, shard):
+        return cargar_por_ids(_sentencia_tasks(db, entidad, archivada), entidad.id, ids, lambda row: row.id, db=db)[0]
+    
+    rows = [row for rows in shards.scatter(en_shard) for row in rows]
+    encontrados = {row.id: row for row in _con_detalles(catalogo, rows)}
+    unicos = list(dict.fromkeys(ids))
+    
+    return [encontrados[i] for i in unicos if i in encontrados], [i for i in unicos if i not in encontrados]
+
+def _clave_orden(claves: List[str]):
+    """Clave de orden en memoria equivalente al ORDER BY (NULL antes que cualquier valor)."""
+    def clave(row):
+        return tuple((v is not None, v) for v in (getattr(row, c) for c in claves))
+    return clave
+
+def _listar_repartido(
+    catalogo: Session,
+    filtrar,
+    claves: List[str],
+    descendente: bool,
+    skip: int,
+    limit: int,
+    team_id: Optional[int] = None,
+    response: Optional[Response] = None,
+    entidad=Task,
+    archivada=None
+) -> list:
+    """
+    Scatter-gather entre shards: cada shard devuelve en paralelo sus primeras
+    `skip + limit` filas de `filtrar(sentencia)`, ya ordenadas por `claves`, y se
+    mezclan conservando el orden antes de recortar la página. Con `team_id`
+    solo se consulta el shard del equipo; con `response` se suma el total de
+    cada shard en `X-Total-Count`.
+    """
+    tope = skip + limit
+    
+    def en_shard(db, shard):
+        sentencia = filtrar(_sentencia_tasks(db, entidad, archivada))
+        total = sentencias.contar(db, sentencia) if response is not None else 0
+        return db.execute(sentencia + (lambda s: s.limit(tope))).all(), total
+    
+    resultados = shards.scatter(en_shard, [shards.mapa.shard(team_id)] if team_id else None)
+    
+    filas = heapq.merge(*[rows for rows, _ in resultados], key=_clave_orden(claves), reverse=descendente)
+    pagina = list(islice(filas, skip, skip + limit))
+    
+    if response is not None:
+        response.headers["X-Total-Count"] = str(sum(total for _, total in resultados))
+        response.headers["X-Total-Count-Type"] = EXACTO
+    
+    return _con_detalles(catalogo, pagina)
+
 # CREATE - Crear tarea
 @router.post("/", response_model=schemas.Task, status_code=status.HTTP_201_CREATED)
 def crear_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
@@ -23,9 +256,11 @@ def crear_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
     
     - **team_id**: ID del equipo (requerido)
     - **asignado_a**: ID del usuario asignado (opcional)
+    - **auto_asignar**: sin `asignado_a`, asignar al miembro activo con menos
+      carga (ver `/teams/{team_id}/suggest-assignee`)
     """
     # Verificar que el equipo exista
-    team = db.query(Team).filter(Team.id == task.team_id).first()
+    team = sentencias.team_activo(db, task.team_id)
     if not team:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -33,26 +268,42 @@ def crear_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
         )
     
     # Verificar que el usuario exista (si se asignó)
-    if task.asignado_a:
-        user = db.query(User).filter(User.id == task.asignado_a).first()
+    asignado_a = task.asignado_a
+    if asignado_a:
+        user = sentencias.por_id(db, User, asignado_a)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Usuario con ID {task.asignado_a} no encontrado"
+                detail=f"Usuario con ID {asignado_a} no encontrado"
             )
+    elif task.auto_asignar:
+        # Un equipo sin miembros activos deja la tarea sin asignar
+        candidatos = carga.sugerir(db, task.team_id, 1)
+        asignado_a = candidatos[0]["user_id"] if candidatos else None
     
     nueva_task = Task(
         titulo=task.titulo,
         descripcion=task.descripcion,
         prioridad=task.prioridad,
         team_id=task.team_id,
-        asignado_a=task.asignado_a,
+        asignado_a=asignado_a,
         due_date=task.due_date
     )
     
-    db.add(nueva_task)
-    db.commit()
-    db.refresh(nueva_task)
+    with shards.sesion_team(db, task.team_id, escritura=True) as tdb:
+        if shards.habilitado():
+            # ID único entre shards
+            nueva_task.id = shards.ids_tasks.siguiente()
+        
+        tdb.add(nueva_task)
+        tdb.flush()
+        throughput.registrar_creacion(tdb, nueva_task)
+        tdb.commit()
+        tdb.refresh(nueva_task)
+    
+    shards.recordar_task(nueva_task.id, nueva_task.team_id)
+    scheduler.programar(nueva_task.id, nueva_task.due_date, nueva_task.estado)
+    carga.indice_carga.registrar(None, carga.clave(nueva_task))
     
     return nueva_task
 
@@ -66,88 +317,195 @@ def listar_tasks(
     estado: Optional[schemas.TaskStatusEnum] = Query(None, description="Filtrar por estado"),
     prioridad: Optional[schemas.TaskPriorityEnum] = Query(None, description="Filtrar por prioridad"),
     search: Optional[str] = Query(None, description="Buscar en título o descripción"),
+    sort: Optional[schemas.TaskSortEnum] = Query(None, description="Ordenar por campo"),
+    order: schemas.SortOrderEnum = Query(schemas.SortOrderEnum.ASC, description="Dirección del orden"),
+    ids: Optional[str] = Query(None, description="Obtener tareas por IDs separados por coma (ej. 1,2,3)"),
+    include_total: bool = Query(False, description="Incluir el header X-Total-Count"),
+    include_archived: bool = Query(False, description="Incluir tareas archivadas"),
+    request: Request = None,
+    response: Response = None,
     db: Session = Depends(get_db)
 ):
     """
     Listar tareas con múltiples filtros opcionales.
+    
+    - **sort**: `due_date`, `prioridad` (low < medium < high < urgent), `created_at` o `updated_at`
+    - **order**: `asc` o `desc`; el ID se usa siempre como desempate
+    - **ids**: devuelve esas tareas en el mismo orden; los IDs inexistentes
+      se informan en el header `X-Missing-Ids` (el resto de filtros se ignora)
+    - **include_total**: agrega `X-Total-Count` y `X-Total-Count-Type`
+      (`exact`, `cached` o `estimate`)
+    - **include_archived**: une también `tasks_archive` (más lento, sin índices de orden)
+    - `Accept: application/msgpack` (filas) o `application/vnd.apache.arrow.stream`
+      (columnar; estado y prioridad como diccionario) en lugar de JSON
     """
-    # Query con JOINs para obtener detalles
-    query = db.query(
-        Task,
-        Team.nombre.label("team_nombre"),
-        User.nombre.label("asignado_nombre"),
-        User.email.label("asignado_email")
-    ).join(
-        Team, Team.id == Task.team_id
-    ).outerjoin(  # LEFT JOIN para usuarios (puede ser NULL)
-        User, User.id == Task.asignado_a
-    )
+    formato = formatos.negociar(request.headers.get("accept"))
     
-    # Aplicar filtros
-    if team_id:
-        query = query.filter(Task.team_id == team_id)
+    T, archivada = tasks_con_archivo() if include_archived else (Task, None)
     
-    if asignado_a:
-        query = query.filter(Task.asignado_a == asignado_a)
+    if ids is not None:
+        rows, faltantes = _cargar_tasks_por_ids(db, parse_ids(ids), T, archivada)
+        response.headers["X-Missing-Ids"] = ",".join(str(i) for i in faltantes)
+        return formatos.responder(formato, [_formatear_task(row) for row in rows], formatos.CAMPOS_TASK, response)
     
-    if estado:
-        query = query.filter(Task.estado == estado)
+    # Orden determinista: misma dirección en clave e ID para recorrer el índice
+    descendente = order == schemas.SortOrderEnum.DESC
+    claves = [COLUMNAS_SORT[sort].key, "id"] if sort else ["id"]
     
-    if prioridad:
-        query = query.filter(Task.prioridad == prioridad)
+    columna_sort = getattr(T, claves[0]) if sort else None
+    patron = f"%{search}%" if search else None
     
-    if search:
-        query = query.filter(
-            or_(
-                Task.titulo.ilike(f"%{search}%"),
-                Task.descripcion.ilike(f"%{search}%")
+    def filtrar(sentencia):
+        # Aplicar filtros (cada combinación es una entrada del cache de sentencias)
+        if team_id:
+            sentencia += lambda s: s.where(T.team_id == team_id)
+        
+        if asignado_a:
+            sentencia += lambda s: s.where(T.asignado_a == asignado_a)
+        
+        if estado:
+            sentencia += lambda s: s.where(T.estado == estado)
+        
+        if prioridad:
+            sentencia += lambda s: s.where(T.prioridad == prioridad)
+        
+        if search:
+            sentencia += lambda s: s.where(
+                or_(
+                    T.titulo.ilike(patron),
+                    T.descripcion.ilike(patron)
+                )
             )
+        
+        return _ordenar(sentencia, T, columna_sort, descendente)
+    
+    if shards.habilitado():
+        results = _listar_repartido(
+            db, filtrar, claves, descendente, skip, limit,
+            team_id=team_id,
+            response=response if include_total else None,
+            entidad=T,
+            archivada=archivada
         )
+        tasks = [_formatear_task(row) for row in results]
+        return formatos.responder(formato, tasks, formatos.CAMPOS_TASK, response)
+    
+    # Sentencia con JOINs para obtener detalles
+    sentencia = filtrar(_sentencia_con_detalles(T, archivada))
     
     # Paginación
-    results = query.offset(skip).limit(limit).all()
+    if include_total:
+        filtros = {
+            "team_id": team_id,
+            "asignado_a": asignado_a,
+            "estado": estado,
+            "prioridad": prioridad,
+            "search": search,
+            "include_archived": include_archived or None
+        }
+        # Las tareas de equipos en borrado no se listan: se restan de la estimación
+        en_borrado = db.query(func.count(Task.id)).join(Team, Team.id == Task.team_id).filter(Team.eliminando == True)
+        results = paginar_con_total(db, sentencia, "tasks", filtros, skip, limit, response, ocultas=en_borrado)
+    else:
+        results = db.execute(sentencia + (lambda s: s.offset(skip).limit(limit))).all()
     
     # Formatear respuesta
-    tasks = []
-    for row in results:
-        task_dict = {
-            "id": row.Task.id,
-            "titulo": row.Task.titulo,
-            "descripcion": row.Task.descripcion,
-            "estado": row.Task.estado,
-            "prioridad": row.Task.prioridad,
-            "team_id": row.Task.team_id,
-            "asignado_a": row.Task.asignado_a,
-            "created_at": row.Task.created_at,
-            "updated_at": row.Task.updated_at,
-            "due_date": row.Task.due_date,
-            "completed_at": row.Task.completed_at,
-            "team_nombre": row.team_nombre,
-            "asignado_nombre": row.asignado_nombre,
-            "asignado_email": row.asignado_email
-        }
-        tasks.append(task_dict)
+    tasks = [_formatear_task(row) for row in results]
     
-    return tasks
+    return formatos.responder(formato, tasks, formatos.CAMPOS_TASK, response)
+
+# READ - Obtener varias tareas por ID
+@router.post("/lookup", response_model=schemas.TaskLookupResult)
+def buscar_tasks_por_ids(lookup: LookupRequest, db: Session = Depends(get_db)):
+    """
+    Obtener varias tareas por ID en una sola petición (para listas grandes).
+    
+    Las tareas se devuelven en el orden pedido y los IDs inexistentes en `missing`.
+    """
+    rows, faltantes = _cargar_tasks_por_ids(db, lookup.ids)
+    
+    return {
+        "items": [_formatear_task(row) for row in rows],
+        "missing": faltantes
+    }
+
+# READ - Tareas vencidas o próximas a vencer
+@router.get("/due", response_model=List[schemas.TaskWithDetails])
+def listar_tasks_por_vencer(
+    window: schemas.DueWindowEnum = Query(..., description="overdue, today o week"),
+    team_id: Optional[int] = Query(None, description="Filtrar por equipo"),
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """
+    Listar tareas abiertas (pending o in_progress) según su fecha de vencimiento.
+    
+    - **overdue**: ya vencidas
+    - **today**: vencen antes del fin del día (UTC)
+    - **week**: vencen en los próximos 7 días
+    """
+    ahora = datetime.utcnow()
+    fin_del_dia = datetime.combine(ahora.date() + timedelta(days=1), datetime.min.time())
+    fin_de_semana = ahora + timedelta(days=7)
+    
+    def filtrar(sentencia):
+        # Servido por ix_tasks_estado_due_date
+        sentencia += lambda s: s.where(Task.estado.in_(ESTADOS_ABIERTOS))
+        
+        if window == schemas.DueWindowEnum.OVERDUE:
+            sentencia += lambda s: s.where(Task.due_date < ahora)
+        elif window == schemas.DueWindowEnum.TODAY:
+            sentencia += lambda s: s.where(Task.due_date.between(ahora, fin_del_dia))
+        else:
+            sentencia += lambda s: s.where(Task.due_date.between(ahora, fin_de_semana))
+        
+        if team_id:
+            sentencia += lambda s: s.where(Task.team_id == team_id)
+        
+        return sentencia + (lambda s: s.order_by(Task.due_date, Task.id))
+    
+    if shards.habilitado():
+        results = _listar_repartido(db, filtrar, ["due_date", "id"], False, skip, limit, team_id=team_id)
+    else:
+        sentencia = filtrar(_sentencia_con_detalles())
+        results = db.execute(sentencia + (lambda s: s.offset(skip).limit(limit))).all()
+    
+    return [_formatear_task(row) for row in results]
+
+# POST - Archivar tareas antiguas
+@router.post("/archive", status_code=status.HTTP_202_ACCEPTED)
+def archivar_tasks(
+    dias: int = Query(365, ge=1, description="Antigüedad mínima (días) desde que se completó o canceló"),
+    db: Session = Depends(get_db)
+):
+    """
+    Mover a `tasks_archive`, en segundo plano y por bloques, las tareas
+    completadas o canceladas hace más de `dias` días.
+    """
+    job = jobs.encolar(db, "archivar_tasks", {"dias": dias})
+    db.commit()
+    jobs.runner.notificar()
+    
+    return {
+        "mensaje": f"Archivando tareas cerradas hace más de {dias} días",
+        "job_id": job.id
+    }
 
 # READ - Obtener tarea por ID
 @router.get("/{task_id}", response_model=schemas.TaskWithDetails)
-def obtener_task(task_id: int, db: Session = Depends(get_db)):
+def obtener_task(
+    task_id: int,
+    include_archived: bool = Query(False, description="Buscar también en tareas archivadas"),
+    response: Response = None,
+    db: Session = Depends(get_db_task),
+    catalogo: Session = Depends(get_db)
+):
     """
-    Obtener una tarea específica con detalles.
+    Obtener una tarea específica con detalles (la versión va en el header `ETag`).
     """
-    result = db.query(
-        Task,
-        Team.nombre.label("team_nombre"),
-        User.nombre.label("asignado_nombre"),
-        User.email.label("asignado_email")
-    ).join(
-        Team, Team.id == Task.team_id
-    ).outerjoin(
-        User, User.id == Task.asignado_a
-    ).filter(
-        Task.id == task_id
-    ).first()
+    T, archivada = tasks_con_archivo() if include_archived else (Task, None)
+    result = _primera(db, catalogo, _sentencia_tasks(db, T, archivada) + (lambda s: s.where(T.id == task_id)))
     
     if not result:
         raise HTTPException(
@@ -155,36 +513,26 @@ def obtener_task(task_id: int, db: Session = Depends(get_db)):
             detail=f"Tarea con ID {task_id} no encontrada"
         )
     
-    task_dict = {
-        "id": result.Task.id,
-        "titulo": result.Task.titulo,
-        "descripcion": result.Task.descripcion,
-        "estado": result.Task.estado,
-        "prioridad": result.Task.prioridad,
-        "team_id": result.Task.team_id,
-        "asignado_a": result.Task.asignado_a,
-        "created_at": result.Task.created_at,
-        "updated_at": result.Task.updated_at,
-        "due_date": result.Task.due_date,
-        "completed_at": result.Task.completed_at,
-        "team_nombre": result.team_nombre,
-        "asignado_nombre": result.asignado_nombre,
-        "asignado_email": result.asignado_email
-    }
-    
-    return task_dict
+    response.headers["ETag"] = etag(result.version)
+    return _formatear_task(result)
 
 # UPDATE - Actualizar tarea
 @router.put("/{task_id}", response_model=schemas.Task)
 def actualizar_task(
     task_id: int,
     task_data: schemas.TaskUpdate,
-    db: Session = Depends(get_db)
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db_task),
+    catalogo: Session = Depends(get_db)
 ):
     """
     Actualizar una tarea existente.
+    
+    Con `If-Match` (el `ETag` de la última lectura) responde 412 si la tarea
+    cambió desde entonces.
     """
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = _task_activa(db, task_id)
     
     if not task:
         raise HTTPException(
@@ -192,6 +540,11 @@ def actualizar_task(
             detail=f"Tarea con ID {task_id} no encontrada"
         )
     
+    verificar_if_match(if_match, task.version, f"La tarea {task_id}")
+    
+    completed_at_anterior = task.completed_at
+    carga_anterior = carga.clave(task)
+    
     # Actualizar campos
     if task_data.titulo is not None:
         task.titulo = task_data.titulo
@@ -215,7 +568,7 @@ def actualizar_task(
     
     if task_data.asignado_a is not None:
         # Verificar que el usuario exista
-        user = db.query(User).filter(User.id == task_data.asignado_a).first()
+        user = sentencias.por_id(catalogo, User, task_data.asignado_a)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -226,18 +579,23 @@ def actualizar_task(
     if task_data.due_date is not None:
         task.due_date = task_data.due_date
     
-    db.commit()
+    throughput.registrar_completado(db, task, completed_at_anterior)
+    confirmar(db, f"La tarea {task_id}")
     db.refresh(task)
     
+    scheduler.programar(task.id, task.due_date, task.estado)
+    carga.indice_carga.registrar(carga_anterior, carga.clave(task))
+    
+    response.headers["ETag"] = etag(task.version)
     return task
 
 # DELETE - Eliminar tarea
 @router.delete("/{task_id}")
-def eliminar_task(task_id: int, db: Session = Depends(get_db)):
+def eliminar_task(task_id: int, db: Session = Depends(get_db_task)):
     """
     Eliminar una tarea.
     """
-    task = db.query(Task).filter(Task.id == task_id).first()
+    task = _task_activa(db, task_id)
     
     if not task:
         raise HTTPException(
@@ -246,43 +604,82 @@ def eliminar_task(task_id: int, db: Session = Depends(get_db)):
         )
     
     titulo_task = task.titulo
+    carga_anterior = carga.clave(task)
     db.delete(task)
-    db.commit()
+    confirmar(db, f"La tarea {task_id}")
+    
+    scheduler.cancelar(task_id)
+    carga.indice_carga.registrar(carga_anterior, None)
     
     return {
         "mensaje": f"Tarea '{titulo_task}' eliminada correctamente",
         "id": task_id
     }
 
+# POST - Restaurar tarea archivada
+@router.post("/{task_id}/restore", response_model=schemas.Task)
+def restaurar_task_archivada(task_id: int, db: Session = Depends(get_db_task)):
+    """
+    Devolver una tarea archivada a la tabla de tareas activas (mismo ID).
+    
+    Como el resto de escrituras de tareas: 404 si su equipo está en borrado
+    (la purga ya pudo haber pasado por sus tareas) y 503 durante el corte de
+    un movimiento de shard.
+    """
+    team_id = db.query(TaskArchive.team_id).filter(TaskArchive.id == task_id).scalar()
+    if team_id is not None and shards.habilitado():
+        shards.verificar_escritura(team_id)
+    
+    if team_id is None or _team_en_borrado(db, team_id) or not restaurar_task(db, task_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Tarea archivada con ID {task_id} no encontrada"
+        )
+    
+    task = sentencias.por_id(db, Task, task_id)
+    carga.indice_carga.registrar(None, carga.clave(task))
+    return task
+
 # PATCH - Cambiar estado de tarea
 @router.patch("/{task_id}/estado")
 def cambiar_estado_task(
     task_id: int,
     nuevo_estado: schemas.TaskStatusEnum,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_task)
 ):
     """
     Cambiar solo el estado de una tarea (atajo).
-    """
-    task = db.query(Task).filter(Task.id == task_id).first()
     
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Tarea con ID {task_id} no encontrada"
-        )
-    
-    estado_anterior = task.estado
-    task.estado = nuevo_estado
+    Con GROUP_COMMIT_MS > 0 se confirma junto con los demás cambios que
+    lleguen en esa ventana.
+    """
+    def aplicar(db: Session):
+        task = _task_activa(db, task_id)
+        
+        if not task:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Tarea con ID {task_id} no encontrada"
+            )
+        
+        estado_anterior = task.estado
+        completed_at_anterior = task.completed_at
+        carga_anterior = carga.clave(task)
+        task.estado = nuevo_estado
+        
+        # Marcar fecha de completado
+        if nuevo_estado == schemas.TaskStatusEnum.COMPLETED:
+            task.completed_at = datetime.utcnow()
+        else:
+            task.completed_at = None
+        
+        throughput.registrar_completado(db, task, completed_at_anterior)
+        return estado_anterior, task.due_date, (carga_anterior, carga.clave(task))
     
-    # Marcar fecha de completado
-    if nuevo_estado == schemas.TaskStatusEnum.COMPLETED:
-        task.completed_at = datetime.utcnow()
-    else:
-        task.completed_at = None
+    estado_anterior, due_date, cambio_carga = grupo_commit.ejecutar(db, aplicar, f"La tarea {task_id}")
     
-    db.commit()
-    db.refresh(task)
+    scheduler.programar(task_id, due_date, nuevo_estado)
+    carga.indice_carga.registrar(*cambio_carga)
     
     return {
         "mensaje": f"Estado cambiado de '{estado_anterior}' a '{nuevo_estado}'",
@@ -295,24 +692,37 @@ def cambiar_estado_task(
 def asignar_task(
     task_id: int,
     user_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_task),
+    catalogo: Session = Depends(get_db)
 ):
     """
     Asignar una tarea a un usuario.
-    """
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Tarea no encontrada")
     
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    Con GROUP_COMMIT_MS > 0 se confirma junto con los demás cambios que
+    lleguen en esa ventana.
+    """
+    # `aplicar` puede correr en el hilo del líder del grupo: no toca `catalogo`
+    # (sesión de esta petición), solo el nombre ya leído
+    user = sentencias.por_id(catalogo, User, user_id)
+    nombre = user.nombre if user else None
+    
+    def aplicar(db: Session):
+        task = _task_activa(db, task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail="Tarea no encontrada")
+        
+        if nombre is None:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        
+        carga_anterior = carga.clave(task)
+        task.asignado_a = user_id
+        return task.titulo, (carga_anterior, carga.clave(task))
     
-    task.asignado_a = user_id
-    db.commit()
+    titulo, cambio_carga = grupo_commit.ejecutar(db, aplicar, f"La tarea {task_id}")
+    carga.indice_carga.registrar(*cambio_carga)
     
     return {
-        "mensaje": f"Tarea '{task.titulo}' asignada a {user.nombre}",
+        "mensaje": f"Tarea '{titulo}' asignada a {nombre}",
         "task_id": task_id,
         "user_id": user_id
     }
@@ -321,22 +731,45 @@ def asignar_task(
 @router.get("/stats/general")
 def estadisticas_tasks(db: Session = Depends(get_db)):
     """
-    Obtener estadísticas generales de tareas.
+    Obtener estadísticas generales de tareas (con sharding, sumando las de
+    todos los shards consultados en paralelo).
     """
-    total = db.query(func.count(Task.id)).scalar()
+    def contar(db, shard=None):
+        def query(*columnas):
+            query = db.query(*columnas)
+            if shard is None:
+                # Sin sharding: mismo JOIN que los listados (sin equipos en borrado)
+                return query.join(Team, (Team.id == Task.team_id) & (Team.eliminando == False))
+            excluidos = shards.mapa.excluidos(shard)
+            return query.filter(Task.team_id.notin_(excluidos)) if excluidos else query
+        
+        total = query(func.count(Task.id)).scalar()
+        
+        por_estado = query(
+            Task.estado,
+            func.count(Task.id)
+        ).group_by(Task.estado).all()
+        
+        por_prioridad = query(
+            Task.prioridad,
+            func.count(Task.id)
+        ).group_by(Task.prioridad).all()
+        
+        return total, por_estado, por_prioridad
     
-    por_estado = db.query(
-        Task.estado,
-        func.count(Task.id)
-    ).group_by(Task.estado).all()
+    resultados = shards.scatter(contar) if shards.habilitado() else [contar(db)]
     
-    por_prioridad = db.query(
-        Task.prioridad,
-        func.count(Task.id)
-    ).group_by(Task.prioridad).all()
+    total = 0
+    por_estado, por_prioridad = {}, {}
+    for total_shard, estados, prioridades in resultados:
+        total += total_shard
+        for estado, count in estados:
+            por_estado[estado] = por_estado.get(estado, 0) + count
+        for prioridad, count in prioridades:
+            por_prioridad[prioridad] = por_prioridad.get(prioridad, 0) + count
     
     return {
         "total_tasks": total,
-        "por_estado": {estado: count for estado, count in por_estado},
-        "por_prioridad": {prioridad: count for prioridad, count in por_prioridad}
-    }
\ No newline at end of file
+        "por_estado": por_estado,
+        "por_prioridad": por_prioridad
+    }
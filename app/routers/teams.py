@@ -1,10 +1,23 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from sqlalchemy import func, lambda_stmt, select
+from typing import List, Optional
+from datetime import date
 
 from app.database import get_db
 from app.models.team import Team
+from app.services.lookup import parse_ids, cargar_por_ids
+from app.services.conteos import paginar_con_total
+from app.services import formatos
+from app.services.concurrencia import etag, verificar_if_match, confirmar
+from app.services.sugerencias import indice_teams, MAX_SUGERENCIAS
+from app.services.carga import indice_carga, sugerir
+from app.services.throughput import serie_throughput
+from app.schemas.common import LookupRequest
+from app.services import jobs
+from app.services import shards
+from app.services import sentencias
+import app.services.purga_teams  # registra el trabajo "purgar_team"
 import app.schemas.team as schemas
 
 router = APIRouter(
@@ -12,6 +25,10 @@ router = APIRouter(
     tags=["Teams"]
 )
 
+# Listados de solo lectura: filas Core con las columnas de la respuesta, sin
+# instancias ORM (ni identity map ni seguimiento de cambios)
+COLUMNAS_LISTADO = [getattr(Team, nombre) for nombre, _ in formatos.CAMPOS_TEAM]
+
 # CREATE - Crear equipo
 @router.post("/", response_model=schemas.Team, status_code=status.HTTP_201_CREATED)
 def crear_team(team: schemas.TeamCreate, db: Session = Depends(get_db)):
@@ -35,8 +52,11 @@ def crear_team(team: schemas.TeamCreate, db: Session = Depends(get_db)):
     )
     
     db.add(nuevo_team)
+    db.flush()
+    shards.ubicar_team(db, nuevo_team.id)
     db.commit()
     db.refresh(nuevo_team)
+    indice_teams.actualizar(nuevo_team)
     
     return nuevo_team
 
@@ -46,6 +66,10 @@ def listar_teams(
     skip: int = 0,
     limit: int = 100,
     search: str = None,
+    ids: Optional[str] = None,
+    include_total: bool = False,
+    request: Request = None,
+    response: Response = None,
     db: Session = Depends(get_db)
 ):
     """
@@ -54,23 +78,65 @@ def listar_teams(
     - **skip**: Registros a saltar (paginación)
     - **limit**: Número máximo de registros
     - **search**: Buscar por nombre (opcional)
+    - **ids**: Obtener equipos por IDs separados por coma; los inexistentes
+      se informan en el header `X-Missing-Ids`
+    - **include_total**: agrega `X-Total-Count` y `X-Total-Count-Type`
+    - `Accept: application/msgpack` o `application/vnd.apache.arrow.stream`
+      para recibir la lista en formato binario
     """
-    query = db.query(Team)
+    formato = formatos.negociar(request.headers.get("accept"))
+    
+    # Los equipos en borrado no se muestran
+    query = db.query(*COLUMNAS_LISTADO).filter(Team.eliminando == False)
+    
+    if ids is not None:
+        teams, faltantes = cargar_por_ids(query, Team.id, parse_ids(ids), lambda t: t.id)
+        response.headers["X-Missing-Ids"] = ",".join(str(i) for i in faltantes)
+        return formatos.responder(formato, teams, formatos.CAMPOS_TEAM, response)
     
     # Búsqueda opcional
     if search:
         query = query.filter(Team.nombre.ilike(f"%{search}%"))
     
+    if include_total:
+        en_borrado = db.query(func.count(Team.id)).filter(Team.eliminando == True)
+        teams = paginar_con_total(db, query, "teams", {"search": search}, skip, limit, response, ocultas=en_borrado)
+        return formatos.responder(formato, teams, formatos.CAMPOS_TEAM, response)
+    
     teams = query.offset(skip).limit(limit).all()
-    return teams
+    return formatos.responder(formato, teams, formatos.CAMPOS_TEAM, response)
+
+# READ - Autocompletar equipos
+@router.get("/suggest")
+def sugerir_teams(
+    q: str = Query(..., min_length=1, description="Prefijo del nombre o de una de sus palabras"),
+    limit: int = Query(10, ge=1, le=MAX_SUGERENCIAS),
+    db: Session = Depends(get_db)
+):
+    """
+    Sugerencias de equipos por prefijo, sin distinguir mayúsculas ni acentos.
+    Se responden desde un índice en memoria, sin consultar la tabla.
+    """
+    indice_teams.asegurar_cargado(db)
+    return indice_teams.buscar(q, limit)
+
+# READ - Obtener varios equipos por ID
+@router.post("/lookup", response_model=schemas.TeamLookupResult)
+def buscar_teams_por_ids(lookup: LookupRequest, db: Session = Depends(get_db)):
+    """
+    Obtener varios equipos por ID (en el orden pedido) e IDs inexistentes.
+    """
+    teams, faltantes = cargar_por_ids(db.query(*COLUMNAS_LISTADO).filter(Team.eliminando == False), Team.id, lookup.ids, lambda t: t.id)
+    
+    return {"items": teams, "missing": faltantes}
 
 # READ - Obtener equipo por ID
 @router.get("/{team_id}", response_model=schemas.Team)
-def obtener_team(team_id: int, db: Session = Depends(get_db)):
+def obtener_team(team_id: int, response: Response, db: Session = Depends(get_db)):
     """
-    Obtener un equipo específico por ID.
+    Obtener un equipo específico por ID (la versión va en el header `ETag`).
     """
-    team = db.query(Team).filter(Team.id == team_id).first()
+    team = sentencias.team_activo(db, team_id)
     
     if not team:
         raise HTTPException(
@@ -78,6 +144,7 @@ def obtener_team(team_id: int, db: Session = Depends(get_db)):
             detail=f"Equipo con ID {team_id} no encontrado"
         )
     
+    response.headers["ETag"] = etag(team.version)
     return team
 
 # READ - Obtener equipo con estadísticas
@@ -86,7 +153,7 @@ def obtener_team_stats(team_id: int, db: Session = Depends(get_db)):
     """
     Obtener equipo con estadísticas (total de miembros y tareas).
     """
-    team = db.query(Team).filter(Team.id == team_id).first()
+    team = sentencias.team_activo(db, team_id)
     
     if not team:
         raise HTTPException(
@@ -108,17 +175,56 @@ def obtener_team_stats(team_id: int, db: Session = Depends(get_db)):
     
     return team_dict
 
+# READ - Throughput de tareas creadas y completadas
+@router.get("/{team_id}/throughput")
+def obtener_team_throughput(
+    team_id: int,
+    desde: date = Query(..., alias="from", description="Fecha inicial (incluida)"),
+    hasta: date = Query(..., alias="to", description="Fecha final (incluida)"),
+    bucket: schemas.ThroughputBucketEnum = Query(schemas.ThroughputBucketEnum.DAY),
+    ventana: int = Query(7, ge=1, le=90, description="Buckets de la media móvil"),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtener la velocidad del equipo: tareas creadas y completadas por día o
+    semana, media móvil de completadas y percentiles de cycle time (horas).
+    
+    Se calcula solo a partir del rollup diario `team_throughput`.
+    """
+    team = sentencias.team_activo(db, team_id)
+    
+    if not team:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Equipo con ID {team_id} no encontrado"
+        )
+    
+    if hasta < desde or (hasta - desde).days > 366 * 2:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Rango de fechas inválido (máximo 2 años)"
+        )
+    
+    # El rollup vive en el shard de las tareas del equipo
+    with shards.sesion_team(db, team_id) as tdb:
+        return serie_throughput(tdb, team_id, desde, hasta, bucket.value, ventana)
+
 # UPDATE - Actualizar equipo
 @router.put("/{team_id}", response_model=schemas.Team)
 def actualizar_team(
     team_id: int,
     team_data: schemas.TeamUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
     Actualizar un equipo existente.
+    
+    Con `If-Match` (el `ETag` de la última lectura) responde 412 si el equipo
+    cambió desde entonces.
     """
-    team = db.query(Team).filter(Team.id == team_id).first()
+    team = sentencias.team_activo(db, team_id)
     
     if not team:
         raise HTTPException(
@@ -126,6 +232,8 @@ def actualizar_team(
             detail=f"Equipo con ID {team_id} no encontrado"
         )
     
+    verificar_if_match(if_match, team.version, f"El equipo {team_id}")
+    
     # Actualizar solo los campos que se enviaron
     if team_data.nombre is not None:
         # Verificar que el nuevo nombre no exista
@@ -145,20 +253,24 @@ def actualizar_team(
     if team_data.descripcion is not None:
         team.descripcion = team_data.descripcion
     
-    db.commit()
+    confirmar(db, f"El equipo {team_id}")
     db.refresh(team)
+    indice_teams.actualizar(team)
     
+    response.headers["ETag"] = etag(team.version)
     return team
 
 # DELETE - Eliminar equipo
-@router.delete("/{team_id}")
+@router.delete("/{team_id}", status_code=status.HTTP_202_ACCEPTED)
 def eliminar_team(team_id: int, db: Session = Depends(get_db)):
     """
     Eliminar un equipo.
     
-    NOTA: Solo se puede eliminar si no tiene miembros ni tareas asociadas.
+    El equipo se marca como en borrado (deja de aparecer en las lecturas) y sus
+    tareas y membresías se purgan por bloques en segundo plano. El progreso se
+    consulta en `/jobs/{job_id}`.
     """
-    team = db.query(Team).filter(Team.id == team_id).first()
+    team = sentencias.team_activo(db, team_id)
     
     if not team:
         raise HTTPException(
@@ -166,16 +278,21 @@ def eliminar_team(team_id: int, db: Session = Depends(get_db)):
             detail=f"Equipo con ID {team_id} no encontrado"
         )
     
-    # TODO: Verificar que no tenga miembros ni tareas
-    # (Lo agregaremos cuando tengamos esas tablas)
-    
     nombre_team = team.nombre
-    db.delete(team)
-    db.commit()
+    team.eliminando = True
+    
+    # La marca y el trabajo se confirman en la misma transacción
+    job = jobs.encolar(db, "purgar_team", {"team_id": team_id})
+    confirmar(db, f"El equipo {team_id}")
+    jobs.runner.notificar()
+    indice_teams.eliminar(team_id)
+    indice_carga.olvidar(team_id)
+    shards.mapa.invalidar()
     
     return {
-        "mensaje": f"Equipo '{nombre_team}' eliminado correctamente",
-        "id": team_id
+        "mensaje": f"Equipo '{nombre_team}' en proceso de eliminación",
+        "id": team_id,
+        "job_id": job.id
     }
 
 # STATS - Obtener estadísticas generales
@@ -184,7 +301,7 @@ def estadisticas_generales(db: Session = Depends(get_db)):
     """
     Obtener estadísticas generales de todos los equipos.
     """
-    total_teams = db.query(func.count(Team.id)).scalar()
+    total_teams = db.query(func.count(Team.id)).filter(Team.eliminando == False).scalar()
     
     return {
         "total_teams": total_teams,
@@ -201,7 +318,7 @@ def obtener_miembros_team(team_id: int, db: Session = Depends(get_db)):
     from app.models.user import User
     from app.models.user_team import UserTeam
     
-    team = db.query(Team).filter(Team.id == team_id).first()
+    team = sentencias.team_activo(db, team_id)
     
     if not team:
         raise HTTPException(
@@ -210,7 +327,7 @@ def obtener_miembros_team(team_id: int, db: Session = Depends(get_db)):
         )
     
     # Query manual con JOIN
-    members_data = db.query(
+    members_data = db.execute(lambda_stmt(lambda: select(
         User.id,
         User.nombre,
         User.email,
@@ -219,9 +336,9 @@ def obtener_miembros_team(team_id: int, db: Session = Depends(get_db)):
         UserTeam.joined_at
     ).join(
         UserTeam, UserTeam.user_id == User.id
-    ).filter(
+    ).where(
         UserTeam.team_id == team_id
-    ).all()
+    ))).all()
     
     members = [
         {
@@ -243,4 +360,36 @@ def obtener_miembros_team(team_id: int, db: Session = Depends(get_db)):
         },
         "members": members,
         "total_members": len(members)
-    }
\ No newline at end of file
+    }
+
+# GET - Sugerir a quién asignar una tarea
+@router.get("/{team_id}/suggest-assignee")
+def sugerir_asignado(
+    team_id: int,
+    limit: int = Query(5, ge=1, le=MAX_SUGERENCIAS),
+    db: Session = Depends(get_db)
+):
+    """
+    Miembros activos del equipo ordenados por carga de trabajo abierta, de
+    menor a mayor. Cada tarea pendiente o en progreso suma según su prioridad
+    (low 1, medium 2, high 3, urgent 5), multiplicada por la cercanía del
+    vencimiento (x3 vencida, x2 en 24 h, x1.5 en 3 días, x1.25 en 7 días).
+    
+    La carga sale de un índice en memoria por equipo; `POST /tasks/` con
+    `auto_asignar` usa el primero de esta lista.
+    """
+    team = sentencias.team_activo(db, team_id)
+    
+    if not team:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Equipo con ID {team_id} no encontrado"
+        )
+    
+    candidatos = sugerir(db, team_id, limit)
+    
+    return {
+        "team_id": team_id,
+        "sugerido": candidatos[0] if candidatos else None,
+        "candidatos": candidatos
+    }
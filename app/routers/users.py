@@ -1,12 +1,27 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from sqlalchemy import func, case, and_, lambda_stmt, select
+from typing import List, Optional
+from datetime import datetime
+from itertools import islice
+import heapq
 
-from app.database import get_db
+from app.database import get_db, SHARDS
 from app.models.user import User
 from app.models.team import Team
 from app.models.user_team import UserTeam
+from app.models.task import Task
+from app.models.task_archive import TaskArchive
+from app.services.vencimientos import ESTADOS_ABIERTOS
+from app.services.lookup import parse_ids, cargar_por_ids
+from app.services.conteos import paginar_con_total
+from app.services import formatos
+from app.services.concurrencia import etag, verificar_if_match, confirmar
+from app.services.sugerencias import indice_users, MAX_SUGERENCIAS
+from app.services.carga import indice_carga
+from app.services import shards
+from app.services import sentencias
+from app.schemas.common import LookupRequest
 import app.schemas.user as schemas
 
 router = APIRouter(
@@ -14,6 +29,10 @@ router = APIRouter(
     tags=["Users"]
 )
 
+# Listados de solo lectura: filas Core con las columnas de la respuesta, sin
+# instancias ORM (ni identity map ni seguimiento de cambios)
+COLUMNAS_LISTADO = [getattr(User, nombre) for nombre, _ in formatos.CAMPOS_USER]
+
 # CREATE - Crear usuario
 @router.post("/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
 def crear_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
@@ -36,6 +55,7 @@ def crear_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db.add(nuevo_user)
     db.commit()
     db.refresh(nuevo_user)
+    indice_users.actualizar(nuevo_user)
     
     return nuevo_user
 
@@ -46,11 +66,31 @@ def listar_users(
     limit: int = 100,
     search: str = None,
     activo: bool = None,
+    ids: Optional[str] = None,
+    include_total: bool = False,
+    request: Request = None,
+    response: Response = None,
     db: Session = Depends(get_db)
 ):
-    """Listar usuarios con filtros opcionales."""
+    """
+    Listar usuarios con filtros opcionales.
+    
+    Con **ids** (ej. `1,2,3`) devuelve esos usuarios en el mismo orden y
+    los IDs inexistentes en el header `X-Missing-Ids`.
+    
+    Con **include_total** agrega `X-Total-Count` y `X-Total-Count-Type`.
+    
+    Con `Accept: application/msgpack` o `application/vnd.apache.arrow.stream`
+    responde en formato binario.
+    """
+    formato = formatos.negociar(request.headers.get("accept"))
     
-    query = db.query(User)
+    query = db.query(*COLUMNAS_LISTADO)
+    
+    if ids is not None:
+        users, faltantes = cargar_por_ids(query, User.id, parse_ids(ids), lambda u: u.id)
+        response.headers["X-Missing-Ids"] = ",".join(str(i) for i in faltantes)
+        return formatos.responder(formato, users, formatos.CAMPOS_USER, response)
     
     # Filtro por búsqueda
     if search:
@@ -63,15 +103,43 @@ def listar_users(
     if activo is not None:
         query = query.filter(User.activo == activo)
     
+    if include_total:
+        users = paginar_con_total(db, query, "users", {"search": search, "activo": activo}, skip, limit, response)
+        return formatos.responder(formato, users, formatos.CAMPOS_USER, response)
+    
     users = query.offset(skip).limit(limit).all()
-    return users
+    return formatos.responder(formato, users, formatos.CAMPOS_USER, response)
+
+# READ - Autocompletar usuarios
+@router.get("/suggest")
+def sugerir_users(
+    q: str = Query(..., min_length=1, description="Prefijo del nombre, de una palabra del nombre o del email"),
+    limit: int = Query(10, ge=1, le=MAX_SUGERENCIAS),
+    db: Session = Depends(get_db)
+):
+    """
+    Sugerencias de usuarios activos por prefijo, sin distinguir mayúsculas
+    ni acentos ("mar" encuentra a "María García"). Se responden desde un
+    índice en memoria, sin consultar la tabla.
+    """
+    indice_users.asegurar_cargado(db)
+    return indice_users.buscar(q, limit)
+
+# READ - Obtener varios usuarios por ID
+@router.post("/lookup", response_model=schemas.UserLookupResult)
+def buscar_users_por_ids(lookup: LookupRequest, db: Session = Depends(get_db)):
+    """Obtener varios usuarios por ID (en el orden pedido) e IDs inexistentes."""
+    
+    users, faltantes = cargar_por_ids(db.query(*COLUMNAS_LISTADO), User.id, lookup.ids, lambda u: u.id)
+    
+    return {"items": users, "missing": faltantes}
 
 # READ - Obtener usuario por ID
 @router.get("/{user_id}", response_model=schemas.User)
-def obtener_user(user_id: int, db: Session = Depends(get_db)):
-    """Obtener un usuario específico."""
+def obtener_user(user_id: int, response: Response, db: Session = Depends(get_db)):
+    """Obtener un usuario específico (la versión va en el header `ETag`)."""
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = sentencias.por_id(db, User, user_id)
     
     if not user:
         raise HTTPException(
@@ -79,6 +147,7 @@ def obtener_user(user_id: int, db: Session = Depends(get_db)):
             detail=f"Usuario con ID {user_id} no encontrado"
         )
     
+    response.headers["ETag"] = etag(user.version)
     return user
 
 # READ - Obtener usuario con sus equipos
@@ -86,7 +155,7 @@ def obtener_user(user_id: int, db: Session = Depends(get_db)):
 def obtener_user_teams(user_id: int, db: Session = Depends(get_db)):
     """Obtener usuario con la lista de equipos a los que pertenece."""
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = sentencias.por_id(db, User, user_id)
     
     if not user:
         raise HTTPException(
@@ -95,7 +164,7 @@ def obtener_user_teams(user_id: int, db: Session = Depends(get_db)):
         )
     
     # Query manual para obtener equipos del usuario
-    teams_data = db.query(
+    teams_data = db.execute(lambda_stmt(lambda: select(
         Team.id,
         Team.nombre,
         Team.descripcion,
@@ -103,9 +172,10 @@ def obtener_user_teams(user_id: int, db: Session = Depends(get_db)):
         UserTeam.joined_at
     ).join(
         UserTeam, UserTeam.team_id == Team.id
-    ).filter(
-        UserTeam.user_id == user_id
-    ).all()
+    ).where(
+        UserTeam.user_id == user_id,
+        Team.eliminando == False
+    ))).all()
     
     teams = [
         {
@@ -129,16 +199,176 @@ def obtener_user_teams(user_id: int, db: Session = Depends(get_db)):
         "total_teams": len(teams)
     }
 
+# READ - Dashboard de trabajo del usuario
+@router.get("/{user_id}/dashboard")
+def obtener_user_dashboard(
+    user_id: int,
+    proximas: int = Query(5, ge=1, le=50, description="Número de próximas tareas por vencer"),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtener el resumen de trabajo de un usuario: sus equipos, conteo de sus
+    tareas por estado y prioridad en cada equipo, tareas vencidas y las
+    próximas tareas por fecha de vencimiento.
+    
+    Se resuelve con un número fijo de queries (usuario, equipos, conteos
+    agrupados y próximas tareas), sin importar cuántos equipos o tareas tenga.
+    Con sharding, conteos y próximas tareas se consultan en paralelo en cada
+    shard y se combinan.
+    """
+    user = sentencias.por_id(db, User, user_id)
+    
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Usuario con ID {user_id} no encontrado"
+        )
+    
+    ahora = datetime.utcnow()
+    
+    # Equipos del usuario
+    teams_data = db.execute(lambda_stmt(lambda: select(
+        Team.id,
+        Team.nombre,
+        UserTeam.role
+    ).join(
+        UserTeam, UserTeam.team_id == Team.id
+    ).where(
+        UserTeam.user_id == user_id,
+        Team.eliminando == False
+    ))).all()
+    
+    def resumen_team(team_id, nombre, role):
+        return {
+            "team_id": team_id,
+            "nombre": nombre,
+            "role": role,
+            "total_tasks": 0,
+            "por_estado": {},
+            "por_prioridad": {},
+            "vencidas": 0
+        }
+    
+    teams = {t.id: resumen_team(t.id, t.nombre, t.role) for t in teams_data}
+    
+    # Conteos de tareas asignadas agrupados por equipo, estado y prioridad
+    def contar(db, shard=None):
+        sentencia = lambda_stmt(lambda: select(
+            Task.team_id,
+            Task.estado,
+            Task.prioridad,
+            func.count(Task.id).label("total"),
+            func.sum(case(
+                (and_(Task.estado.in_(ESTADOS_ABIERTOS), Task.due_date < ahora), 1),
+                else_=0
+            )).label("vencidas")
+        ).where(
+            Task.asignado_a == user_id
+        ).group_by(
+            Task.team_id, Task.estado, Task.prioridad
+        ))
+        # Sin JOIN a teams (una búsqueda por tarea): los equipos en borrado
+        # no están en `teams` y se saltan al combinar. Se agrupa recorriendo
+        # solo ix_tasks_asignado_resumen
+        if shard is not None:
+            # Sin las copias de equipos en movimiento (se cuentan en su shard de origen)
+            excluidos = sorted(shards.mapa.excluidos(shard))
+            if excluidos:
+                sentencia += lambda s: s.where(Task.team_id.notin_(excluidos))
+        return db.execute(sentencia).all()
+    
+    # Próximas tareas abiertas por vencer (ix_tasks_asignado_due_date_id)
+    def proximas_de(db, shard=None):
+        sentencia = lambda_stmt(lambda: select(
+            Task.id,
+            Task.titulo,
+            Task.estado,
+            Task.prioridad,
+            Task.team_id,
+            Task.due_date
+        ).where(
+            Task.asignado_a == user_id,
+            Task.estado.in_(ESTADOS_ABIERTOS),
+            Task.due_date >= ahora
+        ).order_by(
+            Task.due_date, Task.id
+        ).limit(proximas))
+        if shard is not None:
+            excluidos = sorted(shards.mapa.excluidos(shard))
+            if excluidos:
+                sentencia += lambda s: s.where(Task.team_id.notin_(excluidos))
+        return db.execute(sentencia).all()
+    
+    if shards.habilitado():
+        resultados = shards.scatter(lambda sdb, shard: (contar(sdb, shard), proximas_de(sdb, shard)))
+        conteos = [c for conteos_shard, _ in resultados for c in conteos_shard]
+        proximas_data = list(islice(
+            heapq.merge(*[p for _, p in resultados], key=lambda t: (t.due_date, t.id)),
+            proximas
+        ))
+    else:
+        conteos = contar(db)
+        proximas_data = proximas_de(db)
+    
+    # Tareas asignadas en equipos de los que el usuario no es miembro
+    otros = {c.team_id for c in conteos} - teams.keys()
+    if otros:
+        for t in db.query(Team.id, Team.nombre).filter(Team.id.in_(otros), Team.eliminando == False):
+            teams[t.id] = resumen_team(t.id, t.nombre, None)
+    
+    total_vencidas = 0
+    for c in conteos:
+        team = teams.get(c.team_id)
+        if team is None:
+            # Equipo marcado para borrado
+            continue
+        team["total_tasks"] += c.total
+        team["por_estado"][c.estado] = team["por_estado"].get(c.estado, 0) + c.total
+        team["por_prioridad"][c.prioridad] = team["por_prioridad"].get(c.prioridad, 0) + c.total
+        team["vencidas"] += c.vencidas or 0
+        total_vencidas += c.vencidas or 0
+    
+    proximas_tasks = [
+        {
+            "id": t.id,
+            "titulo": t.titulo,
+            "estado": t.estado,
+            "prioridad": t.prioridad,
+            "team_id": t.team_id,
+            "due_date": t.due_date
+        }
+        for t in proximas_data
+    ]
+    
+    return {
+        "user": {
+            "id": user.id,
+            "nombre": user.nombre,
+            "email": user.email,
+            "activo": user.activo
+        },
+        "teams": list(teams.values()),
+        "total_vencidas": total_vencidas,
+        "proximas_tasks": proximas_tasks
+    }
+
 # UPDATE - Actualizar usuario
 @router.put("/{user_id}", response_model=schemas.User)
 def actualizar_user(
     user_id: int,
     user_data: schemas.UserUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Actualizar un usuario existente."""
+    """
+    Actualizar un usuario existente.
+    
+    Con `If-Match` (el `ETag` de la última lectura) responde 412 si el usuario
+    cambió desde entonces.
+    """
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = sentencias.por_id(db, User, user_id)
     
     if not user:
         raise HTTPException(
@@ -146,6 +376,8 @@ def actualizar_user(
             detail=f"Usuario con ID {user_id} no encontrado"
         )
     
+    verificar_if_match(if_match, user.version, f"El usuario {user_id}")
+    
     # Actualizar campos
     if user_data.nombre is not None:
         user.nombre = user_data.nombre
@@ -168,9 +400,11 @@ def actualizar_user(
     if user_data.activo is not None:
         user.activo = user_data.activo
     
-    db.commit()
+    confirmar(db, f"El usuario {user_id}")
     db.refresh(user)
+    indice_users.actualizar(user)
     
+    response.headers["ETag"] = etag(user.version)
     return user
 
 # DELETE - Eliminar usuario
@@ -178,7 +412,7 @@ def actualizar_user(
 def eliminar_user(user_id: int, db: Session = Depends(get_db)):
     """Eliminar un usuario."""
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = sentencias.por_id(db, User, user_id)
     
     if not user:
         raise HTTPException(
@@ -191,9 +425,27 @@ def eliminar_user(user_id: int, db: Session = Depends(get_db)):
     # Eliminar relaciones con equipos primero
     db.query(UserTeam).filter(UserTeam.user_id == user_id).delete()
     
+    # Sus tareas (activas y archivadas) quedan sin asignar. Se hace a mano en
+    # cada shard: fuera del shard 0 no hay claves foráneas con ON DELETE SET
+    # NULL, y así cambia la versión (y el ETag) de cada tarea
+    def desasignar(sdb, shard):
+        for modelo in (Task, TaskArchive):
+            sdb.query(modelo).filter(modelo.asignado_a == user_id).update(
+                {modelo.asignado_a: None, modelo.version: modelo.version + 1},
+                synchronize_session=False
+            )
+        if shard > 0:
+            sdb.commit()
+    
+    if shards.habilitado():
+        shards.scatter(desasignar, range(1, len(SHARDS)))
+    desasignar(db, 0)
+    
     # Eliminar usuario
     db.delete(user)
-    db.commit()
+    confirmar(db, f"El usuario {user_id}")
+    indice_users.eliminar(user_id)
+    indice_carga.olvidar_user(user_id)
     
     return {
         "mensaje": f"Usuario '{nombre_user}' eliminado correctamente",
@@ -211,11 +463,11 @@ def agregar_user_a_team(
     """Agregar un usuario a un equipo."""
     
     # Verificar que existan
-    user = db.query(User).filter(User.id == user_id).first()
+    user = sentencias.por_id(db, User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     
-    team = db.query(Team).filter(Team.id == team_id).first()
+    team = sentencias.team_activo(db, team_id)
     if not team:
         raise HTTPException(status_code=404, detail="Equipo no encontrado")
     
@@ -1,3 +1,3 @@
-from app.schemas import team, user, user_team, task
+from app.schemas import batch, common, job, team, user, user_team, task
 
-__all__ = ["team", "user", "user_team", "task"]
\ No newline at end of file
+__all__ = ["batch", "common", "job", "team", "user", "user_team", "task"]
\ No newline at end of file
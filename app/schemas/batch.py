@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+
+# Límites por batch
+MAX_SUBREQUESTS = 20
+BATCH_TIMEOUT = 10.0  # segundos
+
+class SubRequest(BaseModel):
+    id: Optional[str] = Field(None, description="Identificador del cliente, se repite en la respuesta")
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str = Field(..., min_length=1, max_length=2000, description="Ruta con query string, ej. /tasks/?team_id=1")
+    headers: Optional[Dict[str, str]] = Field(None, description="Cabeceras de la sub-petición, ej. If-Match o Accept")
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    requests: List[SubRequest] = Field(..., min_length=1, max_length=MAX_SUBREQUESTS)
+
+class SubResponse(BaseModel):
+    id: Optional[str] = None
+    status: int
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    responses: List[SubResponse]
\ No newline at end of file
@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+from app.services.lookup import MAX_IDS
+
+class LookupRequest(BaseModel):
+    """Lista de IDs a resolver en una sola petición"""
+    ids: List[int] = Field(..., min_length=1, max_length=MAX_IDS)
@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from typing import Any, Optional
+from datetime import datetime
+from enum import Enum
+
+class JobStatusEnum(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class Job(BaseModel):
+    id: int
+    tipo: str
+    estado: JobStatusEnum
+    payload: Optional[Any] = None
+    progreso: Optional[Any] = None
+    resultado: Optional[Any] = None
+    error: Optional[str] = None
+    intentos: int
+    max_intentos: int
+    run_after: datetime
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
\ No newline at end of file
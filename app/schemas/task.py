@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -16,6 +16,21 @@ class TaskPriorityEnum(str, Enum):
     HIGH = "high"
     URGENT = "urgent"
 
+class TaskSortEnum(str, Enum):
+    DUE_DATE = "due_date"
+    PRIORIDAD = "prioridad"
+    CREATED_AT = "created_at"
+    UPDATED_AT = "updated_at"
+
+class SortOrderEnum(str, Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+class DueWindowEnum(str, Enum):
+    OVERDUE = "overdue"
+    TODAY = "today"
+    WEEK = "week"
+
 # Schemas
 class TaskBase(BaseModel):
     titulo: str = Field(..., min_length=3, max_length=200)
@@ -26,6 +41,7 @@ class TaskBase(BaseModel):
 class TaskCreate(TaskBase):
     team_id: int
     asignado_a: Optional[int] = None
+    auto_asignar: bool = False  # Sin asignado_a: al miembro con menos carga
 
 class TaskUpdate(BaseModel):
     titulo: Optional[str] = Field(None, min_length=3, max_length=200)
@@ -51,4 +67,10 @@ class TaskWithDetails(Task):
     """Task con detalles de team y usuario asignado"""
     team_nombre: Optional[str] = None
     asignado_nombre: Optional[str] = None
-    asignado_email: Optional[str] = None
\ No newline at end of file
+    asignado_email: Optional[str] = None
+    archivada: bool = False
+
+class TaskLookupResult(BaseModel):
+    """Tareas encontradas (en el orden pedido) e IDs inexistentes"""
+    items: List[TaskWithDetails]
+    missing: List[int]
\ No newline at end of file
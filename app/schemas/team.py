@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
+from enum import Enum
 
 class TeamBase(BaseModel):
     nombre: str = Field(..., min_length=3, max_length=100)
@@ -24,4 +25,13 @@ class Team(TeamBase):
 class TeamWithStats(Team):
     """Team con estadísticas adicionales"""
     total_members: int = 0
-    total_tasks: int = 0
\ No newline at end of file
+    total_tasks: int = 0
+
+class ThroughputBucketEnum(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+
+class TeamLookupResult(BaseModel):
+    """Equipos encontrados (en el orden pedido) e IDs inexistentes"""
+    items: List[Team]
+    missing: List[int]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -25,4 +25,9 @@ class User(UserBase):
 
 class UserWithTeams(User):
     """User con lista de equipos"""
-    teams: list = []  # Lo llenaremos manualmente
\ No newline at end of file
+    teams: list = []  # Lo llenaremos manualmente
+
+class UserLookupResult(BaseModel):
+    """Usuarios encontrados (en el orden pedido) e IDs inexistentes"""
+    items: List[User]
+    missing: List[int]
\ No newline at end of file
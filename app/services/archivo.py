@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from sqlalchemy import func, insert, literal, select, union_all
+from sqlalchemy.orm import aliased
+
+from app.models.task import Task, TaskStatus
+from app.models.task_archive import TaskArchive, COLUMNAS_COMPARTIDAS
+from app.services.jobs import registrar
+from app.services import shards
+
+# Filas movidas por transacción
+CHUNK_SIZE = 1000
+
+ESTADOS_ARCHIVABLES = (TaskStatus.COMPLETED, TaskStatus.CANCELLED)
+
+
+@lru_cache(maxsize=None)
+def tasks_con_archivo():
+    """
+    Entidad `Task` sobre `tasks UNION ALL tasks_archive` y la columna
+    `archivada` que indica de qué tabla viene cada fila.
+
+    Se construye una sola vez: al ser siempre el mismo objeto, las sentencias
+    que la usan comparten entrada en el cache de sentencias compiladas.
+    """
+    calientes = select(*[getattr(Task, c) for c in COLUMNAS_COMPARTIDAS], literal(False).label("archivada"))
+    archivadas = select(*[getattr(TaskArchive, c) for c in COLUMNAS_COMPARTIDAS], literal(True).label("archivada"))
+    todas = union_all(calientes, archivadas).subquery("tasks_todas")
+
+    return aliased(Task, todas, name="Task"), todas.c.archivada
+
+
+def _mover(db, origen, destino, ids, condiciones=()):
+    """
+    Copiar las filas `ids` de `origen` a `destino` y borrarlas de `origen`.
+
+    `condiciones` se repiten en el INSERT…SELECT y en el DELETE: si una fila
+    dejó de cumplirlas desde que se eligieron los IDs (p. ej. se reabrió la
+    tarea), no se copia ni se borra. Devuelve las filas movidas.
+    """
+    columnas = [getattr(origen, c) for c in COLUMNAS_COMPARTIDAS]
+    db.execute(
+        insert(destino).from_select(
+            COLUMNAS_COMPARTIDAS, select(*columnas).where(origen.id.in_(ids), *condiciones)
+        )
+    )
+    return db.query(origen).filter(origen.id.in_(ids), *condiciones).delete(synchronize_session=False)
+
+
+@registrar("archivar_tasks")
+def archivar_tasks(db, payload: dict, progreso):
+    """
+    Mover a `tasks_archive` las tareas completadas o canceladas hace más de
+    `dias` días, en bloques de CHUNK_SIZE (una transacción por bloque).
+    Las canceladas no tienen `completed_at`, se usa su `updated_at`.
+    Con sharding recorre los shards uno tras otro.
+    """
+    limite = datetime.utcnow() - timedelta(days=payload["dias"])
+    archivables = (
+        Task.estado.in_(ESTADOS_ARCHIVABLES),
+        func.coalesce(Task.completed_at, Task.updated_at) < limite,
+    )
+    archivadas = 0
+
+    for shard, sdb in shards.sesiones(db):
+        # Las copias de equipos que se están moviendo las archiva su shard dueño
+        excluidos = shards.mapa.excluidos(shard) if shards.habilitado() else None
+
+        while True:
+            query = sdb.query(Task.id).filter(*archivables)
+            if excluidos:
+                query = query.filter(Task.team_id.notin_(excluidos))
+            ids = [row.id for row in query.order_by(Task.id).limit(CHUNK_SIZE).all()]
+
+            if not ids:
+                break
+
+            # Los IDs se eligieron sin bloquear las filas (en SQLite, desde el
+            # pool de lectura): se vuelve a exigir que sigan siendo archivables
+            movidas = _mover(sdb, Task, TaskArchive, ids, archivables)
+            sdb.commit()
+
+            archivadas += movidas
+            progreso({"archivadas": archivadas})
+
+    return {"archivadas": archivadas}
+
+
+def restaurar_task(db, task_id: int) -> bool:
+    """Devolver una tarea archivada a `tasks` con el mismo ID."""
+    if not db.query(TaskArchive.id).filter(TaskArchive.id == task_id).first():
+        return False
+
+    _mover(db, TaskArchive, Task, [task_id])
+    db.commit()
+    return True
@@ -0,0 +1,251 @@
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func, lambda_stmt, select
+
+from app.models.task import Task, TaskPriority, TaskStatus
+from app.models.user import User
+from app.models.user_team import UserTeam
+from app.services import shards
+from app.services.vencimientos import ESTADOS_ABIERTOS
+
+# Carga de trabajo abierta por equipo y usuario, para sugerir a quién asignar.
+# Las escrituras de tareas de este proceso la mantienen al día; las de otros
+# procesos (u otras vías, como el movedor de equipos) se recogen al recargar
+# el equipo, como mucho CARGA_TTL segundos después.
+CARGA_TTL = float(os.getenv("CARGA_TTL", "60"))
+
+PESOS_PRIORIDAD = {
+    TaskPriority.LOW: 1.0,
+    TaskPriority.MEDIUM: 2.0,
+    TaskPriority.HIGH: 3.0,
+    TaskPriority.URGENT: 5.0,
+}
+
+# Factor por cercanía del vencimiento: (horas restantes hasta, factor).
+# Vencidas o sin fecha dentro de ninguno de los tramos: el del primero / 1.0
+TRAMOS_VENCIMIENTO = (
+    (0, 3.0),
+    (24, 2.0),
+    (72, 1.5),
+    (168, 1.25),
+)
+
+# (team_id, asignado_a, prioridad, due_date) de una tarea abierta y asignada
+Clave = Tuple[int, int, TaskPriority, Optional[datetime]]
+
+# Tramos con los que se agrega en SQL (ver `IndiceCarga._cargar`)
+TRAMO_VENCIDA, TRAMO_CERCANA, TRAMO_LEJANA = 0, 1, 2
+
+# Fecha que representa a todas las ya vencidas al cargar (factor del primer tramo)
+VENCIDA = datetime.min
+
+
+def clave(task) -> Optional[Clave]:
+    """Lo que aporta `task` a la carga, o None si está cerrada o sin asignar."""
+    if task is None or task.asignado_a is None or TaskStatus(task.estado) not in ESTADOS_ABIERTOS:
+        return None
+    return task.team_id, task.asignado_a, TaskPriority(task.prioridad), task.due_date
+
+
+def factor_vencimiento(due_date: Optional[datetime], ahora: datetime) -> float:
+    if due_date is None:
+        return 1.0
+    horas = (due_date - ahora).total_seconds() / 3600
+    for limite, factor in TRAMOS_VENCIMIENTO:
+        if horas <= limite:
+            return factor
+    return 1.0
+
+
+class _CargaTeam:
+    def __init__(self, usuarios: Dict[int, Counter], vence: float, cargada: datetime, horizonte: datetime):
+        # user_id -> Counter((prioridad, due_date normalizada) -> tareas)
+        self.usuarios = usuarios
+        self.vence = vence
+        self.cargada = cargada
+        self.horizonte = horizonte
+
+    def normalizar(self, due_date: Optional[datetime]) -> Optional[datetime]:
+        """
+        La fecha con la que una tarea cuenta en este equipo: VENCIDA si ya
+        vencía al cargar, None si vence después del horizonte (pesa como sin
+        fecha mientras dure la carga) y la fecha exacta en el medio.
+        """
+        if due_date is None or due_date > self.horizonte:
+            return None
+        if due_date <= self.cargada:
+            return VENCIDA
+        return due_date
+
+
+class IndiceCarga:
+    """
+    Índice en memoria de la carga abierta de cada equipo.
+
+    Un equipo se carga con una sola consulta agregada en SQL por (asignado_a,
+    prioridad, tramo de vencimiento) en su shard y después se ajusta con la
+    diferencia entre el antes y el después de cada escritura (`registrar`).
+
+    Las vencidas al cargar forman un solo grupo (siguen vencidas) y las que
+    vencen después del horizonte (último tramo + CARGA_TTL) otro, que pesa
+    como sin fecha: ninguna cambia de tramo antes de que la carga caduque.
+    Solo las del medio se agrupan por fecha exacta, así que salen pocas filas
+    por usuario. El peso por cercanía se calcula al consultar, porque cambia
+    con la hora.
+    """
+
+    def __init__(self, ttl: float = CARGA_TTL):
+        self.ttl = ttl
+        self._teams: Dict[int, _CargaTeam] = {}
+        self._escrituras: Counter = Counter()
+        self._generacion = 0
+        self._lock = threading.Lock()
+
+    def _cargar(self, db, team_id: int) -> _CargaTeam:
+        with self._lock:
+            escrituras = self._escrituras[team_id], self._generacion
+
+        cargada = datetime.utcnow()
+        horizonte = cargada + timedelta(hours=TRAMOS_VENCIMIENTO[-1][0], seconds=self.ttl)
+        with shards.sesion_team(db, team_id) as tdb:
+            tramo = case(
+                (Task.due_date <= cargada, TRAMO_VENCIDA),
+                (Task.due_date <= horizonte, TRAMO_CERCANA),
+                else_=TRAMO_LEJANA
+            )
+            abiertas = select(
+                Task.asignado_a,
+                Task.prioridad,
+                tramo.label("tramo"),
+                case((tramo == TRAMO_CERCANA, Task.due_date), else_=None).label("due_date")
+            ).where(
+                Task.team_id == team_id,
+                Task.asignado_a.is_not(None),
+                Task.estado.in_(ESTADOS_ABIERTOS)
+            ).subquery()
+            # Agrupando sobre la subconsulta, MySQL (ONLY_FULL_GROUP_BY) no
+            # compara los CASE del SELECT y del GROUP BY, que llevan parámetros
+            filas = tdb.execute(select(
+                abiertas.c.asignado_a, abiertas.c.prioridad, abiertas.c.tramo, abiertas.c.due_date, func.count()
+            ).group_by(
+                abiertas.c.asignado_a, abiertas.c.prioridad, abiertas.c.tramo, abiertas.c.due_date
+            )).all()
+
+        usuarios: Dict[int, Counter] = {}
+        for asignado_a, prioridad, tramo_fila, due_date, tareas in filas:
+            due_date = VENCIDA if tramo_fila == TRAMO_VENCIDA else due_date
+            usuarios.setdefault(asignado_a, Counter())[(TaskPriority(prioridad), due_date)] += tareas
+
+        with self._lock:
+            # Si hubo escrituras durante la consulta puede faltar o sobrar alguna:
+            # se usa igual y se recarga en la próxima lectura
+            vence = time.monotonic() + self.ttl if (self._escrituras[team_id], self._generacion) == escrituras else 0.0
+            carga = self._teams[team_id] = _CargaTeam(usuarios, vence, cargada, horizonte)
+        return carga
+
+    def cargas(self, db, team_id: int) -> Dict[int, Counter]:
+        """Carga de cada usuario del equipo (copia), recargando si venció."""
+        with self._lock:
+            carga = self._teams.get(team_id)
+            if carga is not None and time.monotonic() < carga.vence:
+                return {user_id: Counter(c) for user_id, c in carga.usuarios.items()}
+        carga = self._cargar(db, team_id)
+        with self._lock:
+            return {user_id: Counter(c) for user_id, c in carga.usuarios.items()}
+
+    def registrar(self, antes: Optional[Clave], despues: Optional[Clave]):
+        """Reflejar una escritura confirmada (antes/después según `clave`)."""
+        if antes == despues:
+            return
+        with self._lock:
+            for clave_task, delta in ((antes, -1), (despues, 1)):
+                if clave_task is None:
+                    continue
+                team_id, user_id, prioridad, due_date = clave_task
+                self._escrituras[team_id] += 1
+                carga = self._teams.get(team_id)
+                if carga is None:
+                    continue
+                tareas = carga.usuarios.setdefault(user_id, Counter())
+                clave_carga = (prioridad, carga.normalizar(due_date))
+                tareas[clave_carga] += delta
+                if tareas[clave_carga] <= 0:
+                    del tareas[clave_carga]
+
+    def olvidar(self, team_id: int):
+        with self._lock:
+            self._teams.pop(team_id, None)
+            self._escrituras.pop(team_id, None)
+
+    def olvidar_user(self, user_id: int):
+        """
+        Quitar la carga de un usuario eliminado de todos los equipos (la base
+        pone sus tareas sin asignar con ON DELETE SET NULL).
+        """
+        with self._lock:
+            # Invalida también las cargas de equipos que estén en curso
+            self._generacion += 1
+            for carga in self._teams.values():
+                carga.usuarios.pop(user_id, None)
+
+
+indice_carga = IndiceCarga()
+
+
+def _resumen(tareas: Counter, ahora: datetime) -> dict:
+    por_prioridad = Counter()
+    puntos = 0.0
+    vencidas = proximas = 0
+    for (prioridad, due_date), n in tareas.items():
+        por_prioridad[prioridad.value] += n
+        puntos += n * PESOS_PRIORIDAD[prioridad] * factor_vencimiento(due_date, ahora)
+        if due_date is not None:
+            horas = (due_date - ahora).total_seconds() / 3600
+            if horas <= 0:
+                vencidas += n
+            elif horas <= TRAMOS_VENCIMIENTO[-1][0]:
+                proximas += n
+    return {
+        "carga": round(puntos, 2),
+        "abiertas": sum(por_prioridad.values()),
+        "por_prioridad": {p.value: por_prioridad[p.value] for p in TaskPriority},
+        "vencidas": vencidas,
+        "vencen_7_dias": proximas,
+    }
+
+
+def sugerir(db, team_id: int, limit: Optional[int] = None) -> List[dict]:
+    """
+    Miembros activos del equipo ordenados de menor a mayor carga (empates por
+    tareas abiertas y luego por ID).
+    """
+    miembros = db.execute(lambda_stmt(lambda: select(
+        User.id, User.nombre, User.email, UserTeam.role
+    ).join(
+        UserTeam, UserTeam.user_id == User.id
+    ).where(
+        UserTeam.team_id == team_id,
+        User.activo == True
+    ))).all()
+    if not miembros:
+        return []
+
+    cargas = indice_carga.cargas(db, team_id)
+    ahora = datetime.utcnow()
+    candidatos = [
+        {
+            "user_id": m.id,
+            "nombre": m.nombre,
+            "email": m.email,
+            "role": m.role,
+            **_resumen(cargas.get(m.id, Counter()), ahora),
+        }
+        for m in miembros
+    ]
+    candidatos.sort(key=lambda c: (c["carga"], c["abiertas"], c["user_id"]))
+    return candidatos[:limit] if limit is not None else candidatos
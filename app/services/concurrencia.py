@@ -0,0 +1,47 @@
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm.exc import StaleDataError
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def verificar_if_match(if_match: Optional[str], version: int, recurso: str):
+    """
+    Responder 412 si `If-Match` no incluye la versión actual.
+    Sin header la escritura sigue protegida por el UPDATE condicional.
+    """
+    if if_match is None:
+        return
+
+    etags = [e.strip() for e in if_match.split(",")]
+    if "*" in etags:
+        return
+
+    # Las versiones son exactas: se aceptan también ETags débiles (W/"3")
+    if etag(version) not in [e[2:] if e.startswith("W/") else e for e in etags]:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail=f"{recurso} cambió desde la última lectura (versión actual {version})"
+        )
+
+
+def conflicto(recurso: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail=f"{recurso} cambió durante la petición, vuelve a leerlo"
+    )
+
+
+def confirmar(db, recurso: str):
+    """
+    `db.commit()` traduciendo el conflicto de versión (otra petición modificó
+    la fila entre la lectura y el UPDATE) en un 412.
+    """
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise conflicto(recurso)
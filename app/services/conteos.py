@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, text
+
+from app.services.sentencias import es_sentencia, contar
+
+# A partir de este total el conteo exacto se cachea y se reutiliza como aproximado
+UMBRAL_EXACTO = int(os.getenv("TOTAL_COUNT_EXACT_THRESHOLD", "10000"))
+CACHE_TTL = float(os.getenv("TOTAL_COUNT_CACHE_TTL", "60"))
+CACHE_MAX_ENTRADAS = 4096
+
+# Tipos de conteo informados en X-Total-Count-Type
+EXACTO = "exact"
+CACHEADO = "cached"
+ESTIMADO = "estimate"
+
+_cache: Dict[Tuple, Tuple[float, int]] = {}
+_lock = threading.Lock()
+
+
+def _clave(tabla: str, filtros: dict) -> Tuple:
+    return (tabla,) + tuple(sorted((k, str(v)) for k, v in filtros.items() if v is not None))
+
+
+def _estimar_tabla(db, tabla: str, ocultas=None) -> Optional[int]:
+    """
+    Filas estimadas por el planner (solo MySQL, sin recorrer la tabla), menos
+    `ocultas`: un `SELECT count(...)` de las filas que el listado no muestra
+    (p. ej. equipos en borrado), que se cuenta solo si hay estimación.
+    """
+    if db.get_bind().dialect.name != "mysql":
+        return None
+
+    estimado = db.execute(
+        text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabla"
+        ),
+        {"tabla": tabla}
+    ).scalar()
+    if estimado is None or ocultas is None:
+        return estimado
+    return max(estimado - (ocultas.scalar() or 0), 0)
+
+
+def _conocido(db, tabla: str, filtros: dict, ocultas=None) -> Optional[Tuple[int, str]]:
+    clave = _clave(tabla, filtros)
+    with _lock:
+        entrada = _cache.get(clave)
+    if entrada and entrada[0] > time.monotonic():
+        return entrada[1], CACHEADO
+
+    if len(clave) == 1:
+        estimado = _estimar_tabla(db, tabla, ocultas)
+        if estimado is not None and estimado >= UMBRAL_EXACTO:
+            return estimado, ESTIMADO
+
+    return None
+
+
+def _guardar(tabla: str, filtros: dict, total: int):
+    with _lock:
+        if len(_cache) >= CACHE_MAX_ENTRADAS:
+            _cache.clear()
+        _cache[_clave(tabla, filtros)] = (time.monotonic() + CACHE_TTL, total)
+
+
+def _contar(db, query, tope: Optional[int] = None) -> int:
+    if es_sentencia(query):
+        return contar(db, query, tope)
+    if tope is None:
+        return query.order_by(None).count()
+    return db.query(func.count()).select_from(query.order_by(None).limit(tope).subquery()).scalar()
+
+
+def paginar_con_total(db, query, tabla: str, filtros: dict, skip: int, limit: int, response, ocultas=None) -> list:
+    """
+    Paginar `query` (Query o lambda statement) y escribir `X-Total-Count` /
+    `X-Total-Count-Type`.
+
+    - Total cacheado (`cached`) o, sin filtros en MySQL, la estimación del
+      planner menos las filas `ocultas` por el listado (`estimate`).
+    - Si no: conteo acotado a UMBRAL_EXACTO filas. Por debajo del umbral ya
+      es el total exacto; si llega al umbral se hace el conteo completo una
+      vez y se cachea CACHE_TTL segundos.
+    """
+    conocido = _conocido(db, tabla, filtros, ocultas)
+    if conocido is None:
+        total = _contar(db, query, tope=UMBRAL_EXACTO)
+        if total >= UMBRAL_EXACTO:
+            total = _contar(db, query)
+            _guardar(tabla, filtros, total)
+        conocido = total, EXACTO
+
+    if es_sentencia(query):
+        rows = db.execute(query + (lambda s: s.offset(skip).limit(limit))).all()
+    else:
+        rows = query.offset(skip).limit(limit).all()
+
+    total, tipo = conocido
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["X-Total-Count-Type"] = tipo
+    return rows
@@ -0,0 +1,176 @@
+import enum
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.responses import Response
+
+from app.models.task import TaskStatus, TaskPriority
+
+# Dependencias opcionales: solo se necesitan para los formatos binarios
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover
+    pa = None
+
+MSGPACK = "application/msgpack"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+# Filas por RecordBatch de Arrow
+ARROW_BATCH_SIZE = 10000
+
+# Campos de cada recurso: (nombre, tipo). Los enums se codifican como
+# diccionario fijo para que todos los batches compartan el mismo.
+CAMPOS_TASK = [
+    ("id", "int"), ("titulo", "str"), ("descripcion", "str"),
+    ("estado", TaskStatus), ("prioridad", TaskPriority),
+    ("team_id", "int"), ("asignado_a", "int"),
+    ("created_at", "datetime"), ("updated_at", "datetime"),
+    ("due_date", "datetime"), ("completed_at", "datetime"),
+    ("team_nombre", "str"), ("asignado_nombre", "str"), ("asignado_email", "str"),
+    ("archivada", "bool"),
+]
+CAMPOS_USER = [
+    ("id", "int"), ("nombre", "str"), ("email", "str"), ("activo", "bool"),
+    ("created_at", "datetime"), ("updated_at", "datetime"),
+]
+CAMPOS_TEAM = [
+    ("id", "int"), ("nombre", "str"), ("descripcion", "str"),
+    ("created_at", "datetime"), ("updated_at", "datetime"),
+]
+
+
+# Tipos de `Accept` que sirve cada formato (None: JSON)
+TIPOS_ACEPTADOS = {
+    ARROW_STREAM: ARROW_STREAM,
+    MSGPACK: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/json": None,
+    "application/*": None,
+    "*/*": None,
+}
+
+# Formato binario -> (módulo opcional, mensaje del 406 si falta)
+DISPONIBLES = {
+    ARROW_STREAM: (lambda: pa, "Formato Arrow no disponible (instalar pyarrow)"),
+    MSGPACK: (lambda: msgpack, "Formato MessagePack no disponible (instalar msgpack)"),
+}
+
+
+def _rangos(accept: str) -> List[Tuple[str, float]]:
+    """Rangos de `Accept` con q > 0, de mayor a menor q (a igual q, en el orden pedido)."""
+    rangos = []
+    for parte in accept.split(","):
+        tipo, *parametros = [p.strip() for p in parte.split(";")]
+        q = 1.0
+        for parametro in parametros:
+            nombre, _, valor = parametro.partition("=")
+            if nombre.strip().lower() == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        if tipo and q > 0:
+            rangos.append((tipo.lower(), q))
+    return sorted(rangos, key=lambda rango: -rango[1])
+
+
+def negociar(accept: Optional[str]) -> Optional[str]:
+    """
+    Formato binario pedido en `Accept`, o None para JSON.
+
+    Se respetan los q (q=0 descarta el tipo): gana el primer tipo aceptable
+    que se pueda servir. Un formato binario sin su dependencia instalada se
+    salta; solo si no queda otro aceptable se responde 406. Sin ningún tipo
+    conocido se responde JSON.
+    """
+    if not accept:
+        return None
+
+    faltante = None
+    for tipo, _ in _rangos(accept):
+        if tipo not in TIPOS_ACEPTADOS:
+            continue
+        formato = TIPOS_ACEPTADOS[tipo]
+        if formato is None:
+            return None
+        modulo, mensaje = DISPONIBLES[formato]
+        if modulo() is not None:
+            return formato
+        faltante = faltante or mensaje
+
+    if faltante is not None:
+        raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail=faltante)
+    return None
+
+
+def _valor(fila, campo: str):
+    return fila[campo] if isinstance(fila, dict) else getattr(fila, campo, None)
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    raise TypeError(f"Tipo no serializable: {type(obj)}")
+
+
+def _tipo_arrow(tipo):
+    if isinstance(tipo, type) and issubclass(tipo, enum.Enum):
+        return pa.dictionary(pa.int8(), pa.string())
+    return {
+        "int": pa.int64(),
+        "str": pa.string(),
+        "bool": pa.bool_(),
+        "datetime": pa.timestamp("us"),
+    }[tipo]
+
+
+def _columna_arrow(valores: list, tipo):
+    if isinstance(tipo, type) and issubclass(tipo, enum.Enum):
+        miembros = list(tipo)
+        posicion = {m: i for i, m in enumerate(miembros)}
+        indices = pa.array([None if v is None else posicion[tipo(v)] for v in valores], type=pa.int8())
+        return pa.DictionaryArray.from_arrays(indices, pa.array([m.value for m in miembros]))
+    return pa.array(valores, type=_tipo_arrow(tipo))
+
+
+def _arrow(filas: List, campos: List[Tuple]) -> bytes:
+    schema = pa.schema([(nombre, _tipo_arrow(tipo)) for nombre, tipo in campos])
+    sink = pa.BufferOutputStream()
+
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for i in range(0, len(filas), ARROW_BATCH_SIZE):
+            bloque = filas[i:i + ARROW_BATCH_SIZE]
+            columnas = [_columna_arrow([_valor(f, nombre) for f in bloque], tipo) for nombre, tipo in campos]
+            writer.write_batch(pa.RecordBatch.from_arrays(columnas, schema=schema))
+
+    return sink.getvalue().to_pybytes()
+
+
+def responder(formato: Optional[str], filas: List, campos: List[Tuple], response: Optional[Response] = None):
+    """
+    Serializar `filas` (dicts u objetos ORM) en el formato negociado.
+    Sin formato binario devuelve `filas` tal cual para la respuesta JSON.
+    Los headers `X-*` ya escritos en `response` se conservan.
+    """
+    if formato is None:
+        return filas
+
+    headers = response.headers.items() if response is not None else ()
+    extra = {k: v for k, v in headers if k.lower().startswith("x-")}
+
+    if formato == ARROW_STREAM:
+        return Response(content=_arrow(filas, campos), media_type=ARROW_STREAM, headers=extra)
+
+    contenido = msgpack.packb(
+        [{nombre: _valor(f, nombre) for nombre, _ in campos} for f in filas],
+        default=_msgpack_default
+    )
+    return Response(content=contenido, media_type=MSGPACK, headers=extra)
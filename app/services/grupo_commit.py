@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.database import SHARDS, sesion_compartida
+from app.services.concurrencia import confirmar, conflicto
+
+# Group commit para mutaciones pequeñas y frecuentes (cambiar estado, asignar):
+# las que llegan dentro de GROUP_COMMIT_MS se aplican en una sola transacción.
+# 0 = desactivado (cada petición confirma su propia transacción).
+GROUP_COMMIT_MS = float(os.getenv("GROUP_COMMIT_MS", "0"))
+GROUP_COMMIT_MAX = int(os.getenv("GROUP_COMMIT_MAX", "64"))
+
+MUESTRAS_ESPERA = 1024  # últimas esperas para los percentiles
+
+
+class _Operacion:
+    def __init__(self, funcion: Callable, recurso: str):
+        self.funcion = funcion
+        self.recurso = recurso
+        self.encolada = time.perf_counter()
+        self.futuro = Future()
+
+
+class _Grupo:
+    def __init__(self):
+        self.operaciones: List[_Operacion] = []
+        self.lleno = threading.Event()
+
+
+class MetricasGrupoCommit:
+    def __init__(self):
+        self.operaciones = 0
+        self.commits = 0
+        self.reintentos = 0
+        self.esperas_ms = deque(maxlen=MUESTRAS_ESPERA)
+        self._lock = threading.Lock()
+
+    def observar_lote(self, operaciones: List[_Operacion], inicio: float, commits: int, reintentos: int):
+        with self._lock:
+            self.operaciones += len(operaciones)
+            self.commits += commits
+            self.reintentos += reintentos
+            self.esperas_ms.extend((inicio - op.encolada) * 1000 for op in operaciones)
+
+    def estado(self) -> dict:
+        with self._lock:
+            esperas = sorted(self.esperas_ms)
+            operaciones, commits, reintentos = self.operaciones, self.commits, self.reintentos
+
+        def percentil(p):
+            return round(esperas[min(int(len(esperas) * p), len(esperas) - 1)], 3) if esperas else 0.0
+
+        return {
+            "ventana_ms": GROUP_COMMIT_MS,
+            "max_operaciones": GROUP_COMMIT_MAX,
+            "operaciones": operaciones,
+            "commits": commits,
+            "operaciones_por_commit": round(operaciones / commits, 2) if commits else 0.0,
+            "reintentos": reintentos,
+            "espera_p50_ms": percentil(0.50),
+            "espera_p95_ms": percentil(0.95),
+            "espera_p99_ms": percentil(0.99),
+        }
+
+
+class GrupoCommit:
+    """
+    Agrupa mutaciones concurrentes en una sola transacción.
+
+    La primera operación que llega abre un grupo y hace de líder: espera la
+    ventana (o a que el grupo se llene), aplica todas las operaciones en orden
+    en una sesión propia y confirma una vez. Cada petición recibe su propio
+    resultado o su propia excepción: si una operación falla se deshace la
+    transacción, esa operación recibe el error y las anteriores se vuelven a
+    aplicar sin ella.
+
+    Las operaciones corren en el hilo del líder, no en el de su petición:
+    solo usan la sesión recibida y valores planos capturados de antemano
+    (nunca otra sesión de la petición, que no es segura entre hilos), y
+    devuelven valores planos (no objetos ORM, que quedan expirados tras el
+    commit). Con sharding hay un grupo por shard: el de la sesión recibida
+    (`db.info["shard"]`).
+
+    No hay un savepoint por operación: en pysqlite no son fiables (el driver
+    no emite BEGIN hasta la primera escritura), así que una operación fallida
+    deshace el grupo y se reaplican las demás. Por lo mismo, las operaciones
+    tampoco abren savepoints propios (el rollup de throughput usa un upsert).
+    """
+
+    def __init__(self, ventana_ms: float = GROUP_COMMIT_MS, maximo: int = GROUP_COMMIT_MAX, fabricas=SHARDS):
+        self.ventana = ventana_ms / 1000
+        self.maximo = maximo
+        self.fabricas = fabricas
+        self.metricas = MetricasGrupoCommit()
+        self._grupos: Dict[int, _Grupo] = {}
+        self._lock = threading.Lock()
+
+    def ejecutar(self, db, funcion: Callable, recurso: str):
+        """
+        Aplicar `funcion(db)` y confirmar. Con el group commit activo la
+        confirmación se comparte con las demás operaciones del grupo.
+        """
+        # Las sub-peticiones de POST /batch ya comparten transacción
+        if self.ventana <= 0 or sesion_compartida.get() is not None:
+            resultado = funcion(db)
+            confirmar(db, recurso)
+            return resultado
+
+        shard = db.info.get("shard", 0)
+        operacion = _Operacion(funcion, recurso)
+        with self._lock:
+            grupo = self._grupos.get(shard)
+            lider = grupo is None
+            if lider:
+                grupo = self._grupos[shard] = _Grupo()
+            grupo.operaciones.append(operacion)
+            if len(grupo.operaciones) >= self.maximo:
+                # Lleno: las siguientes abren otro grupo
+                del self._grupos[shard]
+                grupo.lleno.set()
+
+        if lider:
+            grupo.lleno.wait(self.ventana)
+            with self._lock:
+                if self._grupos.get(shard) is grupo:
+                    del self._grupos[shard]
+            self._aplicar(grupo.operaciones, self.fabricas[shard])
+
+        return operacion.futuro.result()
+
+    def _aplicar(self, operaciones: List[_Operacion], db_factory):
+        inicio = time.perf_counter()
+        pendientes = list(operaciones)
+        commits = reintentos = 0
+
+        while pendientes:
+            db = db_factory()
+            fallida = None
+            try:
+                resultados = []
+                for i, operacion in enumerate(pendientes):
+                    try:
+                        resultados.append(operacion.funcion(db))
+                        db.flush()
+                    except StaleDataError:
+                        operacion.futuro.set_exception(conflicto(operacion.recurso))
+                        fallida = i
+                        break
+                    except Exception as e:
+                        operacion.futuro.set_exception(e)
+                        fallida = i
+                        break
+
+                if fallida is None:
+                    # Todo está en la BD tras los flush: el commit es del grupo entero
+                    db.commit()
+                    commits += 1
+                    for operacion, resultado in zip(pendientes, resultados):
+                        operacion.futuro.set_result(resultado)
+                    break
+
+                db.rollback()
+            except BaseException as e:
+                for operacion in pendientes:
+                    if not operacion.futuro.done():
+                        operacion.futuro.set_exception(e)
+                raise
+            finally:
+                db.close()
+
+            # Las anteriores a la fallida se deshicieron con ella: se reaplican
+            reintentos += fallida
+            pendientes = pendientes[:fallida] + pendientes[fallida + 1:]
+
+        self.metricas.observar_lote(operaciones, inicio, commits, reintentos)
+
+
+grupo_commit = GrupoCommit()
@@ -0,0 +1,238 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import update
+
+from app.database import SessionLocal
+from app.models.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+# Configuración del runner
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_BACKOFF_BASE = 5.0        # segundos; se duplica en cada reintento
+JOB_BACKOFF_MAX = 300.0
+JOB_LOCK_TIMEOUT = 600.0      # un trabajo "running" sin latido en este tiempo se considera abandonado
+
+# tipo -> handler(db, payload, progreso) -> resultado
+_handlers: Dict[str, Callable] = {}
+
+
+def registrar(tipo: str):
+    """Decorador para registrar el handler de un tipo de trabajo."""
+    def decorador(func: Callable):
+        _handlers[tipo] = func
+        return func
+    return decorador
+
+
+def encolar(db, tipo: str, payload: Optional[dict] = None, max_intentos: int = 3) -> Job:
+    """Crear un trabajo pendiente. Se confirma junto con la transacción de `db`."""
+    if tipo not in _handlers:
+        raise ValueError(f"Tipo de trabajo desconocido: {tipo}")
+
+    job = Job(tipo=tipo, payload=payload, max_intentos=max_intentos)
+    db.add(job)
+    return job
+
+
+def calcular_backoff(intentos: int) -> timedelta:
+    return timedelta(seconds=min(JOB_BACKOFF_BASE * 2 ** (intentos - 1), JOB_BACKOFF_MAX))
+
+
+class JobRunner:
+    """
+    Runner de trabajos en segundo plano sobre la tabla `jobs`.
+
+    Un hilo consulta los trabajos listos y los reparte en un pool de hilos.
+    Cada trabajo se reclama con un UPDATE condicional
+    (`WHERE id = ? AND estado = 'pending'`): solo el worker cuyo UPDATE afecta
+    la fila lo ejecuta, así varios procesos pueden compartir la tabla sin
+    ejecutar dos veces el mismo trabajo, tanto en SQLite como en MySQL.
+    """
+
+    def __init__(self, db_factory=SessionLocal, workers: int = JOB_WORKERS):
+        self.db_factory = db_factory
+        self.workers = workers
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._ocupados = threading.Semaphore(workers)
+        self._despertar = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="jobs")
+        self._thread = threading.Thread(target=self._run, name="jobs-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._despertar.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def notificar(self):
+        """Avisar que hay trabajos nuevos para no esperar al siguiente poll."""
+        self._despertar.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._liberar_abandonados()
+                while self._ocupados.acquire(blocking=False):
+                    job_id = self._reclamar()
+                    if job_id is None:
+                        self._ocupados.release()
+                        break
+                    self._executor.submit(self._ejecutar, job_id)
+            except Exception:
+                logger.exception("Error en el poller de trabajos")
+
+            self._despertar.wait(JOB_POLL_INTERVAL)
+            self._despertar.clear()
+
+    def _reclamar(self) -> Optional[int]:
+        """Reclamar el siguiente trabajo listo; None si no hay ninguno."""
+        db = self.db_factory()
+        try:
+            ahora = datetime.utcnow()
+            candidatos = db.query(Job.id).filter(
+                Job.estado == JobStatus.PENDING,
+                Job.run_after <= ahora
+            ).order_by(Job.run_after, Job.id).limit(self.workers).all()
+
+            for candidato in candidatos:
+                reclamado = db.execute(
+                    update(Job)
+                    .where(Job.id == candidato.id, Job.estado == JobStatus.PENDING)
+                    .values(
+                        estado=JobStatus.RUNNING,
+                        locked_by=self.worker_id,
+                        locked_at=ahora,
+                        intentos=Job.intentos + 1,
+                        updated_at=ahora
+                    )
+                ).rowcount
+                db.commit()
+                if reclamado == 1:
+                    return candidato.id
+            return None
+        finally:
+            db.close()
+
+    def _liberar_abandonados(self):
+        """
+        Recuperar los trabajos cuyo worker dejó de dar latidos. La ejecución
+        abandonada cuenta como intento (se sumó al reclamarlo): si ya agotó
+        `max_intentos` el trabajo falla en lugar de volver a pending, así un
+        trabajo que tumba el proceso no se reintenta para siempre.
+        """
+        db = self.db_factory()
+        try:
+            ahora = datetime.utcnow()
+            limite = ahora - timedelta(seconds=JOB_LOCK_TIMEOUT)
+            abandonado = (Job.estado == JobStatus.RUNNING, Job.locked_at < limite)
+            db.execute(
+                update(Job)
+                .where(*abandonado, Job.intentos >= Job.max_intentos)
+                .values(
+                    estado=JobStatus.FAILED,
+                    error=f"Sin latido del worker durante {JOB_LOCK_TIMEOUT:.0f}s en el último intento",
+                    locked_by=None,
+                    locked_at=None,
+                    finished_at=ahora,
+                    updated_at=ahora
+                )
+            )
+            db.execute(
+                update(Job)
+                .where(*abandonado)
+                .values(
+                    estado=JobStatus.PENDING,
+                    error=f"Sin latido del worker durante {JOB_LOCK_TIMEOUT:.0f}s",
+                    locked_by=None,
+                    locked_at=None,
+                    updated_at=ahora
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _guardar(self, job_id: int, **campos):
+        """
+        Actualizar el trabajo (solo si sigue reclamado por este worker).
+        Cada llamada renueva `locked_at`: el progreso de los handlers hace de
+        latido y un trabajo largo no se da por abandonado mientras avance.
+        """
+        ahora = datetime.utcnow()
+        db = self.db_factory()
+        try:
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.locked_by == self.worker_id)
+                .values(**{"updated_at": ahora, "locked_at": ahora, **campos})
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _ejecutar(self, job_id: int):
+        db = self.db_factory()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if job is None:
+                # La fila se borró entre el reclamo y la ejecución
+                logger.warning("Trabajo %s reclamado pero ya no existe; se omite", job_id)
+                return
+            handler = _handlers.get(job.tipo)
+            intentos, max_intentos = job.intentos, job.max_intentos
+
+            try:
+                if handler is None:
+                    raise ValueError(f"Tipo de trabajo desconocido: {job.tipo}")
+                resultado = handler(db, job.payload or {}, lambda progreso: self._guardar(job_id, progreso=progreso))
+            except Exception as e:
+                db.rollback()
+                logger.exception("Trabajo %s (%s) falló en el intento %s", job_id, job.tipo, intentos)
+
+                if handler is not None and intentos < max_intentos:
+                    self._guardar(
+                        job_id,
+                        estado=JobStatus.PENDING,
+                        error=str(e),
+                        run_after=datetime.utcnow() + calcular_backoff(intentos),
+                        locked_by=None,
+                        locked_at=None
+                    )
+                else:
+                    self._guardar(job_id, estado=JobStatus.FAILED, error=str(e), finished_at=datetime.utcnow())
+                return
+
+            self._guardar(
+                job_id,
+                estado=JobStatus.COMPLETED,
+                resultado=resultado,
+                error=None,
+                finished_at=datetime.utcnow()
+            )
+        finally:
+            db.close()
+            self._ocupados.release()
+            self._despertar.set()
+
+
+runner = JobRunner()
@@ -0,0 +1,53 @@
+from fastapi import HTTPException, status
+from typing import Callable, List, Tuple
+
+from app.services.sentencias import es_sentencia
+
+# Límite de IDs por petición y tamaño de cada bloque del IN (...)
+MAX_IDS = 5000
+CHUNK_SIZE = 500
+
+
+def parse_ids(ids: str) -> List[int]:
+    """Convertir "1,2,3" en [1, 2, 3] validando formato y límite."""
+    try:
+        lista = [int(i) for i in ids.split(",") if i.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El parámetro 'ids' debe ser una lista de enteros separados por coma"
+        )
+
+    if len(lista) > MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Se permiten como máximo {MAX_IDS} IDs por petición"
+        )
+
+    return lista
+
+
+def cargar_por_ids(query, columna_id, ids: List[int], obtener_id: Callable, db=None) -> Tuple[list, List[int]]:
+    """
+    Resolver `ids` con queries `IN` por bloques de CHUNK_SIZE.
+    
+    `query` puede ser un lambda statement: en ese caso se ejecuta con `db`.
+    Devuelve las filas en el mismo orden de `ids` (sin duplicados) y la lista
+    de IDs que no existen.
+    """
+    unicos = list(dict.fromkeys(ids))
+    encontrados = {}
+
+    for i in range(0, len(unicos), CHUNK_SIZE):
+        bloque = unicos[i:i + CHUNK_SIZE]
+        if es_sentencia(query):
+            rows = db.execute(query + (lambda s: s.where(columna_id.in_(bloque)))).all()
+        else:
+            rows = query.filter(columna_id.in_(bloque)).all()
+        for row in rows:
+            encontrados[obtener_id(row)] = row
+
+    items = [encontrados[i] for i in unicos if i in encontrados]
+    faltantes = [i for i in unicos if i not in encontrados]
+
+    return items, faltantes
@@ -0,0 +1,73 @@
+from sqlalchemy import func
+
+from app.models.task import Task
+from app.models.task_archive import TaskArchive
+from app.models.team import Team
+from app.models.team_shard import TeamShard
+from app.models.team_throughput import TeamThroughput
+from app.models.user_team import UserTeam
+from app.services.jobs import registrar
+from app.services.vencimientos import scheduler
+from app.services import shards
+
+# Filas borradas por transacción: acota el tiempo que se mantienen los locks
+CHUNK_SIZE = 1000
+
+
+def _borrar_en_bloques(db, modelo, team_id: int, avance: dict, campo: str, progreso):
+    while True:
+        ids = [row.id for row in db.query(modelo.id).filter(modelo.team_id == team_id).limit(CHUNK_SIZE).all()]
+        if not ids:
+            return
+
+        db.query(modelo).filter(modelo.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+
+        if modelo is Task:
+            for task_id in ids:
+                scheduler.cancelar(task_id)
+
+        avance[campo] += len(ids)
+        progreso(dict(avance))
+
+
+@registrar("purgar_team")
+def purgar_team(db, payload: dict, progreso):
+    """
+    Borrar un equipo marcado como `eliminando`.
+
+    Las tareas (activas y archivadas) y membresías se borran en bloques de
+    CHUNK_SIZE, una transacción por bloque, y la fila del equipo al final.
+    Con sharding las tareas se borran de todos los shards (incluidas copias
+    de un movimiento a medias). Es idempotente: si se reintenta continúa con
+    lo que quede.
+    """
+    team_id = payload["team_id"]
+
+    avance = {
+        "tasks_total": 0,
+        "tasks_eliminadas": 0,
+        "miembros_total": db.query(func.count(UserTeam.id)).filter(UserTeam.team_id == team_id).scalar(),
+        "miembros_eliminados": 0,
+        "archivadas_total": 0,
+        "archivadas_eliminadas": 0,
+    }
+    for shard, sdb in shards.sesiones(db):
+        avance["tasks_total"] += sdb.query(func.count(Task.id)).filter(Task.team_id == team_id).scalar()
+        avance["archivadas_total"] += sdb.query(func.count(TaskArchive.id)).filter(TaskArchive.team_id == team_id).scalar()
+    progreso(dict(avance))
+
+    for shard, sdb in shards.sesiones(db):
+        _borrar_en_bloques(sdb, Task, team_id, avance, "tasks_eliminadas", progreso)
+        _borrar_en_bloques(sdb, TaskArchive, team_id, avance, "archivadas_eliminadas", progreso)
+        if shard > 0:
+            # Fuera del shard 0 no hay claves foráneas que borren el rollup en cascada
+            sdb.query(TeamThroughput).filter(TeamThroughput.team_id == team_id).delete(synchronize_session=False)
+            sdb.commit()
+    _borrar_en_bloques(db, UserTeam, team_id, avance, "miembros_eliminados", progreso)
+
+    db.query(TeamShard).filter(TeamShard.team_id == team_id).delete(synchronize_session=False)
+    db.query(Team).filter(Team.id == team_id, Team.eliminando == True).delete(synchronize_session=False)
+    db.commit()
+
+    return avance
@@ -0,0 +1,102 @@
+import threading
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import event, func, lambda_stmt, select
+from sqlalchemy.sql.lambdas import StatementLambdaElement
+
+from app.models.team import Team
+
+# Consultas calientes como lambda statements: SQLAlchemy guarda la sentencia
+# construida y su cache key por ubicación del lambda, y en cada petición solo
+# extrae los valores de las variables del closure como parámetros. Dentro de
+# un lambda no se opera con esos valores (p. ej. f"%{x}%" o skip + limit): se
+# calculan fuera y el lambda solo los referencia.
+
+
+def es_sentencia(query) -> bool:
+    """True si `query` es un lambda statement (se ejecuta con `db.execute`)."""
+    return isinstance(query, StatementLambdaElement)
+
+
+def por_id(db, modelo, id_: int):
+    """Equivalente a `db.query(modelo).filter(modelo.id == id_).first()`."""
+    return db.execute(lambda_stmt(lambda: select(modelo).where(modelo.id == id_))).scalars().first()
+
+
+def team_activo(db, team_id: int):
+    """Equipo por ID, salvo que esté marcado para borrado."""
+    return db.execute(
+        lambda_stmt(lambda: select(Team).where(Team.id == team_id, Team.eliminando == False))
+    ).scalars().first()
+
+
+def contar(db, sentencia, tope: Optional[int] = None) -> int:
+    """
+    `SELECT count(*)` sobre un lambda statement (como `Query.count()`); con
+    `tope`, cuenta como mucho esas filas (la subconsulta lleva LIMIT).
+    """
+    if tope is None:
+        return db.execute(
+            sentencia + (lambda s: select(func.count()).select_from(s.order_by(None).subquery()))
+        ).scalar()
+    return db.execute(
+        sentencia + (lambda s: select(func.count()).select_from(s.order_by(None).limit(tope).subquery()))
+    ).scalar()
+
+
+class MetricasCacheSql:
+    """
+    Aciertos del cache de sentencias compiladas de SQLAlchemy, contados en
+    cada ejecución a partir del contexto del engine.
+    """
+
+    def __init__(self):
+        self._estados = Counter()
+        self._engines = []
+        self._lock = threading.Lock()
+
+    def registrar(self, engine):
+        self._engines.append(engine)
+        dialecto = engine.dialect
+        estados = {
+            dialecto.CACHE_HIT: "hits",
+            dialecto.CACHE_MISS: "misses",
+            dialecto.NO_CACHE_KEY: "sin_clave",
+            dialecto.NO_DIALECT_SUPPORT: "sin_soporte",
+        }
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _ejecutada(conn, cursor, statement, parameters, context, executemany):
+            if context is None or context.compiled is None:
+                estado = "sql_textual"
+            else:
+                estado = estados.get(context.cache_hit, "desactivado")
+            with self._lock:
+                self._estados[estado] += 1
+
+    def estado(self) -> dict:
+        with self._lock:
+            estados = dict(self._estados)
+
+        hits, misses = estados.get("hits", 0), estados.get("misses", 0)
+        return {
+            **{k: estados.get(k, 0) for k in ("hits", "misses", "sin_clave", "sin_soporte", "desactivado", "sql_textual")},
+            "ratio_hits": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "engines": [
+                {
+                    "url": engine.url.render_as_string(hide_password=True),
+                    # LRU de SQLAlchemy (query_cache_size); None si está desactivado
+                    "entradas": len(engine._compiled_cache) if engine._compiled_cache is not None else None,
+                    "capacidad": engine._compiled_cache.capacity if engine._compiled_cache is not None else None,
+                }
+                for engine in self._engines
+            ],
+        }
+
+    def reiniciar(self):
+        with self._lock:
+            self._estados.clear()
+
+
+metricas_cache = MetricasCacheSql()
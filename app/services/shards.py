@@ -0,0 +1,334 @@
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import func, inspect, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.database import SHARDS, SHARD_ENGINES, SessionLocal, get_db
+from app.models.secuencia import Secuencia
+from app.models.task import Task
+from app.models.task_archive import TaskArchive
+from app.models.team import Team
+from app.models.team_shard import TeamShard
+from app.models.team_throughput import TeamThroughput
+
+# Sharding de tareas por team_id. Con SHARD_URLS (ver app/database.py) las
+# tablas de tareas se reparten entre DATABASE_URL (shard 0) y esas bases;
+# equipos, usuarios y trabajos quedan siempre en la principal.
+SHARD_MAP_TTL = float(os.getenv("SHARD_MAP_TTL", "2"))
+BLOQUE_IDS = 1000           # IDs de tareas reservados por viaje a la base principal
+MAX_TASKS_CACHEADAS = 100_000
+
+# Todo lo que se particiona por team_id: viaja junto al mover un equipo
+MODELOS_SHARD = (Task, TaskArchive, TeamThroughput)
+
+
+def habilitado() -> bool:
+    return len(SHARDS) > 1
+
+
+def crear_tablas():
+    """
+    Crear en los shards adicionales las tablas de MODELOS_SHARD, sin las
+    claves foráneas a equipos y usuarios (esas tablas solo están en el shard 0).
+    """
+    for engine in SHARD_ENGINES[1:]:
+        with engine.begin() as conn:
+            existentes = set(inspect(conn).get_table_names())
+            for modelo in MODELOS_SHARD:
+                tabla = modelo.__table__
+                if tabla.name in existentes:
+                    continue
+                conn.execute(CreateTable(tabla, include_foreign_key_constraints=[]))
+                for indice in tabla.indexes:
+                    conn.execute(CreateIndex(indice))
+
+
+class MapaShards:
+    """
+    Copia en memoria de `team_shards`, recargada cada SHARD_MAP_TTL segundos.
+
+    El movedor de equipos (`python -m app.mover_team`) espera al menos ese
+    tiempo entre cada cambio del mapa para que todos los procesos lo vean.
+    """
+
+    def __init__(self, db_factory=SessionLocal, ttl: float = SHARD_MAP_TTL):
+        self.db_factory = db_factory
+        self.ttl = ttl
+        self._shards: Dict[int, int] = {}
+        self._bloqueados: Set[int] = set()
+        self._excluidos: Dict[int, Set[int]] = {}
+        self._vence = 0.0
+        self._lock = threading.Lock()
+
+    def _refrescar(self):
+        with self._lock:
+            if time.monotonic() < self._vence:
+                return
+
+            db = self.db_factory()
+            try:
+                filas = db.query(TeamShard).all()
+                eliminando = {row.id for row in db.query(Team.id).filter(Team.eliminando == True)}
+            finally:
+                db.close()
+
+            self._shards = {f.team_id: f.shard for f in filas}
+            self._bloqueados = {f.team_id for f in filas if f.bloqueado}
+            # Por shard: equipos en borrado y copias de equipos en movimiento
+            self._excluidos = {shard: set(eliminando) for shard in range(len(SHARDS))}
+            for f in filas:
+                if f.shard_copia is not None and f.shard_copia in self._excluidos:
+                    self._excluidos[f.shard_copia].add(f.team_id)
+            self._vence = time.monotonic() + self.ttl
+
+    def invalidar(self):
+        with self._lock:
+            self._vence = 0.0
+
+    def shard(self, team_id: int) -> int:
+        self._refrescar()
+        shard = self._shards.get(team_id)
+        if shard is None:
+            # Equipo creado después de la última recarga (o anterior al sharding)
+            db = self.db_factory()
+            try:
+                shard = db.query(TeamShard.shard).filter(TeamShard.team_id == team_id).scalar()
+            finally:
+                db.close()
+            if shard is None:
+                return 0
+            with self._lock:
+                self._shards[team_id] = shard
+        return shard
+
+    def bloqueado(self, team_id: int) -> bool:
+        self._refrescar()
+        return team_id in self._bloqueados
+
+    def excluidos(self, shard: int) -> Set[int]:
+        """Equipos cuyas filas en `shard` no deben leerse."""
+        self._refrescar()
+        return self._excluidos.get(shard, set())
+
+
+mapa = MapaShards()
+
+
+def ubicar_team(db, team_id: int):
+    """
+    Asignar shard a un equipo nuevo (se confirma con la transacción de `db`).
+    Los equipos sin fila en `team_shards` quedan en el shard 0.
+    """
+    if habilitado():
+        db.add(TeamShard(team_id=team_id, shard=team_id % len(SHARDS)))
+
+
+class SecuenciaIds:
+    """
+    IDs de tareas únicos entre shards (hi/lo): cada proceso reserva bloques
+    de BLOQUE_IDS en la base principal y los reparte desde memoria.
+    """
+
+    def __init__(self, nombre: str, db_factory=SessionLocal):
+        self.nombre = nombre
+        self.db_factory = db_factory
+        self._siguiente = 0
+        self._fin = 0
+        self._lock = threading.Lock()
+
+    def siguiente(self) -> int:
+        with self._lock:
+            if self._siguiente >= self._fin:
+                self._siguiente = self._reservar()
+                self._fin = self._siguiente + BLOQUE_IDS
+            valor = self._siguiente
+            self._siguiente += 1
+            return valor
+
+    def _reservar(self) -> int:
+        db = self.db_factory()
+        try:
+            reservado = db.execute(
+                update(Secuencia)
+                .where(Secuencia.nombre == self.nombre)
+                .values(siguiente=Secuencia.siguiente + BLOQUE_IDS)
+            ).rowcount
+            if reservado:
+                fin = db.query(Secuencia.siguiente).filter(Secuencia.nombre == self.nombre).scalar()
+                db.commit()
+                return fin - BLOQUE_IDS
+
+            # Primera reserva: continuar después del mayor ID de cualquier shard
+            inicio = max(scatter(_max_id_task)) + 1
+            db.add(Secuencia(nombre=self.nombre, siguiente=inicio + BLOQUE_IDS))
+            try:
+                db.commit()
+            except IntegrityError:
+                # Otro proceso creó la secuencia primero
+                db.rollback()
+                return self._reservar()
+            return inicio
+        finally:
+            db.close()
+
+
+def _max_id_task(db, shard: int) -> int:
+    return max(
+        db.query(func.max(Task.id)).scalar() or 0,
+        db.query(func.max(TaskArchive.id)).scalar() or 0
+    )
+
+
+ids_tasks = SecuenciaIds("tasks")
+
+
+class _CacheTasks:
+    """task_id -> team_id (el equipo de una tarea no cambia), LRU acotado."""
+
+    def __init__(self, maximo: int = MAX_TASKS_CACHEADAS):
+        self.maximo = maximo
+        self._teams: "OrderedDict[int, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, task_id: int) -> Optional[int]:
+        with self._lock:
+            team_id = self._teams.get(task_id)
+            if team_id is not None:
+                self._teams.move_to_end(task_id)
+            return team_id
+
+    def guardar(self, task_id: int, team_id: int):
+        with self._lock:
+            self._teams[task_id] = team_id
+            self._teams.move_to_end(task_id)
+            if len(self._teams) > self.maximo:
+                self._teams.popitem(last=False)
+
+
+_teams_de_tasks = _CacheTasks()
+
+
+def recordar_task(task_id: int, team_id: int):
+    if habilitado():
+        _teams_de_tasks.guardar(task_id, team_id)
+
+
+def team_de_task(task_id: int) -> Optional[int]:
+    """Equipo de una tarea (activa o archivada), buscándola en todos los shards."""
+    team_id = _teams_de_tasks.get(task_id)
+    if team_id is not None:
+        return team_id
+
+    def buscar(db, shard):
+        return (
+            db.query(Task.team_id).filter(Task.id == task_id).scalar()
+            or db.query(TaskArchive.team_id).filter(TaskArchive.id == task_id).scalar()
+        )
+
+    for team_id in scatter(buscar):
+        if team_id is not None:
+            recordar_task(task_id, team_id)
+            return team_id
+    return None
+
+
+def verificar_escritura(team_id: int):
+    """503 mientras el equipo está en el corte final de un movimiento."""
+    if mapa.bloqueado(team_id):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"El equipo {team_id} se está moviendo de shard, reintenta en unos segundos",
+            headers={"Retry-After": str(max(int(SHARD_MAP_TTL), 1))}
+        )
+
+
+_executor = ThreadPoolExecutor(max_workers=max(4 * len(SHARDS), 4), thread_name_prefix="shards")
+
+
+def scatter(funcion: Callable, shards: Optional[Iterable[int]] = None) -> list:
+    """
+    Ejecutar `funcion(db, shard)` en paralelo en cada shard (o en `shards`),
+    cada uno con su sesión, y devolver los resultados en el mismo orden.
+    """
+    def en_shard(shard):
+        db = SHARDS[shard]()
+        db.info["shard"] = shard
+        try:
+            return funcion(db, shard)
+        finally:
+            db.close()
+
+    # Copia del contexto por shard: la ruta de origen llega al registro de consultas
+    futuros = [
+        _executor.submit(contextvars.copy_context().run, en_shard, shard)
+        for shard in (range(len(SHARDS)) if shards is None else shards)
+    ]
+    return [f.result() for f in futuros]
+
+
+def sesiones(db):
+    """
+    (shard, sesión) de cada shard para recorrerlos en orden: `db` para el
+    shard 0 y una sesión propia (cerrada al avanzar) para el resto.
+    """
+    yield 0, db
+    for shard in range(1, len(SHARDS)):
+        sdb = SHARDS[shard]()
+        sdb.info["shard"] = shard
+        try:
+            yield shard, sdb
+        finally:
+            sdb.close()
+
+
+@contextmanager
+def sesion_team(db, team_id: int, escritura: bool = False):
+    """Sesión del shard del equipo (`db` mismo si no hay sharding o es el shard 0)."""
+    if not habilitado():
+        yield db
+        return
+
+    if escritura:
+        verificar_escritura(team_id)
+    shard = mapa.shard(team_id)
+    if shard == 0:
+        db.info["shard"] = 0
+        yield db
+        return
+
+    sdb = SHARDS[shard]()
+    sdb.info["shard"] = shard
+    try:
+        yield sdb
+    finally:
+        sdb.close()
+
+
+def get_db_task(task_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Dependencia para las rutas `/tasks/{task_id}`: sesión del shard donde vive
+    la tarea. Sin sharding es la misma sesión de `get_db`.
+    """
+    if not habilitado():
+        yield db
+        return
+
+    team_id = team_de_task(task_id)
+    if team_id is None:
+        # Inexistente: el endpoint responde 404 consultando el shard 0
+        db.info["shard"] = 0
+        yield db
+        return
+
+    with sesion_team(db, team_id, escritura=request.method != "GET") as sdb:
+        yield sdb
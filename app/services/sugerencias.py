@@ -0,0 +1,222 @@
+import bisect
+import re
+import threading
+import unicodedata
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.models.team import Team
+from app.models.user import User
+
+# Máximo de sugerencias por consulta
+MAX_SUGERENCIAS = 50
+
+# Filas leídas por bloque al construir el índice
+CARGA_BLOQUE = 10000
+
+# Claves por tramo de la lista ordenada (se parte al doble)
+TRAMO = 1000
+
+_SEPARADORES = re.compile(r"[^\w]+")
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas y sin acentos: "María García" -> "maria garcia"."""
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_acentos.casefold().split())
+
+
+class _ListaOrdenada:
+    """
+    Lista ordenada partida en tramos de ~TRAMO elementos, con el máximo de
+    cada tramo en `_maximos` (la idea de `sortedcontainers.SortedList`).
+
+    Insertar o borrar desplaza solo los elementos de un tramo (más el índice
+    de máximos), no los millones de la lista entera como `bisect.insort`.
+    """
+
+    def __init__(self, ordenados: List = ()):
+        self._tramos = [list(ordenados[i:i + TRAMO]) for i in range(0, len(ordenados), TRAMO)]
+        self._maximos = [tramo[-1] for tramo in self._tramos]
+
+    def __len__(self) -> int:
+        return sum(len(tramo) for tramo in self._tramos)
+
+    def agregar(self, valor):
+        if not self._tramos:
+            self._tramos.append([valor])
+            self._maximos.append(valor)
+            return
+
+        t = min(bisect.bisect_left(self._maximos, valor), len(self._tramos) - 1)
+        tramo = self._tramos[t]
+        bisect.insort(tramo, valor)
+        self._maximos[t] = tramo[-1]
+        if len(tramo) > 2 * TRAMO:
+            self._tramos[t:t + 1] = [tramo[:TRAMO], tramo[TRAMO:]]
+            self._maximos[t:t + 1] = [tramo[TRAMO - 1], tramo[-1]]
+
+    def quitar(self, valor):
+        t = bisect.bisect_left(self._maximos, valor)
+        if t == len(self._tramos):
+            return
+        tramo = self._tramos[t]
+        i = bisect.bisect_left(tramo, valor)
+        if i == len(tramo) or tramo[i] != valor:
+            return
+        del tramo[i]
+        if tramo:
+            self._maximos[t] = tramo[-1]
+        else:
+            del self._tramos[t]
+            del self._maximos[t]
+
+    def desde(self, valor) -> Iterator:
+        """Elementos >= `valor`, en orden."""
+        t = bisect.bisect_left(self._maximos, valor)
+        if t == len(self._tramos):
+            return
+        tramo = self._tramos[t]
+        yield from tramo[bisect.bisect_left(tramo, valor):]
+        for tramo in self._tramos[t + 1:]:
+            yield from tramo
+
+
+class IndicePrefijos:
+    """
+    Índice de autocompletado en memoria.
+
+    Cada fila aporta varias claves normalizadas (el texto completo de cada
+    campo y cada palabra de `campos_palabras`) a un arreglo ordenado de
+    (clave, id); una búsqueda es un `bisect` hasta el primer candidato y un
+    recorrido secuencial mientras la clave empiece por el prefijo.
+    """
+
+    def __init__(
+        self,
+        modelo,
+        campos_texto: Sequence[str],
+        campos_salida: Sequence[str],
+        campos_palabras: Sequence[str] = (),
+        incluir: Callable = lambda fila: True,
+        filtro_sql=None
+    ):
+        self.modelo = modelo
+        self.campos_texto = tuple(campos_texto)
+        self.campos_salida = tuple(campos_salida)
+        self.campos_palabras = tuple(campos_palabras)
+        self.incluir = incluir
+        self.filtro_sql = filtro_sql
+        self._claves = _ListaOrdenada()
+        self._filas: Dict[int, dict] = {}
+        self._claves_por_id: Dict[int, Tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+        self.cargado = False
+
+    def _claves_de(self, fila: dict) -> Tuple[str, ...]:
+        claves = set()
+        for campo in self.campos_texto:
+            texto = normalizar(fila.get(campo))
+            if not texto:
+                continue
+            claves.add(texto)
+            if campo in self.campos_palabras:
+                claves.update(p for p in _SEPARADORES.split(texto) if p)
+        return tuple(sorted(claves))
+
+    def cargar(self, db):
+        """Construir el índice completo desde la base de datos."""
+        columnas = [getattr(self.modelo, c) for c in dict.fromkeys(("id",) + self.campos_salida + self.campos_texto)]
+        query = db.query(*columnas)
+        if self.filtro_sql is not None:
+            query = query.filter(self.filtro_sql)
+
+        filas = {}
+        claves_por_id = {}
+        claves = []
+        for row in query.yield_per(CARGA_BLOQUE):
+            fila = row._asdict()
+            filas[fila["id"]] = {c: fila[c] for c in self.campos_salida}
+            claves_por_id[fila["id"]] = self._claves_de(fila)
+            claves.extend((clave, fila["id"]) for clave in claves_por_id[fila["id"]])
+        claves.sort()
+        claves = _ListaOrdenada(claves)
+
+        with self._lock:
+            self._claves = claves
+            self._filas = filas
+            self._claves_por_id = claves_por_id
+            self.cargado = True
+
+    def asegurar_cargado(self, db):
+        if not self.cargado:
+            self.cargar(db)
+
+    def _quitar(self, fila_id: int):
+        for clave in self._claves_por_id.pop(fila_id, ()):
+            self._claves.quitar((clave, fila_id))
+        self._filas.pop(fila_id, None)
+
+    def actualizar(self, obj):
+        """Reflejar la creación o modificación de una fila (objeto ORM)."""
+        fila = {c: getattr(obj, c) for c in set(self.campos_salida + self.campos_texto)}
+        with self._lock:
+            self._quitar(obj.id)
+            if not self.incluir(obj):
+                return
+            claves = self._claves_de(fila)
+            for clave in claves:
+                self._claves.agregar((clave, obj.id))
+            self._claves_por_id[obj.id] = claves
+            self._filas[obj.id] = {c: fila[c] for c in self.campos_salida}
+
+    def eliminar(self, fila_id: int):
+        with self._lock:
+            self._quitar(fila_id)
+
+    def buscar(self, q: str, limit: int = 10) -> List[dict]:
+        """Filas con alguna clave que empiece por `q`, sin repetir."""
+        prefijo = normalizar(q)
+        if not prefijo:
+            return []
+
+        resultado = []
+        vistos = set()
+        with self._lock:
+            for clave, fila_id in self._claves.desde((prefijo,)):
+                if len(resultado) >= limit or not clave.startswith(prefijo):
+                    break
+                if fila_id not in vistos:
+                    vistos.add(fila_id)
+                    resultado.append(self._filas[fila_id])
+        return resultado
+
+
+# Solo se sugieren usuarios activos y equipos que no están en borrado
+indice_users = IndicePrefijos(
+    User,
+    campos_texto=("nombre", "email"),
+    campos_salida=("id", "nombre", "email"),
+    campos_palabras=("nombre",),
+    incluir=lambda user: user.activo,
+    filtro_sql=User.activo == True
+)
+indice_teams = IndicePrefijos(
+    Team,
+    campos_texto=("nombre",),
+    campos_salida=("id", "nombre"),
+    campos_palabras=("nombre",),
+    incluir=lambda team: not team.eliminando,
+    filtro_sql=Team.eliminando == False
+)
+
+
+def cargar_indices(db_factory):
+    db = db_factory()
+    try:
+        indice_users.cargar(db)
+        indice_teams.cargar(db)
+    finally:
+        db.close()
@@ -0,0 +1,142 @@
+import bisect
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app.models.team_throughput import TeamThroughput, CICLO_BUCKETS_HORAS, CICLO_COLUMNAS
+
+PERCENTILES_CICLO = (50, 85, 95)
+
+
+def bucket_ciclo(created_at: datetime, completed_at: datetime) -> int:
+    """Índice del bucket de cycle time para una tarea completada."""
+    horas = max((completed_at - created_at).total_seconds(), 0) / 3600
+    return min(bisect.bisect_left(CICLO_BUCKETS_HORAS, horas), len(CICLO_BUCKETS_HORAS) - 1)
+
+
+# INSERT con resolución de conflicto de cada dialecto soportado
+_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert, "mysql": mysql.insert}
+
+
+def _incrementar(db, team_id: int, fecha: date, **deltas):
+    """
+    Sumar `deltas` a la fila (team_id, fecha), creándola si no existe, con un
+    único upsert atómico. Se confirma junto con la transacción de `db`.
+
+    Sin savepoints: dentro del group commit la operación corre en la
+    transacción del grupo, y un savepoint en pysqlite no es fiable (el driver
+    no emite BEGIN hasta la primera escritura).
+    """
+    dialecto = db.get_bind(TeamThroughput).dialect.name
+    sentencia = _INSERTS[dialecto](TeamThroughput).values(team_id=team_id, fecha=fecha, **deltas)
+    sumas = {col: getattr(TeamThroughput, col) + delta for col, delta in deltas.items()}
+    if dialecto == "mysql":
+        sentencia = sentencia.on_duplicate_key_update(**sumas)
+    else:
+        sentencia = sentencia.on_conflict_do_update(index_elements=["team_id", "fecha"], set_=sumas)
+    db.execute(sentencia)
+
+
+def registrar_creacion(db, task):
+    _incrementar(db, task.team_id, task.created_at.date(), creadas=1)
+
+
+def registrar_completado(db, task, completed_at_anterior: Optional[datetime]):
+    """
+    Reflejar en el rollup un cambio de `completed_at` de una tarea: resta la
+    finalización anterior (si la había) y suma la nueva (si la hay).
+    """
+    if completed_at_anterior == task.completed_at:
+        return
+
+    if completed_at_anterior is not None:
+        bucket = CICLO_COLUMNAS[bucket_ciclo(task.created_at, completed_at_anterior)].key
+        _incrementar(db, task.team_id, completed_at_anterior.date(), completadas=-1, **{bucket: -1})
+
+    if task.completed_at is not None:
+        bucket = CICLO_COLUMNAS[bucket_ciclo(task.created_at, task.completed_at)].key
+        _incrementar(db, task.team_id, task.completed_at.date(), completadas=1, **{bucket: 1})
+
+
+def _percentiles_histograma(histograma: np.ndarray, percentiles) -> dict:
+    """Percentiles (en horas) interpolando linealmente dentro de cada bucket."""
+    total = histograma.sum()
+    if total == 0:
+        return {f"p{p}": None for p in percentiles}
+
+    limites = np.array((0,) + CICLO_BUCKETS_HORAS, dtype=float)
+    acumulado = np.cumsum(histograma)
+    objetivos = np.array(percentiles, dtype=float) / 100 * total
+
+    idx = np.searchsorted(acumulado, objetivos, side="left")
+    previo = np.where(idx > 0, acumulado[idx - 1], 0)
+    fraccion = (objetivos - previo) / np.maximum(histograma[idx], 1)
+    valores = limites[idx] + fraccion * (limites[idx + 1] - limites[idx])
+
+    return {f"p{p}": round(float(v), 2) for p, v in zip(percentiles, valores)}
+
+
+def serie_throughput(db, team_id: int, desde: date, hasta: date, bucket: str, ventana: int) -> dict:
+    """Serie de creadas/completadas por día o semana, leyendo solo el rollup."""
+    rows = db.query(
+        TeamThroughput.fecha,
+        TeamThroughput.creadas,
+        TeamThroughput.completadas,
+        *CICLO_COLUMNAS
+    ).filter(
+        TeamThroughput.team_id == team_id,
+        TeamThroughput.fecha.between(desde, hasta)
+    ).all()
+
+    # Arrays densos por día (los días sin fila quedan en cero)
+    dias = (hasta - desde).days + 1
+    creadas = np.zeros(dias, dtype=np.int64)
+    completadas = np.zeros(dias, dtype=np.int64)
+    histograma = np.zeros(len(CICLO_COLUMNAS), dtype=np.int64)
+
+    if rows:
+        datos = np.array([row[1:] for row in rows], dtype=np.int64)
+        offsets = np.array([(row.fecha - desde).days for row in rows])
+        creadas[offsets] = datos[:, 0]
+        completadas[offsets] = datos[:, 1]
+        histograma = datos[:, 2:].sum(axis=0)
+
+    fechas = [desde + timedelta(days=i) for i in range(dias)]
+    if bucket == "week":
+        # Agrupar por semana ISO (lunes como inicio)
+        semana = np.array([(f - timedelta(days=f.weekday()) - desde).days for f in fechas]) // 7
+        semana -= semana.min()
+        n = semana.max() + 1
+        creadas = np.bincount(semana, weights=creadas, minlength=n).astype(np.int64)
+        completadas = np.bincount(semana, weights=completadas, minlength=n).astype(np.int64)
+        inicio = desde - timedelta(days=desde.weekday())
+        fechas = [max(inicio + timedelta(weeks=i), desde) for i in range(n)]
+
+    # Media móvil de completadas (ventana parcial al inicio)
+    acumulado = np.cumsum(np.insert(completadas, 0, 0))
+    idx = np.arange(1, len(completadas) + 1)
+    inicio_ventana = np.maximum(idx - ventana, 0)
+    media_movil = (acumulado[idx] - acumulado[inicio_ventana]) / (idx - inicio_ventana)
+
+    return {
+        "team_id": team_id,
+        "bucket": bucket,
+        "desde": desde,
+        "hasta": hasta,
+        "series": [
+            {
+                "fecha": fecha,
+                "creadas": int(c),
+                "completadas": int(k),
+                "media_movil_completadas": round(float(m), 2)
+            }
+            for fecha, c, k, m in zip(fechas, creadas, completadas, media_movil)
+        ],
+        "totales": {
+            "creadas": int(creadas.sum()),
+            "completadas": int(completadas.sum())
+        },
+        "ciclo_horas": _percentiles_histograma(histograma, PERCENTILES_CICLO)
+    }
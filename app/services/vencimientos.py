@@ -0,0 +1,142 @@
+import heapq
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.models.task import Task, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+# Estados en los que una tarea todavía puede vencer
+ESTADOS_ABIERTOS = (TaskStatus.PENDING, TaskStatus.IN_PROGRESS)
+
+# El heap se reconstruye cuando tiene más de este múltiplo de entradas vivas
+# (y al menos HEAP_MIN_COMPACTAR): las obsoletas son entonces la mayoría
+HEAP_FACTOR_COMPACTAR = 2
+HEAP_MIN_COMPACTAR = 1024
+
+
+class OverdueScheduler:
+    """
+    Scheduler en memoria que emite un evento cuando una tarea abierta vence.
+    
+    Mantiene un min-heap de (due_date, task_id): cada tick solo revisa la cima
+    del heap, sin volver a consultar la tabla. Los cambios de fecha o estado se
+    registran en `_vencimientos` y las entradas obsoletas se descartan al salir
+    del heap (borrado perezoso). Como una tarea reprogramada o cerrada con
+    vencimiento lejano tarda en salir, cuando las obsoletas dominan el heap se
+    reconstruye desde `_vencimientos` (coste amortizado O(1) por escritura).
+
+    El heap ocupa el lugar de los buckets precalculados por ventana (vencidas,
+    hoy, semana): las ventanas de `GET /tasks/due` se resuelven con el índice
+    (estado, due_date) y el heap ya da en orden el próximo vencimiento, que es
+    lo único que necesita el tick.
+    """
+
+    def __init__(self, intervalo: float = 30.0):
+        self.intervalo = intervalo
+        self._heap: List[Tuple[datetime, int]] = []
+        self._vencimientos: Dict[int, datetime] = {}
+        self._listeners: List[Callable[[int, datetime], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def suscribir(self, callback: Callable[[int, datetime], None]):
+        """Registrar un callback `(task_id, due_date)` para cada tarea vencida."""
+        self._listeners.append(callback)
+
+    def cargar(self, db, ahora: Optional[datetime] = None):
+        """Cargar una única vez las tareas abiertas que aún no han vencido."""
+        ahora = ahora or datetime.utcnow()
+        rows = db.query(Task.id, Task.due_date).filter(
+            Task.estado.in_(ESTADOS_ABIERTOS),
+            Task.due_date >= ahora
+        ).all()
+        with self._lock:
+            self._vencimientos = {row.id: row.due_date for row in rows}
+            self._heap = [(due, task_id) for task_id, due in self._vencimientos.items()]
+            heapq.heapify(self._heap)
+
+    def programar(self, task_id: int, due_date: Optional[datetime], estado=TaskStatus.PENDING):
+        """Registrar (o actualizar) el vencimiento de una tarea tras una escritura."""
+        with self._lock:
+            if due_date is None or estado not in ESTADOS_ABIERTOS:
+                self._vencimientos.pop(task_id, None)
+                self._compactar()
+                return
+            if due_date.tzinfo is not None:
+                due_date = due_date.astimezone(timezone.utc).replace(tzinfo=None)
+            if self._vencimientos.get(task_id) == due_date:
+                return
+            self._vencimientos[task_id] = due_date
+            heapq.heappush(self._heap, (due_date, task_id))
+            self._compactar()
+
+    def cancelar(self, task_id: int):
+        with self._lock:
+            self._vencimientos.pop(task_id, None)
+            self._compactar()
+
+    def _compactar(self):
+        """Reconstruir el heap solo con las entradas vigentes si las obsoletas dominan."""
+        if len(self._heap) <= max(HEAP_MIN_COMPACTAR, HEAP_FACTOR_COMPACTAR * len(self._vencimientos)):
+            return
+        self._heap = [(due, task_id) for task_id, due in self._vencimientos.items()]
+        heapq.heapify(self._heap)
+
+    def tick(self, ahora: Optional[datetime] = None) -> List[Tuple[int, datetime]]:
+        """Emitir los eventos de las tareas que vencieron desde el último tick."""
+        ahora = ahora or datetime.utcnow()
+        vencidas = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= ahora:
+                due, task_id = heapq.heappop(self._heap)
+                # Entrada obsoleta: la tarea cambió de fecha, se cerró o se eliminó
+                if self._vencimientos.get(task_id) != due:
+                    continue
+                del self._vencimientos[task_id]
+                vencidas.append((task_id, due))
+
+        for task_id, due in vencidas:
+            logger.info("Tarea %s vencida (due_date=%s)", task_id, due.isoformat())
+            for callback in self._listeners:
+                try:
+                    callback(task_id, due)
+                except Exception:
+                    logger.exception("Error en listener de vencimientos")
+        return vencidas
+
+    def start(self, *db_factories):
+        """Cargar los vencimientos (de cada shard, si hay varios) y arrancar el hilo."""
+        vencimientos = {}
+        for db_factory in db_factories:
+            db = db_factory()
+            try:
+                self.cargar(db)
+                vencimientos.update(self._vencimientos)
+            finally:
+                db.close()
+
+        with self._lock:
+            self._vencimientos = vencimientos
+            self._heap = [(due, task_id) for task_id, due in vencimientos.items()]
+            heapq.heapify(self._heap)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="overdue-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.intervalo):
+            self.tick()
+
+
+scheduler = OverdueScheduler()
@@ -0,0 +1,303 @@
+"""
+Snapshot binario de la base de datos para levantar entornos (staging, perf).
+
+    python -m app.snapshot export snapshots/staging
+    python -m app.snapshot restore snapshots/staging [--reemplazar] [--hilos 4]
+
+Un snapshot es un directorio con `manifest.json` (versión del formato,
+columnas y chunks de cada tabla) y, por tabla, archivos Arrow IPC de hasta
+`--filas-por-chunk` filas comprimidos con zstd. La restauración carga cada
+tabla con los índices secundarios eliminados, insertando sus chunks en
+paralelo (uno por hilo y transacción), y al final vuelve a crear los índices.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import Boolean, DateTime, Enum, Integer, String, delete, func, insert, select, type_coerce
+from sqlalchemy import inspect as inspeccionar
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover
+    pa = None
+
+from app.database import Base, SessionLocal, engine
+from app.models.team import Team
+from app.models.user import User
+from app.models.user_team import UserTeam
+from app.models.task import Task
+from app.models.task_archive import TaskArchive
+from app.models.team_throughput import TeamThroughput
+from app.models.team_shard import TeamShard
+from app.services import shards
+
+FORMATO = "tasks-api-snapshot"
+VERSION = 1
+FILAS_POR_CHUNK = 100_000
+HILOS = 4
+COMPRESION = "zstd"
+
+# En orden de claves foráneas (se restauran en este orden)
+MODELOS = (Team, User, UserTeam, Task)
+
+# Derivadas de las tareas o ligadas a los equipos: se vacían con --reemplazar
+DEPENDIENTES = (TaskArchive, TeamThroughput, TeamShard)
+
+
+def _tipo_arrow(columna):
+    tipo = columna.type
+    if isinstance(tipo, Enum):
+        return pa.dictionary(pa.int32(), pa.string())
+    if isinstance(tipo, Integer):
+        return pa.int64()
+    if isinstance(tipo, Boolean):
+        return pa.bool_()
+    if isinstance(tipo, DateTime):
+        return pa.timestamp("us")
+    if isinstance(tipo, String):
+        return pa.string()
+    raise TypeError(f"Tipo de columna sin soporte en snapshots: {columna.table.name}.{columna.name} ({tipo})")
+
+
+def _columnas_select(tabla):
+    # Los enums se leen como el texto guardado en la base (el nombre del
+    # miembro), que es también lo que acepta el INSERT de la restauración
+    return [
+        type_coerce(c, String).label(c.name) if isinstance(c.type, Enum) else c
+        for c in tabla.c
+    ]
+
+
+def _batch(schema, filas) -> "pa.RecordBatch":
+    columnas = list(zip(*filas))
+    arrays = []
+    for campo, valores in zip(schema, columnas):
+        if pa.types.is_dictionary(campo.type):
+            arrays.append(pa.array(valores, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(valores, campo.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _escribir_chunk(ruta: str, batch):
+    opciones = pa.ipc.IpcWriteOptions(compression=COMPRESION)
+    with pa.OSFile(ruta, "wb") as archivo, pa.ipc.new_file(archivo, batch.schema, options=opciones) as writer:
+        writer.write_batch(batch)
+
+
+def exportar(directorio: str, filas_por_chunk: int = FILAS_POR_CHUNK):
+    os.makedirs(directorio, exist_ok=True)
+    manifest = {
+        "formato": FORMATO,
+        "version": VERSION,
+        "creado": datetime.utcnow().isoformat(),
+        "compresion": COMPRESION,
+        "tablas": [],
+    }
+
+    inicio = time.perf_counter()
+    db = SessionLocal()
+    try:
+        # Una sola transacción en la base principal: en MySQL (REPEATABLE READ)
+        # todas las tablas salen del mismo instante
+        # Los equipos en borrado no viajan, ni sus membresías ni sus tareas
+        en_borrado = sorted(db.scalars(select(Team.id).where(Team.eliminando == True)))
+        for modelo in MODELOS:
+            tabla = modelo.__table__
+            schema = pa.schema([(c.name, _tipo_arrow(c)) for c in tabla.c])
+            os.makedirs(os.path.join(directorio, tabla.name), exist_ok=True)
+            entrada = {
+                "nombre": tabla.name,
+                "columnas": [{"nombre": campo.name, "tipo": str(campo.type)} for campo in schema],
+                "filas": 0,
+                "chunks": [],
+            }
+            t0 = time.perf_counter()
+
+            # Las tareas pueden estar repartidas: se leen de todos los shards
+            sesiones = shards.sesiones(db) if tabla.name == Task.__tablename__ else [(0, db)]
+            sentencia = select(*_columnas_select(tabla)).order_by(*tabla.primary_key.columns)
+            if tabla.name == Team.__tablename__:
+                sentencia = sentencia.where(tabla.c.eliminando == False)
+            elif en_borrado and "team_id" in tabla.c:
+                sentencia = sentencia.where(tabla.c.team_id.not_in(en_borrado))
+
+            for _, sdb in sesiones:
+                resultado = sdb.execute(sentencia, execution_options={"yield_per": filas_por_chunk})
+                for filas in resultado.partitions():
+                    archivo = f"{tabla.name}/{len(entrada['chunks']):05d}.arrow"
+                    _escribir_chunk(os.path.join(directorio, archivo), _batch(schema, filas))
+                    entrada["chunks"].append({"archivo": archivo, "filas": len(filas)})
+                    entrada["filas"] += len(filas)
+
+            manifest["tablas"].append(entrada)
+            segundos = time.perf_counter() - t0
+            print(f"   📦 {tabla.name}: {entrada['filas']} filas en {len(entrada['chunks'])} chunks ({segundos:.1f}s)")
+    finally:
+        db.close()
+
+    with open(os.path.join(directorio, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    tamano = sum(
+        os.path.getsize(os.path.join(directorio, chunk["archivo"]))
+        for entrada in manifest["tablas"] for chunk in entrada["chunks"]
+    )
+    print(f"✅ Snapshot en {directorio} ({tamano / 2**20:.1f} MiB, {time.perf_counter() - inicio:.1f}s)")
+
+
+def _leer_manifest(directorio: str) -> dict:
+    ruta = os.path.join(directorio, "manifest.json")
+    if not os.path.exists(ruta):
+        print(f"❌ No hay manifest.json en {directorio}")
+        sys.exit(1)
+    with open(ruta, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("formato") != FORMATO:
+        print(f"❌ {ruta} no es un snapshot de esta API")
+        sys.exit(1)
+    if manifest.get("version", 0) > VERSION:
+        print(f"❌ Snapshot versión {manifest['version']}: esta versión de la API solo lee hasta la {VERSION}")
+        sys.exit(1)
+    return manifest
+
+
+def _valores(columna, dialecto) -> list:
+    """
+    Valores de una columna Arrow tal como los recibe el driver, convertidos
+    por columna en lugar de fila a fila por los tipos de SQLAlchemy.
+    """
+    if pa.types.is_timestamp(columna.type) and dialecto.name == "sqlite":
+        # Con microsegundos es el mismo texto que guarda DateTime de SQLAlchemy
+        # en SQLite ("2026-01-30 18:00:00.000000")
+        return columna.cast(pa.string()).to_pylist()
+    return columna.to_pylist()
+
+
+def _leer_chunk(ruta: str, tabla, dialecto) -> tuple:
+    """(INSERT compilado, filas como tuplas en el orden de sus parámetros)."""
+    with pa.memory_map(ruta) as archivo:
+        datos = pa.ipc.open_file(archivo).read_all()
+    compilado = insert(tabla).compile(dialect=dialecto, column_keys=datos.column_names)
+    columnas = [_valores(datos.column(nombre), dialecto) for nombre in compilado.positiontup]
+    return str(compilado), list(zip(*columnas))
+
+
+def _preparar_conexion(conn):
+    # Sin verificación de claves foráneas ni de unicidad durante la carga
+    # (los datos vienen de una base consistente)
+    if conn.dialect.name == "mysql":
+        conn.exec_driver_sql("SET FOREIGN_KEY_CHECKS = 0")
+        conn.exec_driver_sql("SET UNIQUE_CHECKS = 0")
+
+
+def _insertar_chunk(tabla, ruta: str) -> int:
+    sql, filas = _leer_chunk(ruta, tabla, engine.dialect)
+    with engine.begin() as conn:
+        _preparar_conexion(conn)
+        # executemany directo del driver (pymysql lo agrupa en INSERTs de varias filas)
+        conn.exec_driver_sql(sql, filas)
+    return len(filas)
+
+
+def _validar_columnas(tabla, entrada: dict):
+    sobrantes = [c["nombre"] for c in entrada["columnas"] if c["nombre"] not in tabla.c]
+    if sobrantes:
+        print(f"❌ El snapshot trae columnas que {tabla.name} ya no tiene: {', '.join(sobrantes)}")
+        sys.exit(1)
+
+
+def restaurar(directorio: str, reemplazar: bool = False, hilos: int = HILOS):
+    if shards.habilitado():
+        print("❌ Restaurar con sharding no está soportado: restaura sin SHARD_URLS y mueve los equipos después")
+        sys.exit(1)
+
+    manifest = _leer_manifest(directorio)
+    por_nombre = {entrada["nombre"]: entrada for entrada in manifest["tablas"]}
+    tablas = [modelo.__table__ for modelo in MODELOS if modelo.__tablename__ in por_nombre]
+    for tabla in tablas:
+        _validar_columnas(tabla, por_nombre[tabla.name])
+
+    Base.metadata.create_all(bind=engine, tables=[m.__table__ for m in MODELOS + DEPENDIENTES])
+
+    with engine.begin() as conn:
+        ocupadas = [m.__tablename__ for m in MODELOS if conn.execute(select(func.count()).select_from(m.__table__)).scalar()]
+        if ocupadas and not reemplazar:
+            print(f"❌ La base no está vacía ({', '.join(ocupadas)}): usa --reemplazar para borrar su contenido")
+            sys.exit(1)
+        if ocupadas:
+            _preparar_conexion(conn)
+            for modelo in reversed(MODELOS + DEPENDIENTES):
+                conn.execute(delete(modelo.__table__))
+            print(f"   🗑️  Contenido anterior borrado ({', '.join(ocupadas)})")
+
+    # SQLite admite un solo escritor: los chunks se insertan de a uno
+    if engine.dialect.name == "sqlite":
+        hilos = 1
+
+    inicio = time.perf_counter()
+    total = 0
+    for tabla in tablas:
+        entrada = por_nombre[tabla.name]
+        t0 = time.perf_counter()
+
+        # Índices secundarios fuera durante la carga (la clave primaria se mantiene)
+        with engine.begin() as conn:
+            _preparar_conexion(conn)
+            existentes = {i["name"] for i in inspeccionar(conn).get_indexes(tabla.name)}
+            indices = [indice for indice in tabla.indexes if indice.name in existentes]
+            for indice in indices:
+                indice.drop(conn)
+
+        rutas = [os.path.join(directorio, chunk["archivo"]) for chunk in entrada["chunks"]]
+        with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="snapshot") as pool:
+            filas = sum(pool.map(lambda ruta: _insertar_chunk(tabla, ruta), rutas))
+        carga = time.perf_counter() - t0
+
+        with engine.begin() as conn:
+            _preparar_conexion(conn)
+            for indice in tabla.indexes:
+                indice.create(conn)
+        total += filas
+        segundos = time.perf_counter() - t0
+        print(
+            f"   📥 {tabla.name}: {filas} filas en {segundos:.1f}s "
+            f"({filas / max(carga, 1e-9):,.0f} filas/s de carga, {segundos - carga:.1f}s de índices)"
+        )
+
+    segundos = time.perf_counter() - inicio
+    print(f"✅ {total} filas restauradas en {segundos:.1f}s ({total / max(segundos, 1e-9):,.0f} filas/s)")
+    print("   El rollup de throughput no viaja en el snapshot: python -m app.backfill_throughput")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.snapshot", description="Exportar y restaurar snapshots de la base")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    exportar_cmd = comandos.add_parser("export", help="Exportar equipos, usuarios, membresías y tareas")
+    exportar_cmd.add_argument("directorio")
+    exportar_cmd.add_argument("--filas-por-chunk", type=int, default=FILAS_POR_CHUNK)
+
+    restaurar_cmd = comandos.add_parser("restore", help="Restaurar un snapshot en DATABASE_URL")
+    restaurar_cmd.add_argument("directorio")
+    restaurar_cmd.add_argument("--reemplazar", action="store_true", help="Borrar antes el contenido de la base")
+    restaurar_cmd.add_argument("--hilos", type=int, default=HILOS, help="Chunks insertados en paralelo (1 en SQLite)")
+
+    args = parser.parse_args()
+    if pa is None:
+        print("❌ Los snapshots necesitan pyarrow (pip install pyarrow)")
+        sys.exit(1)
+
+    if args.comando == "export":
+        exportar(args.directorio, args.filas_por_chunk)
+    else:
+        restaurar(args.directorio, args.reemplazar, args.hilos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Benchmark de `app.snapshot`: genera una base SQLite sintética, la exporta y
+la restaura en otra base vacía, y mide tiempo y memoria de cada fase.
+
+    python -m app.snapshot_bench --tareas 1000000 --dir /tmp/bench-snapshot
+    python -m app.snapshot_bench --tareas 10000000 --dir /tmp/bench-snapshot
+
+Datos: 1.000 equipos, 10.000 usuarios, 20.000 membresías y `--tareas` tareas
+con estados, prioridades y fechas repartidos. Export y restore corren cada
+uno en su propio proceso (`python -m app.snapshot`) con su DATABASE_URL,
+igual que en un entorno real; la memoria es el pico de RSS de ese proceso.
+Al final se comparan los conteos de origen y destino.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+
+TABLAS = ("teams", "users", "user_teams", "tasks")
+
+EQUIPOS = 1000
+USUARIOS = 10000
+MEMBRESIAS = 20000
+
+# Fechas guardadas como las escribe DateTime de SQLAlchemy en SQLite
+FECHA = "strftime('%Y-%m-%d %H:%M:%f000', {base}, '+' || ({minutos}) || ' minutes')"
+
+GENERAR = (
+    f"""INSERT INTO teams (id, nombre, descripcion, eliminando, created_at, updated_at, version)
+    WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r WHERE i < {EQUIPOS})
+    SELECT i, 'Equipo ' || i, 'Descripción del equipo ' || i, 0,
+           '2026-01-01 10:00:00.000000', '2026-01-02 10:00:00.000000', 1 FROM r""",
+
+    f"""INSERT INTO users (id, nombre, email, activo, created_at, updated_at, version)
+    WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r WHERE i < {USUARIOS})
+    SELECT i, 'Usuario ' || i, 'u' || i || '@company.com', 1,
+           '2026-01-01 10:00:00.000000', '2026-01-02 10:00:00.000000', 1 FROM r""",
+
+    f"""INSERT INTO user_teams (id, user_id, team_id, role, joined_at)
+    WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r WHERE i < {MEMBRESIAS})
+    SELECT i, 1 + (i - 1) % {USUARIOS}, 1 + (i - 1) % {EQUIPOS}, 'member', '2026-01-01 10:00:00.000000' FROM r""",
+
+    f"""INSERT INTO tasks (id, titulo, descripcion, estado, prioridad, prioridad_orden, team_id, asignado_a,
+                           created_at, updated_at, due_date, completed_at, version)
+    WITH RECURSIVE r(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM r WHERE i < :tareas)
+    SELECT i, 'Tarea número ' || i,
+           CASE WHEN i % 3 = 0 THEN NULL ELSE 'Descripción de la tarea ' || i || ' con algo de texto de relleno' END,
+           CASE i % 4 WHEN 0 THEN 'PENDING' WHEN 1 THEN 'IN_PROGRESS' WHEN 2 THEN 'COMPLETED' ELSE 'CANCELLED' END,
+           CASE i % 4 WHEN 0 THEN 'LOW' WHEN 1 THEN 'MEDIUM' WHEN 2 THEN 'HIGH' ELSE 'URGENT' END, 1 + i % 4,
+           1 + i % {EQUIPOS}, CASE WHEN i % 7 = 0 THEN NULL ELSE 1 + i % {USUARIOS} END,
+           {FECHA.format(base="'2025-01-01'", minutos="i % 500000")},
+           {FECHA.format(base="'2025-01-02'", minutos="i % 500000")},
+           CASE WHEN i % 5 = 0 THEN NULL ELSE {FECHA.format(base="'2026-01-01'", minutos="i % 90000")} END,
+           CASE WHEN i % 4 = 2 THEN {FECHA.format(base="'2025-06-01'", minutos="i % 90000")} ELSE NULL END,
+           1 FROM r""",
+)
+
+
+def _borrar_base(ruta: str):
+    # Sin los -wal/-shm de una corrida anterior, que SQLite aplicaría a la base nueva
+    for sufijo in ("", "-wal", "-shm"):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+
+
+def _ejecutar(args: list, ruta_db: str) -> tuple:
+    """Correr `python -m ...` contra `ruta_db`: (segundos, pico de RSS en MiB)."""
+    entorno = dict(os.environ, DATABASE_URL=f"sqlite:///{ruta_db}")
+    entorno.pop("SHARD_URLS", None)
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen([sys.executable, "-m", *args], env=entorno)
+    _, estado, uso = os.wait4(proceso.pid, 0)
+    segundos = time.perf_counter() - inicio
+    proceso.returncode = os.waitstatus_to_exitcode(estado)
+    if proceso.returncode != 0:
+        print(f"❌ {' '.join(args)} terminó con código {proceso.returncode}")
+        sys.exit(1)
+    return segundos, uso.ru_maxrss / 1024
+
+
+def generar(ruta: str, tareas: int) -> float:
+    _borrar_base(ruta)
+    # El esquema lo crean los modelos de la app, como en cualquier entorno
+    _ejecutar(["app.snapshot_bench", "--crear-esquema"], ruta)
+
+    inicio = time.perf_counter()
+    conn = sqlite3.connect(ruta)
+    try:
+        conn.executescript("PRAGMA journal_mode = DELETE; PRAGMA synchronous = OFF; PRAGMA cache_size = -262144;")
+        # Los índices secundarios se crean al final, ordenando una sola vez
+        # (insertando con ellos, 10M de tareas tardan horas)
+        indices = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+        ).fetchall()
+        for nombre, _ in indices:
+            conn.execute(f"DROP INDEX {nombre}")
+        for sql in GENERAR:
+            conn.execute(sql, {"tareas": tareas} if ":tareas" in sql else {})
+        for _, sql in indices:
+            conn.execute(sql)
+        conn.commit()
+    finally:
+        conn.close()
+    return time.perf_counter() - inicio
+
+
+def _conteos(ruta: str) -> dict:
+    conn = sqlite3.connect(ruta)
+    try:
+        return {tabla: conn.execute(f"SELECT count(*) FROM {tabla}").fetchone()[0] for tabla in TABLAS}
+    finally:
+        conn.close()
+
+
+def _tamano_mib(directorio: str) -> float:
+    return sum(
+        os.path.getsize(os.path.join(raiz, nombre))
+        for raiz, _, nombres in os.walk(directorio) for nombre in nombres
+    ) / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.snapshot_bench", description="Benchmark de export/restore de snapshots (SQLite)")
+    parser.add_argument("--tareas", type=int, default=1_000_000)
+    parser.add_argument("--dir", default="/tmp/bench-snapshot", help="Directorio de trabajo (se sobrescribe)")
+    parser.add_argument("--crear-esquema", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.crear_esquema:
+        import app.models  # noqa: F401  (registra todas las tablas)
+        from app.database import Base, engine
+        Base.metadata.create_all(bind=engine)
+        return
+
+    os.makedirs(args.dir, exist_ok=True)
+    origen = os.path.join(args.dir, "origen.db")
+    destino = os.path.join(args.dir, "destino.db")
+    snapshot = os.path.join(args.dir, "snapshot")
+
+    print(f"🌱 Generando {args.tareas:,} tareas en {origen}")
+    segundos = generar(origen, args.tareas)
+    print(f"   {segundos:.1f}s")
+
+    shutil.rmtree(snapshot, ignore_errors=True)
+    print("📦 Export")
+    t_export, rss_export = _ejecutar(["app.snapshot", "export", snapshot], origen)
+
+    _borrar_base(destino)
+    print("📥 Restore")
+    t_restore, rss_restore = _ejecutar(["app.snapshot", "restore", snapshot], destino)
+
+    esperados, restaurados = _conteos(origen), _conteos(destino)
+    print()
+    print(f"{'fase':<10}{'segundos':>10}{'pico RSS (MiB)':>16}")
+    print(f"{'export':<10}{t_export:>10.1f}{rss_export:>16.0f}")
+    print(f"{'restore':<10}{t_restore:>10.1f}{rss_restore:>16.0f}")
+    print(f"Snapshot: {_tamano_mib(snapshot):.1f} MiB")
+    print(f"Filas restauradas por segundo: {sum(restaurados.values()) / t_restore:,.0f}")
+
+    if esperados != restaurados:
+        print(f"❌ Conteos distintos: origen {esperados}, destino {restaurados}")
+        sys.exit(1)
+    print(f"✅ Conteos iguales en origen y destino: {restaurados}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark del perfil SQLite: compara escrituras y lecturas concurrentes con
+el perfil (WAL, pool de lectura y escritor único por turno) contra la
+configuración por defecto de SQLAlchemy (SQLITE_TUNING=0) y contra el
+perfil con el turno siempre en orden de llegada (SQLITE_WRITE_FAIRNESS_MS=0).
+
+    python -m app.sqlite_bench
+    python -m app.sqlite_bench --escritores 8 --lectores 8 --segundos 10
+
+Cada configuración corre en su propio proceso sobre una base nueva con los
+datos de ejemplo. Los escritores crean tareas y los lectores piden la
+primera página del listado de tareas con detalles, en proceso, sin HTTP.
+Se informa operaciones por segundo, p50/p99 de cada tipo y errores (p. ej.
+"database is locked").
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Nombre -> variables de entorno del proceso
+CONFIGURACIONES = {
+    "defecto": {"SQLITE_TUNING": "0"},
+    "perfil": {"SQLITE_TUNING": "1"},
+    "fifo": {"SQLITE_TUNING": "1", "SQLITE_WRITE_FAIRNESS_MS": "0"},
+}
+
+
+def _percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))] if ordenados else 0.0
+
+
+def fase(escritores: int, lectores: int, segundos: float) -> dict:
+    """Correr la carga en este proceso (con la configuración de su entorno)."""
+    import app.main  # noqa: F401  (crea las tablas)
+    from app.database import SessionLocal
+    from app.models.task import Task
+    from app.routers.tasks import _sentencia_con_detalles
+    from app.seed import seed_database
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        seed_database()
+
+    latencias = {"escritura": [], "lectura": []}
+    errores = []
+    lock = threading.Lock()
+    fin = time.monotonic() + segundos
+
+    def escritor():
+        while time.monotonic() < fin:
+            db = SessionLocal()
+            inicio = time.perf_counter()
+            try:
+                db.add(Task(titulo="Tarea benchmark", team_id=1))
+                db.commit()
+                with lock:
+                    latencias["escritura"].append((time.perf_counter() - inicio) * 1000)
+            except Exception as e:
+                db.rollback()
+                with lock:
+                    errores.append(type(e).__name__)
+            finally:
+                db.close()
+
+    def lector():
+        while time.monotonic() < fin:
+            db = SessionLocal()
+            inicio = time.perf_counter()
+            try:
+                db.execute(_sentencia_con_detalles() + (lambda s: s.order_by(Task.id.desc()).limit(50))).all()
+                with lock:
+                    latencias["lectura"].append((time.perf_counter() - inicio) * 1000)
+            except Exception as e:
+                with lock:
+                    errores.append(type(e).__name__)
+            finally:
+                db.close()
+
+    hilos = [threading.Thread(target=escritor) for _ in range(escritores)]
+    hilos += [threading.Thread(target=lector) for _ in range(lectores)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    resultado = {"errores": len(errores)}
+    for tipo, valores in latencias.items():
+        resultado[tipo] = {
+            "por_segundo": len(valores) / segundos,
+            "p50": _percentil(valores, 0.50),
+            "p99": _percentil(valores, 0.99),
+        }
+    return resultado
+
+
+def _describir(variables: dict) -> str:
+    return " ".join(f"{k}={v}" for k, v in variables.items())
+
+
+def _correr(variables: dict, args) -> dict:
+    with tempfile.TemporaryDirectory() as directorio:
+        entorno = dict(os.environ, **variables, DATABASE_URL=f"sqlite:///{directorio}/bench.db")
+        entorno.pop("SHARD_URLS", None)
+        proceso = subprocess.run(
+            [sys.executable, "-m", "app.sqlite_bench", "--fase",
+             "--escritores", str(args.escritores), "--lectores", str(args.lectores), "--segundos", str(args.segundos)],
+            env=entorno, capture_output=True, text=True
+        )
+    if proceso.returncode != 0:
+        print(f"❌ {_describir(variables)} terminó con código {proceso.returncode}\n{proceso.stderr}")
+        sys.exit(1)
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.sqlite_bench", description="Perfil SQLite contra la configuración por defecto")
+    parser.add_argument("--escritores", type=int, default=8)
+    parser.add_argument("--lectores", type=int, default=8)
+    parser.add_argument("--segundos", type=float, default=5)
+    parser.add_argument("--fase", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.fase:
+        print(json.dumps(fase(args.escritores, args.lectores, args.segundos)))
+        return
+
+    resultados = []
+    for nombre, variables in CONFIGURACIONES.items():
+        print(f"⏱️  {nombre} ({_describir(variables)}): {args.escritores} escritores, {args.lectores} lectores, {args.segundos:.0f}s")
+        resultados.append((nombre, _correr(variables, args)))
+
+    print()
+    print(f"{'config':<9}{'escr/s':>8}{'p50 ms':>9}{'p99 ms':>9}{'lect/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errores':>9}")
+    for nombre, r in resultados:
+        e, l = r["escritura"], r["lectura"]
+        print(
+            f"{nombre:<9}{e['por_segundo']:>8.0f}{e['p50']:>9.1f}{e['p99']:>9.1f}"
+            f"{l['por_segundo']:>9.0f}{l['p50']:>9.1f}{l['p99']:>9.1f}{r['errores']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
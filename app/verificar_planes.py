@@ -0,0 +1,141 @@
+"""
+Verificación de los planes de `GET /tasks/`: para cada orden (sin sort y los
+de COLUMNAS_SORT, asc y desc) y filtro (ninguno, team_id, asignado_a) pide
+el listado, captura la consulta que ejecutó y la pasa por EXPLAIN.
+
+    python -m app.verificar_planes
+
+Falla (código 1) si algún plan ordena en memoria (SQLite: "USE TEMP B-TREE
+FOR ORDER BY"; MySQL: "Using filesort"/"Using temporary") o si un orden no
+recorre su índice: `ix_tasks_[team_|asignado_]<clave>_id`, o sin sort la
+clave primaria o `ix_tasks_team_id`/`ix_tasks_asignado_id`. Si la base está
+vacía se carga el seed. Sin sharding: la consulta de cada shard no lleva
+los JOINs y se verifica igual en la base principal.
+"""
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.database import ENGINES, SessionLocal
+from app.main import app
+from app.middleware.cronometro_sql import cronometro_sql
+from app.models.task import Task
+from app.models.team import Team
+from app.routers.tasks import COLUMNAS_SORT
+from app.schemas.task import TaskSortEnum
+from app.seed import seed_database
+from app.services import shards
+
+# Nombre de la clave en los índices de ordenación (ver Task.__table_args__)
+CLAVES_INDICE = {
+    TaskSortEnum.DUE_DATE: "due_date",
+    TaskSortEnum.PRIORIDAD: "prioridad",
+    TaskSortEnum.CREATED_AT: "created_at",
+    TaskSortEnum.UPDATED_AT: "updated_at",
+}
+
+# Filtro -> prefijo del índice
+FILTROS = {
+    None: "",
+    "team_id": "team_",
+    "asignado_a": "asignado_",
+}
+
+
+def _indice_esperado(sort, prefijo: str):
+    """Índice que debe recorrer el plan (None: la clave primaria)."""
+    if sort is not None:
+        return f"ix_tasks_{prefijo}{CLAVES_INDICE[sort]}_id"
+    return f"ix_tasks_{prefijo}id" if prefijo else None
+
+capturadas = []
+
+
+def _capturar(engine):
+    cronometro_sql.registrar(engine, lambda statement, parameters, ms: capturadas.append((engine, statement, parameters)))
+
+
+def _consulta_listado():
+    """La última consulta de la petición que lee tareas con ORDER BY."""
+    for engine, statement, parameters in reversed(capturadas):
+        if "FROM tasks" in statement and "ORDER BY" in statement:
+            return engine, statement, parameters
+    return None
+
+
+def _explicar(engine, statement, parameters) -> tuple:
+    """(líneas del plan, ordena en memoria, índices usados para tasks)."""
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            filas = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, tuple(parameters)).all()
+            lineas = [fila[-1] for fila in filas]
+            en_memoria = any("USE TEMP B-TREE FOR ORDER BY" in linea for linea in lineas)
+            indices = {palabra for linea in lineas for palabra in linea.split() if palabra.startswith("ix_tasks_")}
+        else:
+            filas = conn.exec_driver_sql("EXPLAIN " + statement, parameters).mappings().all()
+            lineas = [f"{fila['table']}: key={fila['key']} {fila['Extra'] or ''}" for fila in filas]
+            en_memoria = any("Using filesort" in (fila["Extra"] or "") or "Using temporary" in (fila["Extra"] or "") for fila in filas)
+            indices = {fila["key"] for fila in filas if fila["table"] == Task.__tablename__}
+    return lineas, en_memoria, indices
+
+
+def main():
+    if shards.habilitado():
+        print("❌ Ejecutar sin SHARD_URLS: se verifica la consulta con JOINs de la base principal")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        vacia = db.query(Team.id).first() is None
+    finally:
+        db.close()
+    if vacia:
+        seed_database()
+
+    for e in ENGINES:
+        _capturar(e)
+
+    cliente = TestClient(app)
+    errores = 0
+    for sort in [None, *COLUMNAS_SORT]:
+        for order in ("asc", "desc"):
+            for filtro, prefijo in FILTROS.items():
+                params = {"order": order, "limit": 20}
+                if sort is not None:
+                    params["sort"] = sort.value
+                if filtro is not None:
+                    params[filtro] = 1
+                descripcion = f"sort={sort.value if sort else '-'} order={order} filtro={filtro or '-'}"
+
+                capturadas.clear()
+                respuesta = cliente.get("/tasks/", params=params)
+                consulta = _consulta_listado()
+                if respuesta.status_code != 200 or consulta is None:
+                    print(f"❌ {descripcion}: HTTP {respuesta.status_code}, consulta no capturada")
+                    errores += 1
+                    continue
+
+                lineas, en_memoria, indices = _explicar(*consulta)
+                esperado = _indice_esperado(sort, prefijo)
+                problemas = []
+                if en_memoria:
+                    problemas.append("ordena en memoria")
+                if esperado is not None and esperado not in indices:
+                    problemas.append(f"no usa {esperado}")
+
+                if problemas:
+                    errores += 1
+                    print(f"❌ {descripcion}: {', '.join(problemas)}")
+                    for linea in lineas:
+                        print(f"      {linea}")
+                else:
+                    print(f"✅ {descripcion}: {', '.join(sorted(indices)) or 'clave primaria'}")
+
+    if errores:
+        print(f"\n❌ {errores} planes con problemas")
+        sys.exit(1)
+    print("\n✅ Ningún orden de /tasks/ ordena en memoria")
+
+
+if __name__ == "__main__":
+    main()